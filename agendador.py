@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Agendador de longa duração: roda todos os coletores no MESMO processo,
+nos mesmos intervalos do 'meus-jobs-cron'.
+
+Com o cron, cada execução é um processo novo e o pool SSH morre junto.
+Aqui o 'ssh_pool.POOL' sobrevive entre os ciclos, então o handshake e o
+login em cada dispositivo são pagos uma única vez (enquanto a sessão viver).
+"""
+import asyncio
+import time
+import traceback
+
+import relatorio
+import relatoriojn
+import treshold
+import status
+import optics_jn
+import tresholdjn
+import particoes
+import agregacao
+from ssh_pool import POOL
+from ssh_async import ASYNC_POOL
+from circuit_breaker import BREAKER
+from parse_pool import PARSE_POOL
+
+# --- 1. CONFIGURAÇÕES ---
+# (nome, função main, intervalo em minutos) - espelha o 'meus-jobs-cron'
+JOBS = [
+    ("relatorio", relatorio.main, 15),
+    ("relatoriojn", relatoriojn.main, 15),
+    ("treshold", treshold.main, 15),
+    ("status", status.main, 4),
+    ("optics_jn", optics_jn.main, 4),
+    ("tresholdjn", tresholdjn.main, 5),
+    ("particoes", particoes.main, 24 * 60),
+    ("agregacao", agregacao.main, 15),
+]
+
+# De quanto em quanto tempo (s) o agendador verifica os jobs
+TICK_SECONDS = 5
+
+
+async def run_job(name, job_main):
+    """Executa um job, sem deixar uma exceção derrubar o agendador."""
+    start_time = time.time()
+    print(f"\n[AGENDADOR] Iniciando job '{name}'...")
+    try:
+        await job_main()
+    except Exception:
+        print(f"[AGENDADOR] Job '{name}' terminou com erro:")
+        traceback.print_exc()
+    print(f"[AGENDADOR] Job '{name}' concluído em {time.time() - start_time:.2f}s "
+          f"(pool: {len(POOL)} sessões, {POOL.connects} logins, {POOL.reuses} reusos, "
+          f"~{POOL.total_saved:.1f}s de pausas fixas evitadas no total, "
+          f"{len(BREAKER.open_hosts())} hosts com circuito aberto).")
+
+
+async def main():
+    print(f"[AGENDADOR] Iniciando com {len(JOBS)} jobs.")
+    running = {}    # nome -> asyncio.Task
+    last_slot = {}  # nome -> último "slot" de minuto executado
+
+    try:
+        while True:
+            # Igual ao cron '*/N': dispara quando o minuto é múltiplo de N
+            current_minute = int(time.time() // 60)
+            for name, job_main, interval in JOBS:
+                slot = current_minute // interval
+                if current_minute % interval != 0 or last_slot.get(name) == slot:
+                    continue
+                last_slot[name] = slot
+
+                task = running.get(name)
+                if task is not None and not task.done():
+                    print(f"[AGENDADOR] Job '{name}' ainda em execução. Pulando este ciclo.")
+                    continue
+                running[name] = asyncio.create_task(run_job(name, job_main))
+
+            closed = POOL.prune_idle() + ASYNC_POOL.prune_idle()
+            if closed:
+                print(f"[AGENDADOR] {closed} sessões SSH ociosas/mortas fechadas.")
+
+            await asyncio.sleep(TICK_SECONDS)
+    finally:
+        POOL.close_all()
+        ASYNC_POOL.close_all()
+        PARSE_POOL.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Agregados por hora e por dia do histórico ('InterfaceStats' e
+'TransceiverReading'), para relatórios e dashboards de períodos longos não
+varrerem as linhas de 4-5 minutos.
+
+- InterfaceStats     -> InterfaceStatsHourly / InterfaceStatsDaily:
+  utilização de entrada/saída (média, máximo, p95) e incremento dos
+  contadores de erro no período.
+- TransceiverReading -> TransceiverReadingHourly / TransceiverReadingDaily:
+  rx/tx power (mínimo, média, máximo).
+
+Incremental: cada agregado guarda em 'RollupWatermark' até onde já foi
+calculado, e cada execução lê só o histórico a partir dali (as partições
+mensais fora do intervalo nem são abertas), até o último período fechado
+há pelo menos SETTLE. Na primeira execução começa do registro mais antigo.
+
+Cada período é gravado com INSERT ... ON CONFLICT DO UPDATE, em blocos de
+CHUNK, e a marca avança depois de cada bloco: se a execução cair no meio,
+a próxima recalcula o bloco e o resultado é o mesmo. Os dias são
+calculados do histórico (não das horas), porque o p95 do dia não sai dos
+p95 das horas. Horas e dias em UTC, como os timestamps gravados pelo Prisma.
+"""
+import asyncio
+import sys
+import time
+import traceback
+from datetime import datetime, timedelta, timezone
+
+from prisma import Prisma
+
+# --- 1. CONFIGURAÇÕES ---
+# Período fechado há menos que isso ainda pode receber linhas (inserts em voo)
+SETTLE = timedelta(minutes=2)
+
+# Histórico lido por comando (um dia: ~288 linhas por interface)
+CHUNK = timedelta(days=1)
+
+# Quanto antes do bloco procurar a leitura anterior de cada interface
+# (incremento dos contadores de erro na primeira linha do bloco)
+ERRORS_LOOKBACK = '1 hour'
+
+PERIODS = {'hour': timedelta(hours=1), 'day': timedelta(days=1)}
+
+# --- 2. CONSULTAS ---
+# $1/$2 = início/fim (exclusivo) do bloco, múltiplos do período
+STATS_ROLLUP_SQL = """
+INSERT INTO "{target}" (interface_id, bucket, samples,
+                        in_uti_avg, in_uti_max, in_uti_p95, out_uti_avg, out_uti_max, out_uti_p95,
+                        in_errors_delta, out_errors_delta)
+SELECT interface_id, date_trunc('{period}', "timestamp") AS bucket, count(*),
+       avg(in_uti), max(in_uti), percentile_cont(0.95) WITHIN GROUP (ORDER BY in_uti),
+       avg(out_uti), max(out_uti), percentile_cont(0.95) WITHIN GROUP (ORDER BY out_uti),
+       sum(in_errors_delta)::bigint, sum(out_errors_delta)::bigint
+FROM (
+    SELECT interface_id, "timestamp", in_uti, out_uti,
+           CASE WHEN lag(in_errors) OVER w IS NULL THEN NULL
+                WHEN in_errors >= lag(in_errors) OVER w THEN in_errors - lag(in_errors) OVER w
+                ELSE in_errors END AS in_errors_delta,
+           CASE WHEN lag(out_errors) OVER w IS NULL THEN NULL
+                WHEN out_errors >= lag(out_errors) OVER w THEN out_errors - lag(out_errors) OVER w
+                ELSE out_errors END AS out_errors_delta
+    FROM "InterfaceStats"
+    WHERE "timestamp" >= $1::timestamp - interval '{lookback}' AND "timestamp" < $2::timestamp
+    WINDOW w AS (PARTITION BY interface_id ORDER BY "timestamp")
+) AS history
+WHERE "timestamp" >= $1::timestamp
+GROUP BY interface_id, bucket
+ON CONFLICT (interface_id, bucket) DO UPDATE SET
+    samples = EXCLUDED.samples,
+    in_uti_avg = EXCLUDED.in_uti_avg, in_uti_max = EXCLUDED.in_uti_max, in_uti_p95 = EXCLUDED.in_uti_p95,
+    out_uti_avg = EXCLUDED.out_uti_avg, out_uti_max = EXCLUDED.out_uti_max, out_uti_p95 = EXCLUDED.out_uti_p95,
+    in_errors_delta = EXCLUDED.in_errors_delta, out_errors_delta = EXCLUDED.out_errors_delta
+"""
+
+READINGS_ROLLUP_SQL = """
+INSERT INTO "{target}" (interface_id, bucket, samples,
+                        rx_power_min, rx_power_avg, rx_power_max, tx_power_min, tx_power_avg, tx_power_max)
+SELECT interface_id, date_trunc('{period}', "timestamp") AS bucket, count(*),
+       min(rx_power), avg(rx_power), max(rx_power), min(tx_power), avg(tx_power), max(tx_power)
+FROM "TransceiverReading"
+WHERE "timestamp" >= $1::timestamp AND "timestamp" < $2::timestamp
+GROUP BY interface_id, bucket
+ON CONFLICT (interface_id, bucket) DO UPDATE SET
+    samples = EXCLUDED.samples,
+    rx_power_min = EXCLUDED.rx_power_min, rx_power_avg = EXCLUDED.rx_power_avg, rx_power_max = EXCLUDED.rx_power_max,
+    tx_power_min = EXCLUDED.tx_power_min, tx_power_avg = EXCLUDED.tx_power_avg, tx_power_max = EXCLUDED.tx_power_max
+"""
+
+# (agregado, tabela de origem no cliente, período, consulta)
+ROLLUPS = [
+    ('InterfaceStatsHourly', 'interfacestats', 'hour', STATS_ROLLUP_SQL),
+    ('InterfaceStatsDaily', 'interfacestats', 'day', STATS_ROLLUP_SQL),
+    ('TransceiverReadingHourly', 'transceiverreading', 'hour', READINGS_ROLLUP_SQL),
+    ('TransceiverReadingDaily', 'transceiverreading', 'day', READINGS_ROLLUP_SQL),
+]
+
+
+def floor_period(moment: datetime, period: str) -> datetime:
+    """Início da hora/dia de 'moment' (UTC, sem fuso, como o Postgres recebe)."""
+    moment = moment.astimezone(timezone.utc).replace(tzinfo=None) if moment.tzinfo else moment
+    if period == 'day':
+        return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+async def rollup_start(db, name: str, source: str, period: str):
+    """Onde o agregado parou (marca salva) ou, na primeira vez, o período do registro mais antigo."""
+    watermark = await db.rollupwatermark.find_unique(where={'name': name})
+    if watermark is not None:
+        return floor_period(watermark.processed_until, period)
+    first = await getattr(db, source).find_first(order_by={'timestamp': 'asc'})
+    return floor_period(first.timestamp, period) if first is not None else None
+
+
+async def run_rollup(db, name: str, source: str, period: str, sql: str, now: datetime) -> tuple:
+    """Calcula o agregado 'name' até o último período fechado. Retorna (períodos, linhas gravadas)."""
+    start = await rollup_start(db, name, source, period)
+    end = floor_period(now - SETTLE, period)
+    if start is None or start >= end:
+        return 0, 0
+
+    query = sql.format(target=name, period=period, lookback=ERRORS_LOOKBACK)
+    periods = (end - start) // PERIODS[period]
+    saved = 0
+    while start < end:
+        stop = min(start + CHUNK, end)
+        saved += await db.execute_raw(query, start.isoformat(), stop.isoformat())
+        await db.rollupwatermark.upsert(
+            where={'name': name},
+            data={'create': {'name': name, 'processed_until': stop.replace(tzinfo=timezone.utc)},
+                  'update': {'processed_until': stop.replace(tzinfo=timezone.utc)}}
+        )
+        start = stop
+    return periods, saved
+
+
+async def main():
+    db = Prisma()
+    await db.connect()
+    now = datetime.now(timezone.utc)
+
+    try:
+        for name, source, period, sql in ROLLUPS:
+            start_time = time.time()
+            try:
+                periods, saved = await run_rollup(db, name, source, period, sql, now)
+                print(f"[AGREGACAO] {name}: {periods} períodos novos, {saved} linhas gravadas "
+                      f"em {time.time() - start_time:.2f}s.")
+            except Exception as e:
+                print(f"     [ERRO-AGREGACAO] Falha no agregado '{name}': {e}")
+                traceback.print_exc(file=sys.stderr)
+    finally:
+        if db.is_connected():
+            await db.disconnect()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
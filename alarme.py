@@ -42,7 +42,8 @@ def send_ntfy_alert(device_name: str, interface_description: Optional[str], in_u
 async def check_latest_stats():
     """
     Busca o último registro de estatística de CADA interface no banco
-    e verifica se algum ultrapassou o limite.
+    ('LatestInterfaceStats', uma linha por interface, mantida pelos
+    coletores) e verifica se algum ultrapassou o limite.
     """
     
     db = Prisma()
@@ -52,17 +53,11 @@ async def check_latest_stats():
     
     try:
         
-        # --- AQUI ESTÁ A CORREÇÃO DEFINITIVA ---
-        # O TypeError sugere que 'order_by' como lista não é aceito com 'distinct'.
-        # A lógica correta é: ordenar *todos* os stats por timestamp (do mais novo para o mais velho)
-        # e então pegar o primeiro 'distinct' (único) de cada 'interface_id'.
-        
-        latest_stats = await db.interfacestats.find_many(
-            distinct=['interface_id'],
-            
-            # Simplificamos o order_by para apenas o que importa: o timestamp
-            order_by={'timestamp': 'desc'}, # <--- MUDANÇA PRINCIPAL
-            
+        # O último stat de cada interface já fica separado em 'LatestInterfaceStats'
+        # (os coletores regravam a linha a cada varredura). Antes isto era um
+        # 'distinct' sobre todo o histórico de 'InterfaceStats', ordenado por
+        # timestamp, que ficava mais lento a cada varredura gravada.
+        latest_stats = await db.latestinterfacestats.find_many(
             include={
                 'interface': {  # Inclui a interface pai
                     'include': {
@@ -80,7 +75,7 @@ async def check_latest_stats():
             
             # Pula se o stat não tiver uma interface ou device (órfão)
             if not latest_stat.interface or not latest_stat.interface.device:
-                print(f"Stat ID {latest_stat.id} sem interface/device. Pulando.")
+                print(f"Stat da interface ID {latest_stat.interface_id} sem interface/device. Pulando.")
                 continue
 
             # Pega os dados do device e da interface
@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+"""
+Benchmark do parser de blocos do 'show interfaces extensive' (tresholdjn.py).
+
+Compara a versão antiga de '_parse_single_interface_block' (~35 buscas regex
+MULTILINE por bloco, cada uma varrendo o bloco inteiro) com a de passada
+única ('_tokenize_extensive_block'). Os blocos vêm da captura
+'show-interface-extensive.txt' e, como ela não tem ópticos, de variantes
+dos blocos 'et-' com as seções 'Module:' / 'Transceiver diagnostic:'
+montadas a partir de 'show-interfaces-diagnostics-optics.txt':
+
+- no_diag:  só a seção 'Module:';
+- lanes:    'Module:' + diagnóstico multi-lane (QSFP) no fim da seção física;
+- sfp:      diagnóstico sem lanes (só a Lane 0) no fim do bloco;
+- sem_suporte: 'transceiver is not supported'.
+
+Os dois parsers precisam devolver exatamente os mesmos dados (o novo
+devolve records.InterfaceData, comparados pelo 'as_dict()').
+
+Uso: python bench_junos_extensive.py
+"""
+import contextlib
+import os
+import re
+import sys
+import time
+
+from simulador_ssh import EXTENSIVE_CAPTURE_FILE, OPTICS_CAPTURE_FILE, load_capture
+from stream_parser import BlockStreamParser
+from tresholdjn import _parse_single_interface_block, _parse_speed_to_bps
+
+# --- 1. CONFIGURAÇÕES ---
+REPEAT = 5
+# A versão nova precisa ser pelo menos isso mais rápida que a antiga
+MIN_SPEEDUP = 2.0
+
+HEADER_REGEX = r"^Physical interface:\s*([A-Za-z0-9-./]+)"
+
+MODULE_SECTION = (
+    "  Module:\n"
+    "    Vendor Name               : FINISAR CORP.\n"
+    "    Vendor P/N                : FTLC9558REPM\n"
+    "    Vendor S/N                : X7BA1QF\n"
+)
+
+
+# Versão antiga, mantida aqui só para comparação
+def _get_juniper_float(key_regex: str, text: str, target_unit_regex: str) -> float | None:
+    """
+    Helper para extrair um float de uma linha do Juniper,
+    priorizando a unidade alvo (ex: 'dBm' em vez de 'mW').
+    """
+    try:
+        line_match = re.search(r"^\s*" + key_regex + r"\s*:\s*(.*)$", text, re.MULTILINE)
+        if not line_match:
+            return None
+
+        content = line_match.group(1)
+
+        target_match = re.search(r"(-?[\d\.]+)\s*" + target_unit_regex, content)
+        if target_match:
+            return float(target_match.group(1))
+
+        first_float_match = re.search(r"(-?[\d\.]+)", content)
+        if first_float_match:
+            return float(first_float_match.group(1))
+
+    except (ValueError, TypeError, AttributeError):
+        pass
+    return None
+
+def _get_juniper_string(key_regex: str, text: str) -> str | None:
+    """Helper para extrair um string de uma linha do Juniper."""
+    try:
+        line_match = re.search(r"^\s*" + key_regex + r"\s*:\s*(.*)$", text, re.MULTILINE)
+        if line_match:
+            value = line_match.group(1).strip()
+            return value if value and value != "N/A" else None
+    except Exception:
+        pass
+    return None
+
+def _get_juniper_int(key_regex: str, text: str) -> int | None:
+    """Helper para extrair um inteiro de uma linha do Juniper."""
+    try:
+        line_match = re.search(r"^\s*" + key_regex + r"\s*:\s*([\d]+)", text, re.MULTILINE)
+        if line_match:
+            return int(line_match.group(1))
+    except (ValueError, TypeError, AttributeError):
+        pass
+    return 0 # Default para contadores de erro é 0
+
+def legacy_parse_block(output_text: str) -> dict | None:
+    """
+    Analisa um *único bloco* de 'show interfaces extensive' do JUNIPER.
+    Retorna um dicionário com todos os dados (status, stats, module, reading).
+    """
+
+    status_data = {}
+    stats_data = {}
+    module_data = {}
+    reading_data = {}
+
+    # --- 1. Status (Up/Down) ---
+    # Ex: Physical interface: et-0/0/9, Enabled, Physical link is Up
+    status_match = re.search(r"Enabled|Administratively down", output_text)
+    if status_match:
+        status_str = status_match.group(0)
+        status_data['protocol_status'] = 'up' if status_str == 'Enabled' else 'down'
+
+    link_match = re.search(r"Physical link is (Up|Down)", output_text)
+    if link_match:
+        status_data['physical_status'] = link_match.group(1).lower()
+
+    # --- 2. Estatísticas (Erros e Utilização) ---
+    # Extrai blocos de Erro
+    input_errors_text = ""
+    in_err_match = re.search(r"Input errors:([\s\S]*?)(?=^\s*Output errors:)", output_text, re.MULTILINE)
+    if in_err_match:
+        input_errors_text = in_err_match.group(1)
+
+    output_errors_text = ""
+    out_err_match = re.search(r"Output errors:([\s\S]*?)(?=^\s*Statistics last cleared:)", output_text, re.MULTILINE)
+    if out_err_match:
+        output_errors_text = out_err_match.group(1)
+
+    # Coleta de Erros
+    stats_data['in_errors'] = _get_juniper_int(r"Errors", input_errors_text)
+    stats_data['out_errors'] = _get_juniper_int(r"Errors", output_errors_text)
+    stats_data['in_crc_errors'] = _get_juniper_int(r"CRC/Align errors", input_errors_text) # Erro específico
+
+    # Cálculo de Utilização
+    try:
+        speed_str = _get_juniper_string(r"Speed", output_text)
+        port_speed_bps = _parse_speed_to_bps(speed_str)
+
+        in_bps_float = _get_juniper_float(r"Input  bytes", output_text, r"bps")
+        out_bps_float = _get_juniper_float(r"Output bytes", output_text, r"bps")
+        in_bps = int(in_bps_float) if in_bps_float is not None else None
+        out_bps = int(out_bps_float) if out_bps_float is not None else None
+
+
+        if port_speed_bps and port_speed_bps > 0 and in_bps is not None and out_bps is not None:
+            stats_data['in_uti'] = round((in_bps / port_speed_bps) * 100, 2)
+            stats_data['out_uti'] = round((out_bps / port_speed_bps) * 100, 2)
+        else:
+            # print(f"       [PARSE-STATS] Não foi possível calcular Uti%. Speed='{speed_str}', In='{in_bps}', Out='{out_bps}'")
+            stats_data['in_uti'] = 0.0
+            stats_data['out_uti'] = 0.0
+
+    except Exception as e:
+        print(f"       [ERRO-PARSE-STATS] Falha ao calcular Uti%: {e}")
+        stats_data['in_uti'] = 0.0
+        stats_data['out_uti'] = 0.0
+
+
+    # --- 3. Ópticos (Módulo e Leituras) ---
+    module_info_match = re.search(r"^\s*Module:([\s\S]*?)(?=^\s*\w)", output_text, re.MULTILINE)
+    diag_info_match = re.search(r"^\s*Transceiver diagnostic:([\s\S]*)", output_text, re.MULTILINE)
+
+    if not diag_info_match:
+        if "transceiver is not supported" in output_text: return None
+        if not module_info_match:
+             reading_data['transceiver_status'] = "absent"
+             module_data['serial_number'] = None
+        else:
+             reading_data['transceiver_status'] = "no_diag"
+             module_text = module_info_match.group(1)
+             module_data['serial_number'] = _get_juniper_string(r"Vendor S/N", module_text)
+             module_data['vendor_part_number'] = _get_juniper_string(r"Vendor P/N", module_text)
+             module_data['vendor_name'] = _get_juniper_string(r"Vendor Name", module_text)
+
+        return {"status": status_data, "stats": stats_data, "module": module_data, "reading": reading_data}
+
+    # SFP está presente e tem diagnóstico
+    reading_data['transceiver_status'] = "present"
+    diag_text = diag_info_match.group(1)
+
+    # Leituras Dinâmicas
+    reading_data['temperature'] = _get_juniper_float(r"Module temperature", diag_text, r"degrees C")
+    reading_data['voltage'] = _get_juniper_float(r"Module voltage", diag_text, r"V")
+
+    lane_text_block = diag_text
+    lane_0_match = re.search(r"^\s*Lane 0([\s\S]*?)(?=^\s*Lane 1|^\s*$)", diag_text, re.MULTILINE)
+    if lane_0_match:
+        lane_text_block = lane_0_match.group(1)
+
+    reading_data['bias_current'] = _get_juniper_float(r"Laser bias current", lane_text_block, r"mA")
+    reading_data['tx_power'] = _get_juniper_float(r"Laser output power", lane_text_block, r"dBm")
+    reading_data['rx_power'] = _get_juniper_float(r"Laser receiver power", lane_text_block, r"dBm")
+
+    # Thresholds (Estáticos)
+    module_data['temp_high'] = _get_juniper_float(r"Module temperature high alarm threshold", diag_text, r"degrees C")
+    module_data['temp_low'] = _get_juniper_float(r"Module temperature low alarm threshold", diag_text, r"degrees C")
+    module_data['temp_high_warning'] = _get_juniper_float(r"Module temperature high warning threshold", diag_text, r"degrees C")
+    module_data['temp_low_warning'] = _get_juniper_float(r"Module temperature low warning threshold", diag_text, r"degrees C")
+    module_data['volt_high'] = _get_juniper_float(r"Module voltage high alarm threshold", diag_text, r"V")
+    module_data['volt_low'] = _get_juniper_float(r"Module voltage low alarm threshold", diag_text, r"V")
+    module_data['volt_high_warning'] = _get_juniper_float(r"Module voltage high warning threshold", diag_text, r"V")
+    module_data['volt_low_warning'] = _get_juniper_float(r"Module voltage low warning threshold", diag_text, r"V")
+    module_data['bias_high'] = _get_juniper_float(r"Laser bias current high alarm threshold", diag_text, r"mA")
+    module_data['bias_low'] = _get_juniper_float(r"Laser bias current low alarm threshold", diag_text, r"mA")
+    module_data['bias_high_warning'] = _get_juniper_float(r"Laser bias current high warning threshold", diag_text, r"mA")
+    module_data['bias_low_warning'] = _get_juniper_float(r"Laser bias current low warning threshold", diag_text, r"mA")
+    module_data['tx_power_high'] = _get_juniper_float(r"Laser output power high alarm threshold", diag_text, r"dBm")
+    module_data['tx_power_low'] = _get_juniper_float(r"Laser output power low alarm threshold", diag_text, r"dBm")
+    module_data['tx_power_high_warning'] = _get_juniper_float(r"Laser output power high warning threshold", diag_text, r"dBm")
+    module_data['tx_power_low_warning'] = _get_juniper_float(r"Laser output power low warning threshold", diag_text, r"dBm")
+    module_data['rx_power_high'] = _get_juniper_float(r"Laser rx power high alarm threshold", diag_text, r"dBm")
+    module_data['rx_power_low'] = _get_juniper_float(r"Laser rx power low alarm threshold", diag_text, r"dBm")
+    module_data['rx_power_high_warning'] = _get_juniper_float(r"Laser rx power high warning threshold", diag_text, r"dBm")
+    module_data['rx_power_low_warning'] = _get_juniper_float(r"Laser rx power low warning threshold", diag_text, r"dBm")
+
+    # Dados Estáticos (Módulo)
+    if module_info_match:
+        module_text = module_info_match.group(1)
+        module_data['serial_number'] = _get_juniper_string(r"Vendor S/N", module_text)
+        module_data['vendor_part_number'] = _get_juniper_string(r"Vendor P/N", module_text)
+        module_data['vendor_name'] = _get_juniper_string(r"Vendor Name", module_text)
+        module_data['connector_type'] = _get_juniper_string(r"Connector", module_text)
+        module_data['wavelength_nm'] = _get_juniper_string(r"Wavelength", module_text)
+        if not module_data.get('vendor_part_number'):
+            module_data['transceiver_type'] = "Type Unknown"
+        else:
+             module_data['transceiver_type'] = module_data['vendor_part_number']
+
+    # Limpa valores nulos (None) dos dicionários
+    clean_status_data = {k: v for k, v in status_data.items() if v is not None}
+    clean_stats_data = {k: v for k, v in stats_data.items() if v is not None}
+    clean_module_data = {k: v for k, v in module_data.items() if v is not None}
+    clean_reading_data = {k: v for k, v in reading_data.items() if v is not None}
+
+    return {
+        "status": clean_status_data,
+        "stats": clean_stats_data,
+        "module": clean_module_data,
+        "reading": clean_reading_data
+    }
+
+
+# --- 2. BLOCOS DE TESTE ---
+
+def split_blocks(text, header_regex=HEADER_REGEX):
+    blocks = []
+    parser = BlockStreamParser(header_regex, lambda name, block: blocks.append((name, block)))
+    parser.feed(text)
+    parser.close()
+    return blocks
+
+
+def optics_bodies() -> list:
+    """Corpo (sem o cabeçalho) de cada interface de 'show interfaces diagnostics optics'."""
+    blocks = split_blocks(load_capture(OPTICS_CAPTURE_FILE))
+    return [block.split('\n', 1)[1] for _, block in blocks]
+
+
+def without_lanes(body: str) -> str:
+    """Diagnóstico de um SFP: as leituras da Lane 0 no nível do módulo, sem lanes."""
+    lines = []
+    lane = None
+    for line in body.splitlines(keepends=True):
+        if line.strip().startswith("Lane "):
+            lane = line.strip()
+            continue
+        if lane in (None, "Lane 0"):
+            lines.append(line)
+    return ''.join(lines)
+
+
+def insert_after_physical(block: str, section: str) -> str:
+    """Insere 'section' no fim da seção física (antes da primeira linha em branco)."""
+    head, blank, tail = block.partition('\n\n')
+    return head + '\n' + section.rstrip('\n') + blank + tail
+
+
+def build_blocks() -> list:
+    """[(variante, bloco)] com os blocos da captura e as variantes com ópticos."""
+    blocks = [("captura", block) for _, block in split_blocks(load_capture(EXTENSIVE_CAPTURE_FILE))]
+    bodies = optics_bodies()
+    ethernet = [block for name, block in split_blocks(load_capture(EXTENSIVE_CAPTURE_FILE)) if name.startswith('et-')]
+    for index, block in enumerate(ethernet):
+        body = bodies[index % len(bodies)]
+        diag = "  Transceiver diagnostic:\n" + body
+        blocks.append(("no_diag", insert_after_physical(block, MODULE_SECTION)))
+        blocks.append(("lanes", insert_after_physical(block, MODULE_SECTION + diag)))
+        blocks.append(("sfp", block + "  Transceiver diagnostic:\n" + without_lanes(body)))
+        blocks.append(("sem_suporte", block + "  Optics diagnostics: transceiver is not supported\n"))
+    return blocks
+
+
+# --- 3. EXECUÇÃO ---
+
+def same_result(legacy, parsed) -> bool:
+    """Dicionários do parser antigo x records.InterfaceData do novo (que não guarda campos None)."""
+    if legacy is None or parsed is None:
+        return legacy is parsed
+    clean = {part: {k: v for k, v in fields.items() if v is not None} for part, fields in legacy.items()}
+    return clean == parsed.as_dict()
+
+
+def best_time(parse, blocks):
+    best = float("inf")
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for _ in range(REPEAT):
+            start = time.perf_counter()
+            for _, block in blocks:
+                parse(block)
+            best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    blocks = build_blocks()
+    total_bytes = sum(len(block) for _, block in blocks)
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        mismatches = [(variant, block) for variant, block in blocks
+                      if not same_result(legacy_parse_block(block), _parse_single_interface_block(block))]
+    variants = {}
+    for variant, _ in blocks:
+        variants[variant] = variants.get(variant, 0) + 1
+    print(f"{len(blocks)} blocos ({', '.join(f'{n} {v}' for v, n in variants.items())}), {total_bytes / 1e6:.2f} MB.")
+    if mismatches:
+        variant, block = mismatches[0]
+        print(f"FALHOU: {len(mismatches)} blocos com resultado diferente. Primeiro ({variant}):\n{block}")
+        return 1
+
+    print(f"{'parser':<10} {'blocos':<8} {'s':>8} {'blocos/s':>10} {'MB/s':>8}")
+    speedups = {}
+    for label, subset in (("captura", [b for b in blocks if b[0] == "captura"]), ("todos", blocks)):
+        subset_bytes = sum(len(block) for _, block in subset)
+        legacy = best_time(legacy_parse_block, subset)
+        new = best_time(_parse_single_interface_block, subset)
+        for name, seconds in (("antigo", legacy), ("novo", new)):
+            print(f"{name:<10} {label:<8} {seconds:>8.4f} {len(subset) / seconds:>10.0f} {subset_bytes / 1e6 / seconds:>8.2f}")
+        speedups[label] = legacy / new
+
+    ok = min(speedups.values()) >= MIN_SPEEDUP
+    summary = ', '.join(f"{label} {speedup:.2f}x" for label, speedup in speedups.items())
+    print(f"\nGanho: {summary} -> {'OK' if ok else 'FALHOU'} (mínimo {MIN_SPEEDUP:.1f}x)")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Benchmark de vazão de todos os parsers, com trava contra regressão.
+
+Cada parser roda sobre as capturas reais do repositório:
+
+- relatorio.parse_output (Huawei 'display interface description'),
+  status.parse_interface_brief e treshold.parse_global_verbose_output:
+  uma saída por switch do log 'teste.txt', remontada no layout do VRP pelo
+  'simulador_ssh.py';
+- relatoriojn.parse_output: 'show interfaces descriptions' montado a partir
+  de 'show-interface-extensive.txt' (os hostnames são os do 'texte.txt');
+- tresholdjn.parse_global_extensive_output: 'show-interface-extensive.txt';
+- optics_jn.parse_optics_output: 'show-interfaces-diagnostics-optics.txt'.
+
+Para cada um mostra MB/s e interfaces/s (melhor de REPEAT rodadas) e
+compara com a linha de base (--baseline, por máquina, fora do git): se a
+vazão de algum parser cair mais que --tolerance, sai com código 1. Sem
+linha de base (ou sem a medida de algum parser nela) sai com código 2: a
+base só é gravada pedindo --record, então a trava nunca "passa" sozinha
+gravando os números de uma execução que já pode estar regredida.
+
+Uso:
+    python bench_parsers.py            # compara com a linha de base
+    python bench_parsers.py --record   # grava a execução atual como base
+"""
+import argparse
+import contextlib
+import importlib
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+
+from simulador_ssh import (EXTENSIVE_CAPTURE_FILE, OPTICS_CAPTURE_FILE, load_capture, load_huawei_profiles,
+                           render_huawei_brief, render_huawei_description, render_huawei_transceiver,
+                           render_junos_descriptions)
+
+# --- 1. CONFIGURAÇÕES ---
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(BASE_DIR, "bench_parsers_baseline.json")
+
+REPEAT = 10
+# Cada rodada repete as entradas até durar pelo menos isso (s)
+MIN_ROUND_SECONDS = 0.1
+# Queda máxima de MB/s aceita em relação à linha de base
+DEFAULT_TOLERANCE = 0.20
+# Semente das utilizações sorteadas do 'display interface brief'
+SEED = 1
+
+
+def huawei_descriptions():
+    return [render_huawei_description(profile) for profile in load_huawei_profiles()]
+
+
+def huawei_briefs():
+    rng = random.Random(SEED)
+    return [render_huawei_brief(profile, rng) for profile in load_huawei_profiles()]
+
+
+def huawei_transceivers():
+    return [render_huawei_transceiver(profile) for profile in load_huawei_profiles()]
+
+
+def junos_descriptions():
+    return [render_junos_descriptions(load_capture(EXTENSIVE_CAPTURE_FILE))]
+
+
+def junos_extensive():
+    return [load_capture(EXTENSIVE_CAPTURE_FILE)]
+
+
+def junos_optics():
+    return [load_capture(OPTICS_CAPTURE_FILE)]
+
+
+# (nome, módulo, função, entradas)
+PARSERS = [
+    ("relatorio.parse_output", "relatorio", "parse_output", huawei_descriptions),
+    ("relatoriojn.parse_output", "relatoriojn", "parse_output", junos_descriptions),
+    ("status.parse_interface_brief", "status", "parse_interface_brief", huawei_briefs),
+    ("treshold.parse_global_verbose_output", "treshold", "parse_global_verbose_output", huawei_transceivers),
+    ("tresholdjn.parse_global_extensive_output", "tresholdjn", "parse_global_extensive_output", junos_extensive),
+    ("optics_jn.parse_optics_output", "optics_jn", "parse_optics_output", junos_optics),
+]
+
+
+# --- 2. MEDIÇÃO ---
+
+def _time_passes(parse, outputs, passes) -> float:
+    start = time.perf_counter()
+    for _ in range(passes):
+        for output in outputs:
+            parse(output)
+    return (time.perf_counter() - start) / passes
+
+
+def run(selected) -> dict:
+    """
+    Melhor de REPEAT rodadas por parser. As rodadas são intercaladas (todos
+    os parsers na rodada 1, depois todos na 2...), para um pico de carga da
+    máquina não cair inteiro sobre um parser só.
+    """
+    cases = []
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for name, module_name, function_name, inputs in PARSERS:
+            if selected and name not in selected:
+                continue
+            parse = getattr(importlib.import_module(module_name), function_name)
+            outputs = inputs()
+            interfaces = sum(len(parse(output)) for output in outputs)
+            # Passadas por todas as saídas para uma rodada durar MIN_ROUND_SECONDS
+            passes = max(1, round(MIN_ROUND_SECONDS / max(_time_passes(parse, outputs, 1), 1e-6)))
+            cases.append((name, parse, outputs, interfaces, passes))
+
+        best = {name: float("inf") for name, *_ in cases}
+        for _ in range(REPEAT):
+            for name, parse, outputs, _, passes in cases:
+                best[name] = min(best[name], _time_passes(parse, outputs, passes))
+
+    results = {}
+    for name, _, outputs, interfaces, _ in cases:
+        total_bytes = sum(len(output) for output in outputs)
+        results[name] = {
+            'outputs': len(outputs),
+            'bytes': total_bytes,
+            'interfaces': interfaces,
+            'seconds': round(best[name], 6),
+            'mb_per_second': round(total_bytes / 1e6 / best[name], 3),
+            'interfaces_per_second': round(interfaces / best[name], 1),
+        }
+    return results
+
+
+# --- 3. LINHA DE BASE ---
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, cwd=BASE_DIR, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def save_baseline(path, results):
+    record = {
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'machine': platform.node(),
+        'saved_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'parsers': results,
+    }
+    with open(path, 'w') as f:
+        json.dump(record, f, indent=2, sort_keys=True)
+    print(f"\n[BENCH] Linha de base gravada em {path}.")
+
+
+def regressed(results, baseline, tolerance) -> list:
+    """Parsers cuja vazão caiu mais que 'tolerance' em relação à linha de base."""
+    return [name for name, result in results.items()
+            if name in baseline and result['mb_per_second'] / baseline[name]['mb_per_second'] - 1 < -tolerance]
+
+
+def print_table(results, baseline, regressions):
+    print(f"\n{'parser':<42} {'saídas':>6} {'ifaces':>7} {'MB/s':>8} {'ifaces/s':>10} {'base MB/s':>10} {'var':>7}")
+    for name, result in results.items():
+        base = baseline.get(name)
+        line = (f"{name:<42} {result['outputs']:>6} {result['interfaces']:>7} "
+                f"{result['mb_per_second']:>8.2f} {result['interfaces_per_second']:>10.0f}")
+        if base:
+            change = result['mb_per_second'] / base['mb_per_second'] - 1
+            line += f" {base['mb_per_second']:>10.2f} {change:>+7.1%}"
+            if name in regressions:
+                line += "  <- REGRESSÃO"
+            if result['interfaces'] != base['interfaces']:
+                line += f"  (interfaces: {base['interfaces']} -> {result['interfaces']})"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Vazão dos parsers sobre as capturas do repositório')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='Arquivo JSON da linha de base')
+    parser.add_argument('--record', '--save-baseline', dest='record', action='store_true',
+                        help='Grava esta execução como linha de base (em vez de comparar)')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='Queda máxima de MB/s aceita (0.20 = 20%%)')
+    parser.add_argument('--only', default='', help='Parsers a rodar, separados por vírgula (nomes da tabela)')
+    args = parser.parse_args()
+    selected = {name.strip() for name in args.only.split(',') if name.strip()}
+
+    if not args.record and not os.path.exists(args.baseline):
+        print(f"ERRO: linha de base {args.baseline} não encontrada. "
+              f"Grave uma com 'python bench_parsers.py --record' numa versão boa conhecida.")
+        return 2
+
+    results = run(selected)
+    if args.record:
+        print_table(results, {}, [])
+        save_baseline(args.baseline, results)
+        return 0
+
+    with open(args.baseline) as f:
+        record = json.load(f)
+    baseline = record.get('parsers', {})
+    if record.get('machine') != platform.node() or record.get('python') != platform.python_version():
+        print(f"[AVISO] Linha de base de outra máquina/Python ({record.get('machine')}, "
+              f"Python {record.get('python')}): a comparação pode não valer.")
+    missing = [name for name in results if name not in baseline]
+    if missing:
+        print(f"ERRO: sem medida na linha de base para: {', '.join(missing)}. "
+              f"Grave de novo com --record.")
+        return 2
+
+    regressions = regressed(results, baseline, args.tolerance)
+    if regressions:
+        # Uma queda pode ser só a máquina ocupada: mede de novo só esses
+        # parsers e fica com a melhor das duas medições antes de reprovar.
+        print(f"[BENCH] Medindo de novo: {', '.join(regressions)}")
+        for name, result in run(set(regressions)).items():
+            if result['mb_per_second'] > results[name]['mb_per_second']:
+                results[name] = result
+        regressions = regressed(results, baseline, args.tolerance)
+    print_table(results, baseline, regressions)
+
+    if regressions:
+        print(f"\nFALHOU: {len(regressions)} parser(s) mais de {args.tolerance:.0%} abaixo da linha de base "
+              f"(commit {record.get('commit')}): {', '.join(regressions)}")
+        return 1
+    print(f"\nOK: nenhum parser mais de {args.tolerance:.0%} abaixo da linha de base (commit {record.get('commit')}).")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark do acúmulo de saída SSH ('ssh_pool.OutputBuffer').
+
+Compara o loop antigo ('output += chunk' + 'output.strip().endswith(...)' a
+cada chunk) com o buffer em lista + janela de cauda, alimentando chunks de
+~1 KB da captura 'show-interface-extensive.txt' repetida 1x..16x.
+O custo por byte do buffer novo deve ficar plano conforme a saída cresce.
+
+Uso: python bench_ssh_buffer.py
+"""
+import os
+import sys
+import time
+
+from ssh_pool import OutputBuffer, PROMPT_ENDINGS
+
+# --- 1. CONFIGURAÇÕES ---
+CAPTURE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "show-interface-extensive.txt")
+CHUNK_SIZE = 1024
+SCALES = [1, 2, 4, 8, 16]
+PROMPT = "\nuser@MX-TESTE> "
+# Tolerância: o ns/byte no maior tamanho pode ser até 2x o do menor
+MAX_GROWTH = 2.0
+
+
+def make_chunks(text, scale):
+    data = text * scale + PROMPT
+    return [data[i:i + CHUNK_SIZE] for i in range(0, len(data), CHUNK_SIZE)]
+
+
+def legacy_read(chunks):
+    """Como era o loop de leitura antes do 'OutputBuffer'."""
+    output = ""
+    for chunk in chunks:
+        output += chunk
+        if output.strip().endswith(PROMPT_ENDINGS):
+            break
+    return output
+
+
+def buffer_read(chunks):
+    buffer = OutputBuffer()
+    for chunk in chunks:
+        buffer.append(chunk)
+        if buffer.done():
+            break
+    return buffer.getvalue()
+
+
+def ns_per_byte(reader, chunks, total_bytes, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        reader(chunks)
+        best = min(best, time.perf_counter_ns() - start)
+    return best / total_bytes
+
+
+def main():
+    with open(CAPTURE_FILE, encoding="latin-1") as f:
+        text = f.read()
+
+    print(f"{'escala':>6} {'bytes':>10} {'antigo ns/B':>12} {'buffer ns/B':>12}")
+    results = []
+    for scale in SCALES:
+        chunks = make_chunks(text, scale)
+        total_bytes = sum(len(c) for c in chunks)
+        assert buffer_read(chunks) == legacy_read(chunks)
+        legacy = ns_per_byte(legacy_read, chunks, total_bytes)
+        new = ns_per_byte(buffer_read, chunks, total_bytes)
+        results.append(new)
+        print(f"{scale:>6} {total_bytes:>10} {legacy:>12.2f} {new:>12.2f}")
+
+    growth = results[-1] / results[0]
+    ok = growth <= MAX_GROWTH
+    print(f"\nCrescimento do custo/byte do buffer ({SCALES[0]}x -> {SCALES[-1]}x): {growth:.2f}x "
+          f"-> {'OK' if ok else 'FALHOU'} (limite {MAX_GROWTH:.1f}x)")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
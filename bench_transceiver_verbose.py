@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Benchmark do parser de blocos do 'display transceiver verbose' (treshold.py).
+
+Compara a versão antiga de '_parse_single_interface_block' (uma busca regex
+MULTILINE por campo, ~25 varreduras do bloco) com o tokenizador de passada
+única. A saída bruta é remontada a partir do log 'teste.txt' (os dados de
+transceiver de cada switch, no layout do VRP - ver 'simulador_ssh.py') e os
+dois parsers precisam devolver exatamente os mesmos dados (o novo devolve
+records.InterfaceData, comparados pelo 'as_dict()').
+
+Uso: python bench_transceiver_verbose.py
+"""
+import contextlib
+import os
+import re
+import sys
+import time
+
+from simulador_ssh import load_huawei_profiles, render_huawei_transceiver
+from stream_parser import BlockStreamParser
+from treshold import VerboseStreamParser, _parse_single_interface_block
+
+# --- 1. CONFIGURAÇÕES ---
+REPEAT = 5
+# A versão nova precisa ser pelo menos isso mais rápida que a antiga
+MIN_SPEEDUP = 2.0
+
+
+# Versão antiga, mantida aqui só para comparação
+def legacy_parse_block(output_text: str) -> dict | None:
+    """
+    Analisa um *único bloco* de texto e retorna um dicionário
+    separado em 'module_data' (estático) e 'reading_data' (dinâmico).
+    """
+    
+    # Dicionários para os novos modelos
+    module_data = {}
+    reading_data = {}
+
+    # --- Nível 1: Verificar status principal ---
+    if "transceiver is absent" in output_text:
+        reading_data['transceiver_status'] = "absent"
+        print("       [PARSE-BLOCK] Status detectado: absent")
+        
+    elif "does not support diagnostic" in output_text:
+        reading_data['transceiver_status'] = "no_diag"
+        print("       [PARSE-BLOCK] Status detectado: no_diag")
+        
+    elif "This interface does not support transceiver" in output_text:
+        return None # Ignora interfaces lógicas
+    else:
+        reading_data['transceiver_status'] = "present"
+        print("       [PARSE-BLOCK] Status detectado: present (com diagnóstico)")
+
+    # --- Nível 2: Funções auxiliares de Regex (ancoradas) ---
+    def get_string(key_regex):
+        match = re.search(r"^\s+" + key_regex, output_text, re.MULTILINE)
+        if match:
+            value = match.group(1).strip()
+            return value if value != '-' else None
+        return None
+
+    def get_float(key_regex):
+        match = re.search(r"^\s+" + key_regex, output_text, re.MULTILINE)
+        if not match: return None
+        try:
+            val_match = re.search(r"(-?[\d.]+)", match.group(1))
+            return float(val_match.group(1)) if val_match else None
+        except (ValueError, TypeError, AttributeError):
+            return None
+            
+    def get_multilane_string(key_regex, stop_keyword):
+        regex = rf"^\s+{key_regex}\s*:\s*([\s\S]*?)(?=^\s+{stop_keyword}|^\s+-{{3,}})"
+        match = re.search(regex, output_text, re.MULTILINE)
+        if match:
+            return ' '.join(match.group(1).split())
+        return None
+
+    # ***** INÍCIO DA NOVA FUNÇÃO DE CORREÇÃO *****
+    def get_first_float_from_string(raw_string: str | None) -> float | None:
+        """
+        Tenta extrair o *primeiro* valor float de uma string.
+        Funciona para '33.50' e para '7.10|7.10(Lane0|Lane1)'.
+        """
+        if raw_string is None:
+            return None
+        
+        # Tenta encontrar o primeiro número (com decimal ou sinal negativo)
+        match = re.search(r"(-?[\d.]+)", raw_string)
+        if not match:
+            return None
+            
+        try:
+            return float(match.group(1))
+        except (ValueError, TypeError):
+            return None
+    # ***** FIM DA NOVA FUNÇÃO DE CORREÇÃO *****
+
+
+    # --- Nível 3: Mapear e Extrair Dados ---
+    
+    # Dados do Módulo (Estáticos)
+    module_data['transceiver_type'] = get_string(r"Transceiver Type\s*:\s*(.*)")
+    module_data['connector_type'] = get_string(r"Connector Type\s*:\s*(.*)")
+    module_data['wavelength_nm'] = get_string(r"Wavelength\(nm\)\s*:\s*(.*)")
+    module_data['transfer_distance_m'] = get_string(r"Transfer Distance\(m\)\s*:\s*(.*)")
+    module_data['vendor_part_number'] = get_string(r"Vendor Part Number\s*:\s*(.*)")
+    module_data['serial_number'] = get_string(r"Manu\. Serial Number\s*:\s*(.*)")
+    module_data['manufacturing_date'] = get_string(r"Manufacturing Date\s*:\s*(.*)")
+    
+    common_info_match = re.search(r"Common information:([\s\S]*?)(?:Manufacture information:|-{3,})", output_text, re.MULTILINE)
+    if common_info_match:
+        vendor_match = re.search(r"^\s+Vendor Name\s*:\s*(.*)", common_info_match.group(1), re.MULTILINE)
+        if vendor_match:
+            module_data['vendor_name'] = vendor_match.group(1).strip()
+            
+    # Dados de Leitura (Dinâmicos) e Thresholds (Estáticos)
+    if reading_data['transceiver_status'] == "present":
+        # Leituras (Dinâmicas)
+        reading_data['temperature'] = get_float(r"Temperature\(\S+\)\s*:\s*(.*)")
+        reading_data['voltage'] = get_float(r"Voltage\(V\)\s*:\s*(.*)")
+        
+        # ***** INÍCIO DA CORREÇÃO DE TIPO (String -> Float) *****
+        # Obtém a string bruta (que pode ser multi-lane)
+        bias_str = get_multilane_string(r"Bias Current\(mA\)", r"Bias High Threshold")
+        rx_str = get_multilane_string(r"RX Power\(dBM\)", r"RX Power High Warning")
+        tx_str = get_multilane_string(r"TX Power\(dBM\)", r"TX Power High Warning")
+
+        # Converte para float pegando apenas o primeiro valor
+        reading_data['bias_current'] = get_first_float_from_string(bias_str)
+        reading_data['rx_power'] = get_first_float_from_string(rx_str)
+        reading_data['tx_power'] = get_first_float_from_string(tx_str)
+        # ***** FIM DA CORREÇÃO DE TIPO *****
+        
+        # Thresholds (Estáticos, parte do Módulo)
+        module_data['temp_high'] = get_float(r"Temp High Threshold\(\S+\)\s*:\s*(.*)")
+        module_data['temp_low'] = get_float(r"Temp Low\s+Threshold\(\S+\)\s*:\s*(.*)")
+        module_data['volt_high'] = get_float(r"Volt High Threshold\(V\)\s*:\s*(.*)")
+        module_data['volt_low'] = get_float(r"Volt Low\s+Threshold\(V\)\s*:\s*(.*)")
+        module_data['bias_high'] = get_float(r"Bias High Threshold\(mA\)\s*:\s*(.*)")
+        module_data['bias_low'] = get_float(r"Bias Low\s+Threshold\(mA\)\s*:\s*(.*)")
+        module_data['rx_power_high'] = get_float(r"RX Power High Threshold\(dBM\)\s*:\s*(.*)")
+        module_data['rx_power_low'] = get_float(r"RX Power Low\s+Threshold\(dBM\)\s*:\s*(.*)")
+        module_data['tx_power_high'] = get_float(r"TX Power High Threshold\(dBM\)\s*:\s*(.*)")
+        module_data['tx_power_low'] = get_float(r"TX Power Low\s+Threshold\(dBM\)\s*:\s*(.*)")
+        module_data['rx_power_high_warning'] = get_float(r"RX Power High Warning\(dBM\)\s*:\s*(.*)")
+        module_data['rx_power_low_warning'] = get_float(r"RX Power Low\s+Warning\(dBM\)\s*:\s*(.*)")
+        module_data['tx_power_high_warning'] = get_float(r"TX Power High Warning\(dBM\)\s*:\s*(.*)")
+        module_data['tx_power_low_warning'] = get_float(r"TX Power Low\s+Warning\(dBM\)\s*:\s*(.*)")
+
+    # Limpa valores nulos (None) dos dicionários
+    clean_module_data = {k: v for k, v in module_data.items() if v is not None}
+    clean_reading_data = {k: v for k, v in reading_data.items() if v is not None}
+
+    print(f"       [PARSE-MOD] Dados Módulo: {clean_module_data}")
+    print(f"       [PARSE-READ] Dados Leitura: {clean_reading_data}")
+
+    return {
+        "module": clean_module_data,
+        "reading": clean_reading_data
+    }
+
+
+def split_blocks(text):
+    blocks = []
+    parser = BlockStreamParser(VerboseStreamParser.HEADER_REGEX, lambda name, block: blocks.append(block))
+    parser.feed(text)
+    parser.close()
+    return blocks
+
+
+def same_result(legacy, parsed) -> bool:
+    """Dicionários do parser antigo x records.InterfaceData do novo (que não guarda campos None)."""
+    if legacy is None or parsed is None:
+        return legacy is parsed
+    clean = {part: {k: v for k, v in fields.items() if v is not None} for part, fields in legacy.items()}
+    return clean == parsed.as_dict()
+
+
+def best_time(parse, blocks):
+    best = float("inf")
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for _ in range(REPEAT):
+            start = time.perf_counter()
+            for block in blocks:
+                parse(block)
+            best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    profiles = load_huawei_profiles()
+    text = "\n".join(render_huawei_transceiver(profile) for profile in profiles).replace("\r\n", "\n")
+    blocks = split_blocks(text)
+    total_bytes = sum(len(block) for block in blocks)
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        mismatches = [b for b in blocks if not same_result(legacy_parse_block(b), _parse_single_interface_block(b))]
+    print(f"{len(profiles)} switches do teste.txt, {len(blocks)} blocos, {total_bytes / 1e6:.2f} MB.")
+    if mismatches:
+        print(f"FALHOU: {len(mismatches)} blocos com resultado diferente. Primeiro:\n{mismatches[0]}")
+        return 1
+
+    legacy = best_time(legacy_parse_block, blocks)
+    new = best_time(_parse_single_interface_block, blocks)
+    print(f"{'parser':<10} {'s':>8} {'blocos/s':>10} {'MB/s':>8}")
+    for name, seconds in (("antigo", legacy), ("novo", new)):
+        print(f"{name:<10} {seconds:>8.4f} {len(blocks) / seconds:>10.0f} {total_bytes / 1e6 / seconds:>8.2f}")
+
+    speedup = legacy / new
+    ok = speedup >= MIN_SPEEDUP
+    print(f"\nGanho: {speedup:.2f}x -> {'OK' if ok else 'FALHOU'} (mínimo {MIN_SPEEDUP:.1f}x)")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
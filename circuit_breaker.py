@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Circuit breaker + cache negativo de dispositivos inalcançáveis.
+
+Um dispositivo fora do ar custava, em TODA execução, o timeout de conexão
+(10s) e às vezes o banner_timeout (200s), ocupando uma vaga de concorrência
+e esticando a varredura. Aqui cada host acumula as falhas seguidas de
+conexão (registradas pelos pools em 'ssh_pool' / 'ssh_async'):
+
+- até FAILURE_THRESHOLD falhas seguidas: nada muda (circuito FECHADO);
+- a partir daí o circuito ABRE: o host é pulado por BASE_BACKOFF segundos,
+  dobrando a cada nova falha, até MAX_BACKOFF;
+- vencida a espera (MEIO-ABERTO), antes de um SSH completo é feito só um
+  connect TCP na porta 22 (PROBE_TIMEOUT). Se o probe falhar, a espera
+  dobra de novo sem gastar um login; se passar, a coleta segue normalmente;
+- qualquer conexão SSH bem-sucedida fecha o circuito.
+
+O estado fica num arquivo JSON (STATE_FILE), então é compartilhado entre os
+jobs: no 'agendador.py' pela instância única BREAKER, e no modo cron (um
+processo por job) pelo arquivo, relido quando outro processo o altera.
+"""
+import asyncio
+import os
+import threading
+import time
+
+import json_state
+
+# --- 1. CONFIGURAÇÕES ---
+STATE_FILE = os.environ.get(
+    "BREAKER_STATE_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "circuit_breaker.json"),
+)
+
+# Falhas seguidas de conexão até o circuito abrir
+FAILURE_THRESHOLD = 3
+# Primeira espera (s) com o circuito aberto (um ciclo do status.py) e o teto
+BASE_BACKOFF = 4 * 60
+MAX_BACKOFF = 4 * 60 * 60
+# Probe TCP barato antes de voltar a tentar SSH
+PROBE_PORT = int(os.environ.get("SSH_PORT", 22))
+PROBE_TIMEOUT = 3.0
+
+
+class CircuitBreaker:
+    """Estado de falhas por host, persistido em STATE_FILE."""
+
+    def __init__(self, state_file=STATE_FILE):
+        self.state_file = state_file
+        self._lock = threading.Lock()   # Os pools síncronos registram de threads
+        self._state = {}                # host -> {failures, open_until, last_error, last_failure}
+        self._mtime = None
+        self.skipped = 0
+        self.probes = 0
+
+    # --- Consulta ---
+
+    async def allow(self, host) -> bool:
+        """
+        True se vale a pena tentar SSH em 'host' agora.
+        Com o circuito aberto e a espera vencida, faz antes o probe TCP.
+        """
+        with self._lock:
+            self._reload()
+            entry = self._state.get(host)
+        if entry is None or entry['failures'] < FAILURE_THRESHOLD:
+            return True
+
+        if time.time() < entry['open_until']:
+            self.skipped += 1
+            until = time.strftime('%H:%M:%S', time.localtime(entry['open_until']))
+            print(f"   [BREAKER] {host} com {entry['failures']} falhas seguidas ({entry['last_error']}). "
+                  f"Pulando até {until}.")
+            return False
+
+        self.probes += 1
+        if await probe(host):
+            print(f"   [BREAKER] {host} respondeu ao probe TCP. Tentando SSH novamente.")
+            return True
+
+        self.record_failure(host, 'probe')
+        self.skipped += 1
+        print(f"   [BREAKER] {host} não respondeu ao probe TCP. Pulando.")
+        return False
+
+    # --- Registro (chamado pelos pools SSH) ---
+
+    def record_success(self, host):
+        with self._lock:
+            self._reload()
+            if host not in self._state:
+                return  # Caso comum: nada a gravar
+            del self._state[host]
+            self._save(host)
+
+    def record_failure(self, host, kind):
+        with self._lock:
+            self._reload()
+            entry = self._state.setdefault(host, {'failures': 0, 'open_until': 0.0})
+            entry['failures'] += 1
+            entry['last_error'] = kind
+            entry['last_failure'] = time.time()
+            if entry['failures'] >= FAILURE_THRESHOLD:
+                backoff = min(MAX_BACKOFF, BASE_BACKOFF * 2 ** (entry['failures'] - FAILURE_THRESHOLD))
+                entry['open_until'] = time.time() + backoff
+            self._save(host)
+
+    def open_hosts(self) -> list:
+        """Hosts com o circuito aberto (para os resumos dos jobs)."""
+        with self._lock:
+            self._reload()
+            return sorted(h for h, e in self._state.items() if e['failures'] >= FAILURE_THRESHOLD)
+
+    # --- Persistência ---
+
+    def _reload(self):
+        """Relê o arquivo se outro processo (job do cron) o alterou."""
+        mtime = json_state.mtime(self.state_file)
+        if mtime is None or mtime == self._mtime:
+            return
+        self._state = json_state.load(self.state_file)
+        self._mtime = mtime
+
+    def _save(self, host):
+        """
+        Grava só a entrada de 'host' sobre o conteúdo ATUAL do arquivo,
+        para não apagar o que outro job gravou no meio-tempo.
+        """
+        def apply(on_disk):
+            if host in self._state:
+                on_disk[host] = self._state[host]
+            else:
+                on_disk.pop(host, None)
+
+        try:
+            self._state = json_state.update(self.state_file, apply)
+            self._mtime = json_state.mtime(self.state_file)
+        except OSError as e:
+            print(f"   [BREAKER] Não foi possível gravar {self.state_file}: {e}")
+
+
+async def probe(host, port=PROBE_PORT, timeout=PROBE_TIMEOUT) -> bool:
+    """Connect TCP simples: o host está de pé e a porta SSH aceita conexões?"""
+    try:
+        _, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    except (OSError, asyncio.TimeoutError):
+        return False
+    writer.close()
+    return True
+
+
+# Instância única do processo (compartilhada por todos os jobs do agendador)
+BREAKER = CircuitBreaker()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Limitador de concorrência adaptativo (AIMD) para as varreduras de dispositivos.
+
+Substitui o 'asyncio.Semaphore(MAX_CONCURRENT_TASKS)' fixo: o limite começa
+em MAX_CONCURRENT_TASKS e se ajusta sozinho durante a varredura.
+
+- Aumento aditivo: cada coleta bem-sucedida com login rápido soma +1 ao
+  limite até o primeiro sinal de congestionamento ("slow start") e depois
+  +1/limite (cerca de +1 a cada "janela" de coletas).
+- Redução multiplicativa: timeout, falha de autenticação (TACACS/RADIUS
+  sobrecarregado) ou login mais lento que LATENCY_TARGET cortam o limite
+  pela metade, no máximo uma vez a cada DECREASE_COOLDOWN segundos (várias
+  coletas em voo costumam falhar juntas pelo mesmo motivo).
+
+Falhas de conexão ('connect': recusada, sem rota) não reduzem o limite: são
+do dispositivo, não da rede ou do plano de controle.
+
+Os sinais vêm do 'DeviceTiming' dos pools SSH ('ssh_pool' / 'ssh_async').
+O limite final de cada job fica guardado e vira o ponto de partida do
+próximo ciclo quando os jobs rodam no 'agendador.py'.
+
+Uso:
+    limiter = AdaptiveLimiter("status", initial=MAX_CONCURRENT_TASKS)
+    async with limiter as slot:
+        ...coleta SSH...
+        slot.observe(POOL.timings.get(host))
+    print(limiter.summary())
+"""
+import asyncio
+import time
+
+# --- 1. CONFIGURAÇÕES ---
+# Login (handshake + autenticação) acima disso conta como congestionamento
+LATENCY_TARGET = 3.0
+# Intervalo mínimo (s) entre duas reduções seguidas
+DECREASE_COOLDOWN = 5.0
+# Fator da redução multiplicativa
+DECREASE_FACTOR = 0.5
+# Limites absolutos: mínimo e teto (teto = fator x valor inicial)
+MIN_CONCURRENCY = 2
+CEILING_FACTOR = 4
+
+# Erros que indicam sobrecarga (da rede ou do plano de controle)
+CONGESTION_ERRORS = ('timeout', 'auth')
+
+# Limite em que cada job terminou (warm start no próximo ciclo)
+_SETTLED = {}
+
+
+class _Slot:
+    """Uma vaga ocupada no limitador; 'observe' informa como foi a coleta."""
+
+    def __init__(self, limiter):
+        self.limiter = limiter
+        self.started = time.monotonic()
+
+    def observe(self, timing):
+        """
+        Lê o 'DeviceTiming' do dispositivo e alimenta o limitador.
+        Só valem sinais registrados depois que a vaga foi ocupada.
+        """
+        if timing is None:
+            return
+        if timing.error and timing.error_at >= self.started:
+            self.limiter.on_failure(timing.error)
+        elif timing.connected_at >= self.started:
+            self.limiter.on_success(timing.connect_seconds)
+        else:
+            # Sessão reaproveitada do pool: sucesso sem medida de login
+            self.limiter.on_success(None)
+
+
+class AdaptiveLimiter:
+    """Semáforo de tamanho variável, ajustado por AIMD."""
+
+    def __init__(self, name, initial, minimum=MIN_CONCURRENCY, maximum=None):
+        self.name = name
+        self.initial = initial
+        self.minimum = min(minimum, initial)
+        self.maximum = maximum or initial * CEILING_FACTOR
+        self.limit = float(_SETTLED.get(name, initial))
+        self.start = int(self.limit)
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.lowest = self.highest = self.limit
+        self.increases = 0
+        self.decreases = 0
+        self.failures = {}
+        self._slow_start = name not in _SETTLED
+        self._last_decrease = 0.0
+        self._condition = asyncio.Condition()
+
+    @property
+    def current(self) -> int:
+        return max(self.minimum, int(self.limit))
+
+    async def __aenter__(self) -> _Slot:
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < self.current)
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        return _Slot(self)
+
+    async def __aexit__(self, exc_type, exc, tb):
+        async with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    # --- Sinais ---
+
+    def on_success(self, connect_seconds):
+        if connect_seconds is not None and connect_seconds > LATENCY_TARGET:
+            self._decrease()
+            return
+        before = self.current
+        step = 1.0 if self._slow_start else 1.0 / max(self.limit, 1.0)
+        self.limit = min(float(self.maximum), self.limit + step)
+        self.highest = max(self.highest, self.limit)
+        if self.current > before:
+            # As vagas novas são usadas no próximo '__aexit__' (notify_all)
+            self.increases += 1
+
+    def on_failure(self, kind):
+        self.failures[kind] = self.failures.get(kind, 0) + 1
+        if kind in CONGESTION_ERRORS:
+            self._decrease()
+
+    def _decrease(self):
+        now = time.monotonic()
+        if now - self._last_decrease < DECREASE_COOLDOWN:
+            return
+        self._last_decrease = now
+        self._slow_start = False
+        self.limit = max(float(self.minimum), self.limit * DECREASE_FACTOR)
+        self.lowest = min(self.lowest, self.limit)
+        self.decreases += 1
+
+    # --- Relatório ---
+
+    def summary(self) -> str:
+        """Resumo do ajuste; também guarda o limite final para o próximo ciclo."""
+        _SETTLED[self.name] = self.current
+        failures = ", ".join(f"{kind}: {count}" for kind, count in sorted(self.failures.items())) or "nenhuma"
+        return (
+            f"Concorrência adaptativa '{self.name}': começou em {self.start}, "
+            f"estabilizou em {self.current} (faixa {max(self.minimum, int(self.lowest))}-{int(self.highest)}, "
+            f"pico de {self.peak_in_flight} em voo, {self.increases} aumentos, "
+            f"{self.decreases} reduções; falhas: {failures})."
+        )
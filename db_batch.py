@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Consultas e gravações em lote no banco.
+
+As interfaces de todos os dispositivos da varredura vêm numa consulta só
+('interfaces_by_device'), agrupadas por dispositivo em memória: antes cada
+coleta fazia o seu 'find_many' (N idas ao banco no começo da varredura, e
+cada coleta esperando o banco antes de abrir o SSH).
+
+Os coletores faziam um 'create' por interface em 'InterfaceStats' e
+'TransceiverReading': um roteador com 480 portas eram 480 idas e voltas ao
+banco, e a gravação de uma varredura dependia mais da latência do que do
+volume de dados. Agora o coletor junta as linhas do dispositivo e grava
+com 'create_many' (um INSERT com várias linhas), em lotes de BATCH_ROWS.
+
+Se um lote falhar, as linhas dele são gravadas uma a uma: uma linha ruim
+não leva as outras junto, e o log continua dizendo qual interface falhou.
+
+O status (up/down) em 'NetworkInterface' é regravado só quando muda: o
+coletor compara com o que veio do 'find_many' e as interfaces que mudaram
+vão em 'update_many', agrupadas pelo valor novo ('update_groups'). Quase
+todas as portas repetem o status da varredura anterior, e regravá-las só
+gerava versões mortas das linhas, WAL e inchaço dos índices.
+
+A troca de módulo é detectada pelo ponteiro NetworkInterface.current_module
+(um join pela chave), não mais pelo último registro do histórico de
+'TransceiverModule' de cada interface: 'create_current_module' grava o
+módulo novo e move o ponteiro na mesma transação.
+
+A última estatística de cada interface fica também em
+'LatestInterfaceStats' (uma linha por interface), para o 'alarme.py' não
+procurar o registro mais novo no histórico. O Prisma não tem upsert em
+lote, então 'upsert_latest_stats' usa um INSERT ... ON CONFLICT com várias
+linhas ('execute_raw').
+"""
+from datetime import datetime, timezone
+
+# --- 1. CONFIGURAÇÕES ---
+# Linhas por 'create_many'. O Postgres aceita até 32767 parâmetros por
+# comando; com ~7 colunas por linha, 1000 linhas ficam bem abaixo disso.
+BATCH_ROWS = 1000
+
+
+async def interfaces_by_device(db, devices, include: dict | None = None) -> dict:
+    """
+    Interfaces de todos os 'devices' num 'find_many' só, agrupadas por
+    device_id ({device_id: [NetworkInterface]}; lista vazia se não houver).
+    'include' é repassado ao find_many (ex: o módulo atual).
+    """
+    rows = await db.networkinterface.find_many(
+        where={'device_id': {'in': [dev.id for dev in devices]}},
+        include=include
+    )
+    grouped = {dev.id: [] for dev in devices}
+    for iface in rows:
+        grouped[iface.device_id].append(iface)
+    return grouped
+
+
+async def create_rows(table, rows: list, label: str) -> int:
+    """
+    Grava 'rows' (dicts 'data=' do Prisma, com o interface_id) em 'table'
+    (ex: db.interfacestats). 'label' vai nas mensagens de erro
+    ([ERRO-DB-<label>]). Retorna quantas linhas foram gravadas.
+    """
+    saved = 0
+    for start in range(0, len(rows), BATCH_ROWS):
+        batch = rows[start:start + BATCH_ROWS]
+        try:
+            saved += await table.create_many(data=batch)
+            continue
+        except Exception as e:
+            print(f"     [ERRO-DB-{label}] Falha no insert em lote ({len(batch)} linhas): {e}. Gravando uma a uma.")
+
+        for row in batch:
+            try:
+                await table.create(data=row)
+                saved += 1
+            except Exception as e:
+                print(f"     [ERRO-DB-{label}] Falha ao salvar linha da interface {row.get('interface_id')}: {e}")
+    return saved
+
+
+# Colunas de 'LatestInterfaceStats' gravadas por 'upsert_latest_stats' (fora o interface_id)
+LATEST_STATS_FIELDS = ('in_uti', 'out_uti', 'in_errors', 'out_errors')
+
+
+async def upsert_latest_stats(db, rows: list, swept_at: datetime | None = None) -> int:
+    """
+    Regrava a última estatística das interfaces de 'rows' (os mesmos dicts
+    do InterfaceStats, com o interface_id): um INSERT ... ON CONFLICT DO
+    UPDATE por BATCH_ROWS linhas. Campo ausente vira NULL. Retorna quantas
+    linhas foram gravadas.
+
+    O "timestamp" é 'swept_at' (padrão: agora), em UTC, passado como
+    parâmetro: o now() do SQL numa coluna sem fuso sairia no TimeZone da
+    sessão, e o Prisma grava os outros timestamps em UTC.
+    """
+    swept_at = (swept_at or datetime.now(timezone.utc)).astimezone(timezone.utc).replace(tzinfo=None)
+    columns = ('interface_id',) + LATEST_STATS_FIELDS
+    updates = ', '.join(f'{column} = EXCLUDED.{column}' for column in LATEST_STATS_FIELDS)
+    saved = 0
+    for start in range(0, len(rows), BATCH_ROWS):
+        batch = rows[start:start + BATCH_ROWS]
+        # $1 = timestamp da varredura; as colunas das linhas vêm depois
+        params = [swept_at.isoformat()] + [row.get(column) for row in batch for column in columns]
+        values = ', '.join(
+            '(' + ', '.join(f'${index * len(columns) + offset + 2}' for offset in range(len(columns))) + ', $1::timestamp)'
+            for index in range(len(batch))
+        )
+        query = (f'INSERT INTO "LatestInterfaceStats" ({", ".join(columns)}, "timestamp") VALUES {values} '
+                 f'ON CONFLICT (interface_id) DO UPDATE SET {updates}, "timestamp" = EXCLUDED."timestamp"')
+        try:
+            saved += await db.execute_raw(query, *params)
+        except Exception as e:
+            print(f"     [ERRO-DB-LATEST] Falha ao gravar a última estatística de {len(batch)} interfaces: {e}")
+    return saved
+
+
+async def create_current_module(db, interface_id: int, module_data: dict):
+    """
+    Registra um módulo novo no histórico ('TransceiverModule') e aponta o
+    current_module_id da interface para ele, numa transação só: se uma das
+    gravações falhar, nenhuma fica no banco (sem módulo órfão no histórico)
+    e a próxima varredura, que ainda vê o módulo anterior, tenta de novo.
+    """
+    async with db.tx() as tx:
+        module = await tx.transceivermodule.create(data={**module_data, 'interface_id': interface_id})
+        await tx.networkinterface.update(where={'id': interface_id}, data={'current_module_id': module.id})
+    return module
+
+
+async def update_groups(table, groups: dict, label: str) -> int:
+    """
+    Atualiza em lote as linhas que recebem os mesmos valores. 'groups' mapeia
+    tuple(data.items()) -> [ids]: um 'update_many' por grupo (e por BATCH_ROWS
+    ids). Retorna quantas linhas foram atualizadas.
+    """
+    updated = 0
+    for items, ids in groups.items():
+        for start in range(0, len(ids), BATCH_ROWS):
+            batch = ids[start:start + BATCH_ROWS]
+            try:
+                updated += await table.update_many(where={'id': {'in': batch}}, data=dict(items))
+            except Exception as e:
+                print(f"     [ERRO-DB-{label}] Falha ao atualizar {len(batch)} linhas para {dict(items)}: {e}")
+    return updated
+
+
+class StatusWrites:
+    """Contadores da varredura: status regravados x iguais aos do banco (pulados)."""
+
+    def __init__(self):
+        self.written = 0
+        self.skipped = 0
+
+    def record(self, written: int, skipped: int):
+        self.written += written
+        self.skipped += skipped
+
+    def summary(self) -> str:
+        return f"Status: {self.written} interfaces atualizadas, {self.skipped} sem mudança (não regravadas)."
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Custo aprendido por dispositivo e ordem de despacho "maior primeiro".
+
+O 'asyncio.gather' começava os dispositivos na ordem do 'find_many()': um MX
+grande, cujo 'show interfaces extensive' leva 60s, podia entrar por último e
+sozinho definir o tempo total da varredura. Aqui cada job guarda, por host,
+a média móvel (EWMA) dos tempos de conexão, comando e parsing, e a varredura
+seguinte despacha os dispositivos do MAIOR custo esperado para o menor
+(LPT - longest processing time first), o que encurta o makespan com o mesmo
+limite de concorrência.
+
+Dispositivos sem histórico vão na frente: o custo deles é desconhecido e a
+primeira coleta já serve para aprender.
+
+Estado em COSTS_FILE (JSON), compartilhado entre os jobs como o do
+'circuit_breaker.py': {job: {host: {connect, command, parse, samples}}}.
+"""
+import os
+import time
+
+import json_state
+
+# --- 1. CONFIGURAÇÕES ---
+COSTS_FILE = os.environ.get(
+    "DEVICE_COSTS_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "device_costs.json"),
+)
+
+# Peso da amostra nova na média móvel
+EWMA_ALPHA = 0.3
+
+STAGES = ('connect', 'command', 'parse')
+
+
+class DeviceCosts:
+    """Tempos por (job, host), aprendidos a cada varredura."""
+
+    def __init__(self, job, costs_file=COSTS_FILE):
+        self.job = job
+        self.costs_file = costs_file
+        self._costs = json_state.load(costs_file).get(job, {})
+        self._pending = {}  # host -> {etapa: segundos} desta varredura
+
+    def expected(self, host):
+        """Custo esperado (s) de um host, ou None se nunca foi coletado."""
+        entry = self._costs.get(host)
+        if entry is None:
+            return None
+        return sum(entry.get(stage, 0.0) for stage in STAGES)
+
+    def order(self, devices, host_of):
+        """
+        Devolve 'devices' do maior para o menor custo esperado.
+        'host_of(dev)' extrai o host (ex: lambda d: d.ip_address).
+        """
+        known = [dev for dev in devices if self.expected(host_of(dev)) is not None]
+        unknown = [dev for dev in devices if self.expected(host_of(dev)) is None]
+        known.sort(key=lambda dev: self.expected(host_of(dev)), reverse=True)
+
+        if known:
+            top = known[0]
+            print(f"[INFO] Despacho por custo: {len(known)} com histórico "
+                  f"(maior: {host_of(top)}, ~{self.expected(host_of(top)):.1f}s), {len(unknown)} sem histórico (primeiro).")
+        return unknown + known
+
+    def record(self, host, **seconds):
+        """Anota os tempos medidos de um host (connect=, command=, parse=)."""
+        pending = self._pending.setdefault(host, {})
+        for stage, value in seconds.items():
+            if stage in STAGES and value is not None:
+                pending[stage] = pending.get(stage, 0.0) + value
+
+    def record_ssh(self, host, timing, started, elapsed):
+        """
+        Separa o tempo da coleta SSH ('elapsed', medido a partir de 'started'
+        em time.monotonic()) em login - só se houve um nesta coleta, segundo
+        o 'DeviceTiming' do pool - e comando.
+        """
+        connect = 0.0
+        if timing is not None and timing.connect_seconds is not None and timing.connected_at >= started:
+            connect = timing.connect_seconds
+        self.record(host, connect=connect, command=max(0.0, elapsed - connect))
+
+    def save(self):
+        """Aplica as amostras desta varredura nas médias e grava o arquivo."""
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, {}
+
+        def apply(data):
+            job_costs = data.setdefault(self.job, {})
+            for host, sample in pending.items():
+                entry = job_costs.setdefault(host, {'samples': 0})
+                for stage, value in sample.items():
+                    previous = entry.get(stage)
+                    entry[stage] = round(value if previous is None
+                                         else EWMA_ALPHA * value + (1 - EWMA_ALPHA) * previous, 3)
+                entry['samples'] += 1
+                entry['updated_at'] = time.time()
+
+        try:
+            self._costs = json_state.update(self.costs_file, apply).get(self.job, {})
+            print(f"[INFO] Custos de {len(pending)} dispositivos salvos em {self.costs_file}.")
+        except OSError as e:
+            print(f"[ERRO] Não foi possível gravar {self.costs_file}: {e}")
@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""
+Gerador de saídas sintéticas de uma frota: N dispositivos x M portas.
+
+As capturas do repositório cobrem um dispositivo cada (48 portas Huawei,
+uma dúzia de interfaces Junos). Para ver como parsers e gravações no banco
+escalam com 10k-100k interfaces, aqui cada dispositivo ganha um perfil
+sintético, no mesmo formato dos perfis do 'simulador_ssh.py':
+
+    {'ports': [(nome, status, dados)], 'absent': [nome]}
+
+- 'status' é 'present', 'no_diag' ou 'absent' (nas proporções --absent /
+  --no-diag); leituras, limiares, fabricantes e seriais são sorteados;
+- Huawei: cartões de PORTS_PER_CARD portas (XGE, GE, 100GE, 40GE), com
+  'display interface description', 'display interface brief' e
+  'display transceiver verbose';
+- Junos: cartões 'et-' (100G, 4 lanes) e 'xe-' (10G), com
+  'show interfaces descriptions', 'show interfaces extensive' e
+  'show interfaces diagnostics optics'.
+
+As saídas são montadas pelos renderizadores do 'simulador_ssh.py' (o mesmo
+layout que os coletores analisam). Tudo sai da --seed: o mesmo dispositivo
+gera sempre o mesmo perfil, sem precisar guardar a frota em memória.
+
+Uso:
+    python gerador_frota.py --huawei 200 --ports 48 --output /tmp/frota   # grava os arquivos
+    python gerador_frota.py --huawei 200 --junos 50 --ports 96 --parse --memory
+
+Com --parse cada saída é gerada e analisada na hora pelo parser do coletor
+correspondente (tempo, interfaces/s e, com --memory, o pico de memória por
+saída). O 'simulador_ssh.py --ports M' serve os mesmos perfis via SSH.
+"""
+import argparse
+import contextlib
+import importlib
+import os
+import random
+import resource
+import sys
+import time
+import tracemalloc
+
+from simulador_ssh import (render_huawei_brief, render_huawei_description, render_huawei_transceiver,
+                           render_junos_extensive, render_junos_optics, render_junos_profile_descriptions)
+
+# --- 1. CONFIGURAÇÕES ---
+PORTS_PER_CARD = 48
+
+# Frações das portas sem módulo e com módulo sem diagnóstico (o resto tem DDM)
+ABSENT_RATIO = 0.25
+NO_DIAG_RATIO = 0.05
+# Fração das portas Junos desligadas ('Administratively down')
+ADMIN_DOWN_RATIO = 0.03
+# Fração dos módulos presentes sem luz na recepção (fibra rompida)
+NO_LIGHT_RATIO = 0.05
+
+# Tipo de porta de cada cartão, em ciclo
+HUAWEI_CARDS = ("XGigabitEthernet", "GigabitEthernet", "100GE", "40GE")
+# (prefixo, velocidade em Gbps, lanes do módulo)
+JUNOS_CARDS = (("et", 100, 4), ("xe", 10, 1))
+
+# (transceiver_type, connector_type, wavelength_nm, transfer_distance_m, vendor_name, vendor_part_number)
+HUAWEI_OPTICS = (
+    ("10GBASE_SR_SFP", "LC", "850", "33(OM1),82(OM2),300(OM3),400(OM4)", "FINISAR CORP.", "FTLX8571D3BCL"),
+    ("10GBASE_LR_SFP", "LC", "1310", "10000(9um)", "HUAWEI", "02310QDJ"),
+    ("10GBASE_LR_SFP", "LC", "1270", "20000(9um)", "CISCO-PRE", "PRESFP10G-B23-20"),
+    ("10GBASE_nER_SFP", "LC", "1558", "80000(9um)", "PRECISION", "PRESFP10G-D24-80"),
+    ("1000_BASE_LX_SFP", "LC", "1310", "10000(9um)", "OEM", "SFP-10-GD"),
+    ("1000BASE_BX20_SFP", "LC", "1550", "20000(9um)", "Mikrotik", "S-53LC20D"),
+    ("UNKNOWN_DWDM-SFP", "LC", "1550.12", "80000(9um)", "DATACOM", "GDP-34192-08C"),
+)
+# Módulos sem diagnóstico (cobre e DAC)
+HUAWEI_NO_DIAG_OPTICS = (
+    ("1000_BASE_T_SFP", None, None, "100(copper)", "OEM", "SFP S-RJ01 RJ45"),
+    ("1X_CopperPassive_SFP", "Copper Pigtail", None, "3(copper)", "UbiquitiNetworks", "UDC-3"),
+)
+
+# Conjuntos de limiares (alarmes e avisos), como os dos módulos do log
+THRESHOLDS = (
+    {'temp_high': 80.0, 'temp_low': -10.0, 'volt_high': 3.63, 'volt_low': 2.97, 'bias_high': 90.0, 'bias_low': 2.0,
+     'rx_power_high': 2.5, 'rx_power_low': -16.4, 'tx_power_high': 2.5, 'tx_power_low': -10.2,
+     'rx_power_high_warning': 0.5, 'rx_power_low_warning': -14.4, 'tx_power_high_warning': 0.5,
+     'tx_power_low_warning': -8.2},
+    {'temp_high': 75.0, 'temp_low': -5.0, 'volt_high': 3.6, 'volt_low': 3.0, 'bias_high': 15.0, 'bias_low': 1.0,
+     'rx_power_high': 0.0, 'rx_power_low': -12.1, 'tx_power_high': 0.0, 'tx_power_low': -8.3,
+     'rx_power_high_warning': -1.0, 'rx_power_low_warning': -11.1, 'tx_power_high_warning': -1.0,
+     'tx_power_low_warning': -7.3},
+    {'temp_high': 85.0, 'temp_low': -10.0, 'volt_high': 3.63, 'volt_low': 2.97, 'bias_high': 125.0, 'bias_low': 1.0,
+     'rx_power_high': -2.0, 'rx_power_low': -27.96, 'tx_power_high': 5.0, 'tx_power_low': -1.0,
+     'rx_power_high_warning': -5.0, 'rx_power_low_warning': -24.95, 'tx_power_high_warning': 4.0,
+     'tx_power_low_warning': 0.0},
+)
+
+# Parser do coletor de cada comando: (módulo, função)
+PARSERS = {
+    'display interface description': ('relatorio', 'parse_output'),
+    'display interface brief': ('status', 'parse_interface_brief'),
+    'display transceiver verbose': ('treshold', 'parse_global_verbose_output'),
+    'show interfaces descriptions': ('relatoriojn', 'parse_output'),
+    'show interfaces extensive': ('tresholdjn', 'parse_global_extensive_output'),
+    'show interfaces diagnostics optics': ('optics_jn', 'parse_optics_output'),
+}
+
+
+# --- 2. PERFIS SINTÉTICOS ---
+
+class FleetGenerator:
+    """Perfis de N dispositivos x M portas, reprodutíveis pela semente."""
+
+    def __init__(self, ports, seed=1, absent=ABSENT_RATIO, no_diag=NO_DIAG_RATIO):
+        self.ports = ports
+        self.seed = seed
+        self.absent = absent
+        self.no_diag = no_diag
+
+    def rng(self, vendor, index, purpose='profile') -> random.Random:
+        # Semente em texto: estável entre execuções (não depende do hash do processo)
+        return random.Random(f"{self.seed}:{vendor}:{index}:{purpose}")
+
+    def profile(self, vendor, index) -> dict:
+        return self.huawei_profile(index) if vendor == 'huawei' else self.junos_profile(index)
+
+    def _status(self, rng) -> str:
+        draw = rng.random()
+        if draw < self.absent:
+            return 'absent'
+        if draw < self.absent + self.no_diag:
+            return 'no_diag'
+        return 'present'
+
+    def huawei_profile(self, index) -> dict:
+        rng = self.rng('huawei', index)
+        profile = {'ports': [], 'absent': []}
+        for position in range(self.ports):
+            card, port = divmod(position, PORTS_PER_CARD)
+            name = f"{HUAWEI_CARDS[card % len(HUAWEI_CARDS)]}0/{card}/{port + 1}"
+            status = self._status(rng)
+            if status == 'absent':
+                # Ausentes sempre em bloco próprio: as linhas 'Info:' soltas no fim
+                # da saída o 'treshold.py' junta ao último bloco (que vira 'absent')
+                profile['ports'].append((name, status, {}))
+                continue
+            catalog = HUAWEI_OPTICS if status == 'present' else HUAWEI_NO_DIAG_OPTICS
+            kind, connector, wavelength, distance, vendor, part = rng.choice(catalog)
+            data = {
+                'transceiver_status': status,
+                'transceiver_type': kind,
+                'transfer_distance_m': distance,
+                'vendor_name': vendor,
+                'vendor_part_number': part,
+                'serial_number': _serial(rng),
+                'manufacturing_date': _manufacturing_date(rng),
+            }
+            if connector:
+                data['connector_type'] = connector
+            if wavelength:
+                data['wavelength_nm'] = wavelength
+            if status == 'present':
+                data.update(_readings(rng))
+            profile['ports'].append((name, status, data))
+        return profile
+
+    def junos_profile(self, index) -> dict:
+        rng = self.rng('junos', index)
+        profile = {'ports': []}
+        for position in range(self.ports):
+            card, port = divmod(position, PORTS_PER_CARD)
+            prefix, speed_gbps, lanes = JUNOS_CARDS[card % len(JUNOS_CARDS)]
+            name = f"{prefix}-0/{card}/{port}"
+            status = self._status(rng)
+            enabled = rng.random() >= ADMIN_DOWN_RATIO
+            data = {
+                'enabled': enabled,
+                'speed_gbps': speed_gbps,
+                'description': f"Cliente: SIM-{index + 1:04d}-{position + 1:03d}"
+                               if status != 'absent' and enabled else "",
+            }
+            if status == 'present':
+                readings = _readings(rng)
+                data.update(readings)
+                data['lanes'] = [
+                    (float(readings['bias_current']) + rng.uniform(-1, 1),
+                     float(readings['tx_power']) + rng.uniform(-0.3, 0.3),
+                     float(readings['rx_power']) + rng.uniform(-0.5, 0.5))
+                    for _ in range(lanes)
+                ]
+            profile['ports'].append((name, status, data))
+        return profile
+
+    def outputs(self, vendor, index) -> dict:
+        """{comando: saída} do dispositivo (contadores do brief/extensive sorteados à parte)."""
+        profile = self.profile(vendor, index)
+        rng = self.rng(vendor, index, 'counters')
+        if vendor == 'huawei':
+            return {
+                'display interface description': render_huawei_description(profile),
+                'display interface brief': render_huawei_brief(profile, rng),
+                'display transceiver verbose': render_huawei_transceiver(profile),
+            }
+        return {
+            'show interfaces descriptions': render_junos_profile_descriptions(profile),
+            'show interfaces extensive': render_junos_extensive(profile, rng),
+            'show interfaces diagnostics optics': render_junos_optics(profile),
+        }
+
+
+def _serial(rng) -> str:
+    return f"SIM{rng.randrange(10 ** 10):010d}"
+
+
+def _manufacturing_date(rng) -> str:
+    return f"{rng.randint(2010, 2025)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+
+
+def _readings(rng) -> dict:
+    """Leituras e limiares de um módulo com DDM (mesmas chaves do 'treshold.py')."""
+    thresholds = rng.choice(THRESHOLDS)
+    no_light = rng.random() < NO_LIGHT_RATIO
+    return {
+        'temperature': round(rng.uniform(20, 60), 2),
+        'voltage': round(rng.uniform(3.2, 3.4), 2),
+        'bias_current': f"{rng.uniform(5, 60):.2f}",
+        'tx_power': f"{rng.uniform(-6, 3):.2f}",
+        'rx_power': "-40.00" if no_light else f"{rng.uniform(-18, -1):.2f}",
+        **thresholds,
+    }
+
+
+# --- 3. EXECUÇÃO ---
+
+def devices(args):
+    """(vendor, índice, hostname) de toda a frota pedida."""
+    for index in range(args.huawei):
+        yield 'huawei', index, f"SW-SIM-{index + 1:04d}"
+    for index in range(args.junos):
+        yield 'junos', index, f"mx-sim-{index + 1:04d}"
+
+
+def write_outputs(fleet, args) -> int:
+    """Grava <output>/<hostname>/<comando>.txt. Retorna os bytes gravados."""
+    total = 0
+    for vendor, index, hostname in devices(args):
+        device_dir = os.path.join(args.output, hostname)
+        os.makedirs(device_dir, exist_ok=True)
+        for command, text in fleet.outputs(vendor, index).items():
+            with open(os.path.join(device_dir, command.replace(' ', '_') + '.txt'), 'w', encoding='latin-1') as f:
+                f.write(text)
+            total += len(text)
+    return total
+
+
+def parse_outputs(fleet, args) -> dict:
+    """
+    Gera e analisa uma saída por vez (a memória fica a de um dispositivo, não
+    a da frota). Com --memory, mede o pico do tracemalloc de cada parse.
+    """
+    results = {}
+    parsers = {command: getattr(importlib.import_module(module), function)
+               for command, (module, function) in PARSERS.items()}
+    if args.memory:
+        tracemalloc.start()
+    with open(os.devnull, 'w') as devnull:
+        for vendor, index, _ in devices(args):
+            for command, text in fleet.outputs(vendor, index).items():
+                result = results.setdefault(command, {'outputs': 0, 'bytes': 0, 'interfaces': 0,
+                                                      'seconds': 0.0, 'peak_bytes': 0})
+                if args.memory:
+                    tracemalloc.reset_peak()
+                    before = tracemalloc.get_traced_memory()[0]
+                with contextlib.redirect_stdout(devnull):
+                    start = time.perf_counter()
+                    parsed = parsers[command](text)
+                    result['seconds'] += time.perf_counter() - start
+                if args.memory:
+                    result['peak_bytes'] = max(result['peak_bytes'], tracemalloc.get_traced_memory()[1] - before)
+                result['outputs'] += 1
+                result['bytes'] += len(text)
+                result['interfaces'] += len(parsed)
+                del parsed
+    if args.memory:
+        tracemalloc.stop()
+    return results
+
+
+def print_table(results, memory):
+    print(f"\n{'parser':<42} {'saídas':>6} {'MB':>8} {'ifaces':>8} {'s':>8} {'ifaces/s':>10}"
+          + (f" {'pico MB':>8}" if memory else ""))
+    for command, result in results.items():
+        module, function = PARSERS[command]
+        seconds = max(result['seconds'], 1e-9)
+        line = (f"{module + '.' + function:<42} {result['outputs']:>6} {result['bytes'] / 1e6:>8.1f} "
+                f"{result['interfaces']:>8} {seconds:>8.2f} {result['interfaces'] / seconds:>10.0f}")
+        if memory:
+            line += f" {result['peak_bytes'] / 1e6:>8.2f}"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Saídas sintéticas de N dispositivos x M portas (Huawei e Junos)')
+    parser.add_argument('--huawei', type=int, default=10, help='Quantidade de dispositivos Huawei')
+    parser.add_argument('--junos', type=int, default=0, help='Quantidade de dispositivos Junos')
+    parser.add_argument('--ports', type=int, default=PORTS_PER_CARD, help='Portas por dispositivo')
+    parser.add_argument('--absent', type=float, default=ABSENT_RATIO, help='Fração das portas sem módulo')
+    parser.add_argument('--no-diag', type=float, default=NO_DIAG_RATIO, help='Fração dos módulos sem diagnóstico')
+    parser.add_argument('--seed', type=int, default=1, help='Semente da frota')
+    parser.add_argument('--output', help='Diretório onde gravar <hostname>/<comando>.txt')
+    parser.add_argument('--parse', action='store_true', help='Analisa cada saída com o parser do coletor')
+    parser.add_argument('--memory', action='store_true', help='Com --parse: pico de memória por saída (mais lento)')
+    args = parser.parse_args()
+    if not args.output and not args.parse:
+        parser.error('use --output DIR e/ou --parse')
+
+    fleet = FleetGenerator(args.ports, seed=args.seed, absent=args.absent, no_diag=args.no_diag)
+    interfaces = (args.huawei + args.junos) * args.ports
+    print(f"[FROTA] {args.huawei} Huawei + {args.junos} Junos x {args.ports} portas = {interfaces} interfaces.")
+
+    if args.output:
+        start = time.monotonic()
+        total = write_outputs(fleet, args)
+        print(f"[FROTA] {total / 1e6:.1f} MB gravados em {args.output} em {time.monotonic() - start:.1f}s.")
+
+    if args.parse:
+        start = time.monotonic()
+        results = parse_outputs(fleet, args)
+        print_table(results, args.memory)
+        max_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        print(f"\n[FROTA] Geração + parse em {time.monotonic() - start:.1f}s; pico de RSS do processo {max_rss_mb:.0f} MB.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Arquivos de estado JSON compartilhados entre jobs.
+
+No modo cron cada job é um processo, e vários podem gravar o mesmo arquivo
+ao mesmo tempo (ex: status.py e optics_jn.py a cada 4 min). 'update' relê o
+arquivo sob flock, aplica só a mudança de quem chama e troca o arquivo de
+forma atômica (tmp + os.replace), para um job não apagar o que o outro gravou.
+"""
+import fcntl
+import json
+import os
+
+
+def load(path) -> dict:
+    """Lê o estado; arquivo ausente ou corrompido vira {}."""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def mtime(path):
+    """mtime (ns) do arquivo, ou None se ele não existe."""
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def update(path, apply) -> dict:
+    """
+    Aplica 'apply(data)' (que altera o dict no lugar) sobre o conteúdo ATUAL
+    do arquivo, com lock exclusivo, e grava. Retorna o estado gravado.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path + '.lock', 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        data = load(path)
+        apply(data)
+        tmp_file = path + '.tmp'
+        with open(tmp_file, 'w') as f:
+            json.dump(data, f, indent=1, sort_keys=True)
+        os.replace(tmp_file, path)
+    return data
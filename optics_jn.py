@@ -1,5 +1,4 @@
 #!/usr/bin/env python3
-import paramiko
 import time
 import socket
 import re
@@ -7,6 +6,15 @@ import asyncio
 import pprint
 from prisma import Prisma
 from prisma.models import Device, NetworkInterface, TransceiverModule, TransceiverReading
+from ssh_pool import POOL
+import ssh_async
+from ssh_async import ASYNC_POOL
+from concurrency import AdaptiveLimiter
+from circuit_breaker import BREAKER
+from device_costs import DeviceCosts
+from stage_timing import TIMER
+import records
+from db_batch import create_current_module, create_rows, interfaces_by_device
 
 # --- 1. CONFIGURAÇÕES ---
 
@@ -18,6 +26,10 @@ SAVE_TO_DATABASE = True
 SSH_USERNAME = "zabbix.view"
 SSH_PASSWORD = "view@123"
 
+# True: SSH nativo do asyncio (asyncssh), sem 'asyncio.to_thread'.
+# Se o asyncssh não estiver instalado, volta sozinho para o modo com threads.
+USE_ASYNC_SSH = True
+
 
 
 # --- 2. LÓGICA DO SSH (REUTILIZADA - FUNCIONA) ---
@@ -33,12 +45,8 @@ def get_ssh_output(host, username, password, command):
     error_output = ""
     
     try:
-        client = paramiko.SSHClient()
-        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-        client.connect(
-            hostname=host, port=22, username=username, password=password,
-            look_for_keys=False, allow_agent=False, banner_timeout=200, timeout=10
-        )
+        # Reaproveita a conexão já autenticada do pool (se houver)
+        POOL.connect(host, username, password)
     except Exception as e:
         print(f"     [ERRO-SSH] Falha ao conectar SSH em {host}: {e}")
         return None
@@ -47,12 +55,16 @@ def get_ssh_output(host, username, password, command):
         COMMAND_TIMEOUT = 180.0 
         
         print(f"     [SSH-WAIT] Aguardando comando (Timeout global: {COMMAND_TIMEOUT}s)...")
-        stdin, stdout, stderr = client.exec_command(full_command, timeout=COMMAND_TIMEOUT)
+        # Canal 'exec' novo sobre o transporte compartilhado
+        clock = TIMER.read_clock()
+        stdin, stdout, stderr = POOL.exec_command(host, username, password, full_command, timeout=COMMAND_TIMEOUT)
         
-        output = stdout.read().decode('latin-1')
+        # O primeiro byte separa a espera pelo comando do tempo de leitura
+        first_byte = stdout.read(1)
+        clock.chunk()
+        output = (first_byte + stdout.read()).decode('latin-1')
         error_output = stderr.read().decode('latin-1')
-        
-        client.close()
+        clock.done()
         
         if error_output:
             print(f"     [WARN-SSH] {host} retornou um erro (stderr): {error_output[:100]}")
@@ -68,11 +80,54 @@ def get_ssh_output(host, username, password, command):
 
     except socket.timeout:
         print(f"     [ERRO-SSH] Timeout GLOBAL de {COMMAND_TIMEOUT}s atingido em {host}. O comando travou.")
-        if 'client' in locals() and client: client.close()
+        POOL.record_error(host, 'timeout')
+        POOL.discard(host, username)
         return None
     except Exception as e:
         print(f"     [ERRO-SSH] Erro durante a execução do comando SSH em {host}: {e}")
-        if 'client' in locals() and client: client.close()
+        POOL.discard(host, username)
+        return None
+
+async def get_ssh_output_async(host, username, password, command):
+    """
+    Mesma coleta de 'get_ssh_output', mas dentro do loop de eventos
+    (asyncssh): não ocupa uma thread por dispositivo e pode ser cancelada.
+    """
+    full_command = f"{command} | no-more"
+    
+    print(f"   -> [SSH-ASYNC] Executando em {host}: '{full_command[:45]}...'")
+    
+    try:
+        await ASYNC_POOL.connect(host, username, password)
+    except Exception as e:
+        print(f"     [ERRO-SSH] Falha ao conectar SSH em {host}: {e}")
+        return None
+    
+    COMMAND_TIMEOUT = 180.0 
+    try:
+        print(f"     [SSH-WAIT] Aguardando comando (Timeout global: {COMMAND_TIMEOUT}s)...")
+        output, error_output = await ASYNC_POOL.exec_command(host, username, password, full_command, timeout=COMMAND_TIMEOUT)
+        
+        if error_output:
+            print(f"     [WARN-SSH] {host} retornou um erro (stderr): {error_output[:100]}")
+            if "not found" in error_output or "error:" in error_output:
+                return None 
+                
+        if len(output.splitlines()) <= 3: 
+            print(f"     [WARN-SSH] Recebida resposta muito curta de {host} ({len(output.splitlines())} linhas).")
+            return ""
+        
+        print(f"     [SSH-OK] Coleta de {host} concluída com sucesso.")
+        return output
+
+    except asyncio.TimeoutError:
+        print(f"     [ERRO-SSH] Timeout GLOBAL de {COMMAND_TIMEOUT}s atingido em {host}. O comando travou.")
+        ASYNC_POOL.record_error(host, 'timeout')
+        ASYNC_POOL.discard(host, username)
+        return None
+    except Exception as e:
+        print(f"     [ERRO-SSH] Erro durante a execução do comando SSH em {host}: {e}")
+        ASYNC_POOL.discard(host, username)
         return None
 
 # --- 3. LÓGICA DE PARSING (NOVO PARSER ÓPTICO) ---
@@ -107,14 +162,18 @@ def _get_juniper_float(key_regex: str, text: str, target_unit_regex: str) -> flo
         pass
     return None
 
-def parse_optics_output(global_output_text: str) -> dict:
+def parse_optics_output(global_output_text: str, wanted: set | None = None) -> dict:
     """
     Analisa a saída completa de 'show interfaces diagnostics optics' e 
-    retorna um dicionário de dados (module, reading) por interface.
+    retorna um dicionário {interface: records.InterfaceData} (module, reading).
     
     Baseado no arquivo 'show-interfaces-diagnostics-optics.txt'
+
+    'wanted' (opcional): nomes (já normalizados) das interfaces que
+    interessam. Os outros blocos são pulados logo depois de ler o nome.
     """
     all_data = {}
+    skipped = 0
     
     # Divide a saída inteira em blocos, um para cada interface
     interface_blocks = re.split(r"^\s*Physical interface:\s*", global_output_text, flags=re.MULTILINE)
@@ -132,14 +191,17 @@ def parse_optics_output(global_output_text: str) -> dict:
                 continue
                 
             interface_name = _normalize_interface_name(name_match.group(1))
+            if wanted is not None and interface_name not in wanted:
+                skipped += 1
+                continue
             
-            module_data = {}
-            reading_data = {}
+            module_data = records.TransceiverModule()
+            reading_data = records.TransceiverReading()
 
             # --- 1. DADOS DINÂMICOS (Reading) ---
             # Estes dados estão no "topo" do bloco
-            reading_data['temperature'] = _get_juniper_float(r"Module temperature", block, r"degrees C")
-            reading_data['voltage'] = _get_juniper_float(r"Module voltage", block, r"V")
+            reading_data.temperature = _get_juniper_float(r"Module temperature", block, r"degrees C")
+            reading_data.voltage = _get_juniper_float(r"Module voltage", block, r"V")
             
             # Procura pelo bloco "Lane 0" para dados de Rx/Tx/Bias
             lane_text_block = block # Por padrão, usa o bloco todo
@@ -147,109 +209,116 @@ def parse_optics_output(global_output_text: str) -> dict:
             if lane_0_match:
                 lane_text_block = lane_0_match.group(1)
                 
-            reading_data['bias_current'] = _get_juniper_float(r"Laser bias current", lane_text_block, r"mA")
-            reading_data['tx_power'] = _get_juniper_float(r"Laser output power", lane_text_block, r"dBm")
-            reading_data['rx_power'] = _get_juniper_float(r"Laser receiver power", lane_text_block, r"dBm")
+            reading_data.bias_current = _get_juniper_float(r"Laser bias current", lane_text_block, r"mA")
+            reading_data.tx_power = _get_juniper_float(r"Laser output power", lane_text_block, r"dBm")
+            reading_data.rx_power = _get_juniper_float(r"Laser receiver power", lane_text_block, r"dBm")
 
             # --- 2. DADOS ESTÁTICOS (Module - Thresholds) ---
             # Esses dados também estão no "topo" do bloco
-            module_data['temp_high'] = _get_juniper_float(r"Module temperature high alarm threshold", block, r"degrees C")
-            module_data['temp_low'] = _get_juniper_float(r"Module temperature low alarm threshold", block, r"degrees C")
-            module_data['volt_high'] = _get_juniper_float(r"Module voltage high alarm threshold", block, r"V")
-            module_data['volt_low'] = _get_juniper_float(r"Module voltage low alarm threshold", block, r"V")
-            module_data['bias_high'] = _get_juniper_float(r"Laser bias current high alarm threshold", block, r"mA")
-            module_data['bias_low'] = _get_juniper_float(r"Laser bias current low alarm threshold", block, r"mA")
+            module_data.temp_high = _get_juniper_float(r"Module temperature high alarm threshold", block, r"degrees C")
+            module_data.temp_low = _get_juniper_float(r"Module temperature low alarm threshold", block, r"degrees C")
+            module_data.volt_high = _get_juniper_float(r"Module voltage high alarm threshold", block, r"V")
+            module_data.volt_low = _get_juniper_float(r"Module voltage low alarm threshold", block, r"V")
+            module_data.bias_high = _get_juniper_float(r"Laser bias current high alarm threshold", block, r"mA")
+            module_data.bias_low = _get_juniper_float(r"Laser bias current low alarm threshold", block, r"mA")
             
             # O parser _get_juniper_float vai priorizar o valor em 'dBm'
-            module_data['tx_power_high'] = _get_juniper_float(r"Laser output power high alarm threshold", block, r"dBm")
-            module_data['tx_power_low'] = _get_juniper_float(r"Laser output power low alarm threshold", block, r"dBm")
-            module_data['rx_power_high'] = _get_juniper_float(r"Laser rx power high alarm threshold", block, r"dBm")
-            module_data['rx_power_low'] = _get_juniper_float(r"Laser rx power low alarm threshold", block, r"dBm")
+            module_data.tx_power_high = _get_juniper_float(r"Laser output power high alarm threshold", block, r"dBm")
+            module_data.tx_power_low = _get_juniper_float(r"Laser output power low alarm threshold", block, r"dBm")
+            module_data.rx_power_high = _get_juniper_float(r"Laser rx power high alarm threshold", block, r"dBm")
+            module_data.rx_power_low = _get_juniper_float(r"Laser rx power low alarm threshold", block, r"dBm")
             
             # Limiares de Aviso (Warnings)
-            module_data['rx_power_high_warning'] = _get_juniper_float(r"Laser rx power high warning threshold", block, r"dBm")
-            module_data['rx_power_low_warning'] = _get_juniper_float(r"Laser rx power low warning threshold", block, r"dBm")
-            module_data['tx_power_high_warning'] = _get_juniper_float(r"Laser output power high warning threshold", block, r"dBm")
-            module_data['tx_power_low_warning'] = _get_juniper_float(r"Laser output power low warning threshold", block, r"dBm")
+            module_data.rx_power_high_warning = _get_juniper_float(r"Laser rx power high warning threshold", block, r"dBm")
+            module_data.rx_power_low_warning = _get_juniper_float(r"Laser rx power low warning threshold", block, r"dBm")
+            module_data.tx_power_high_warning = _get_juniper_float(r"Laser output power high warning threshold", block, r"dBm")
+            module_data.tx_power_low_warning = _get_juniper_float(r"Laser output power low warning threshold", block, r"dBm")
 
             # Define o status como 'present' se achamos dados
-            if reading_data['temperature'] or reading_data['rx_power']:
-                reading_data['transceiver_status'] = "present"
+            if reading_data.temperature or reading_data.rx_power:
+                reading_data.transceiver_status = "present"
             else:
-                 reading_data['transceiver_status'] = "no_diag" # Ou 'absent', mas esse comando só retorna dados se houver algo
+                 reading_data.transceiver_status = "no_diag" # Ou 'absent', mas esse comando só retorna dados se houver algo
 
-            # Limpa valores nulos (None) dos dicionários
-            clean_module_data = {k: v for k, v in module_data.items() if v is not None}
-            clean_reading_data = {k: v for k, v in reading_data.items() if v is not None}
-            
-            # Só adiciona se tivermos dados de leitura
-            if clean_reading_data:
-                all_data[interface_name] = {
-                    "module": clean_module_data, 
-                    "reading": clean_reading_data
-                }
+            # Sempre há leitura: no mínimo o transceiver_status
+            all_data[interface_name] = records.InterfaceData(module=module_data, reading=reading_data)
             
         except Exception as e:
             print(f"     [ERRO-PARSE] Erro fatal ao processar bloco para {interface_name}: {e}")
 
+    if skipped:
+        print(f"     [PARSE-GLOBAL] {skipped} blocos fora das interfaces monitoradas ignorados.")
     print(f"\n     [PARSE-GLOBAL] Análise concluída. {len(all_data)} interfaces com dados ópticos extraídos.")
     return all_data
 
 
 # --- 4. ORQUESTRAÇÃO (MAIN) ---
 
-async def process_device_monitoring(db: Prisma, dev: Device, semaphore: asyncio.Semaphore):
+async def process_device_monitoring(db: Prisma, dev: Device, db_interfaces: list, limiter: AdaptiveLimiter,
+                                    costs: DeviceCosts):
     """
     Processa um UNICO dispositivo: coleta, parseia e decide se salva ou printa.
+    'db_interfaces' (com o módulo atual) já vem do main(), numa consulta só
+    para toda a varredura.
     """
     
     # --- NOVO COMANDO ---
     COMMAND = "show interfaces diagnostics optics"
     
-    async with semaphore:
-        print(f"\n--- [DEV] Iniciando Processamento Óptico: {dev.hostname} (IP: {dev.ip_address}) ---")
+    if not db_interfaces:
+        print(f"   [INFO] Nenhuma interface encontrada para {dev.hostname} no DB. Pulando dispositivo.")
+        return
 
-        try:
-            # Pega as interfaces e o ÚLTIMO módulo salvo para comparar S/N
-            db_interfaces = await db.networkinterface.find_many(
-                where={'device_id': dev.id},
-                include={
-                    'modules': {
-                        'order_by': {'timestamp': 'desc'},
-                        'take': 1
-                    }
-                }
-            )
-            if not db_interfaces:
-                print(f"   [INFO] Nenhuma interface encontrada para {dev.hostname} no DB. Pulando dispositivo.")
-                return
-            print(f"   [INFO] Encontradas {len(db_interfaces)} interfaces no DB. Buscando dados ópticos...")
-        except Exception as e:
-            print(f"   [ERRO-DB] Falha ao buscar interfaces de {dev.hostname}: {e}")
-            return
+    # Circuit breaker: host com falhas seguidas de conexão é pulado sem
+    # ocupar vaga (ou testado só com um connect TCP) - ver 'circuit_breaker.py'
+    if not await BREAKER.allow(dev.ip_address):
+        return
+    
+    async with limiter as slot:
+        print(f"\n--- [DEV] Iniciando Processamento Óptico: {dev.hostname} (IP: {dev.ip_address}) ---")
+        print(f"   [INFO] Encontradas {len(db_interfaces)} interfaces no DB. Buscando dados ópticos...")
 
         raw_output = None
+        ssh_start = time.monotonic()
         try:
-            raw_output = await asyncio.to_thread(
-                get_ssh_output, 
-                dev.ip_address, 
-                SSH_USERNAME, 
-                SSH_PASSWORD, 
-                COMMAND
-            )
+            if USE_ASYNC_SSH and ssh_async.AVAILABLE:
+                # Direto no loop de eventos (sem thread)
+                raw_output = await get_ssh_output_async(
+                    dev.ip_address, SSH_USERNAME, SSH_PASSWORD, COMMAND
+                )
+            else:
+                raw_output = await asyncio.to_thread(
+                    get_ssh_output, 
+                    dev.ip_address, 
+                    SSH_USERNAME, 
+                    SSH_PASSWORD, 
+                    COMMAND
+                )
         except Exception as e:
             print(f"   [ERRO-THREAD] Erro ao executar get_ssh_output na thread para {dev.hostname}: {e}")
             return
         
+        # Sinais (latência do login, timeouts, falhas de auth) para o limitador
+        ssh_timing = (ASYNC_POOL if USE_ASYNC_SSH and ssh_async.AVAILABLE else POOL).timings.get(dev.ip_address)
+        slot.observe(ssh_timing)
+        
         if not raw_output:
             print(f"   [ERRO-SSH] Falha ao obter dados ópticos de {dev.ip_address} (saída vazia ou falha na conexão). Pulando dispositivo.")
             return
+        costs.record_ssh(dev.ip_address, ssh_timing, ssh_start, time.monotonic() - ssh_start)
 
+        parse_start = time.monotonic()
         try:
-            all_parsed_data = parse_optics_output(raw_output)
+            # Só as interfaces do banco passam pelo parsing
+            all_parsed_data = parse_optics_output(
+                raw_output, wanted={iface.interface_name for iface in db_interfaces}
+            )
         except Exception as e:
             print(f"   [ERRO-PARSE] Falha ao analisar dados ópticos de {dev.hostname}: {e}")
             return
+        parse_seconds = time.monotonic() - parse_start
+        TIMER.record('parse', parse_seconds)
+        costs.record(dev.ip_address, parse=parse_seconds)
 
         if not all_parsed_data:
             print(f"   [WARN] Parser não encontrou dados ópticos na saída de {dev.ip_address}.")
@@ -258,8 +327,10 @@ async def process_device_monitoring(db: Prisma, dev: Device, semaphore: asyncio.
         
         # --- PARTE 4: Salvar no DB ou Printar no Console ---
         
-        readings_salvas = 0
+        db_start = time.monotonic()
         modules_salvos = 0
+        # Leituras do dispositivo, gravadas em lote ('db_batch.py')
+        reading_rows = []
         
         # Dados para printar se SAVE_TO_DATABASE == False
         print_output_data = {}
@@ -275,44 +346,45 @@ async def process_device_monitoring(db: Prisma, dev: Device, semaphore: asyncio.
             iface = db_interface_map[iface_name]
             
             # Extrai os dados parseados
-            module_data = parsed_data.get('module', {})
-            reading_data = parsed_data.get('reading', {})
+            module_data = parsed_data.module.to_data()
+            reading_data = parsed_data.reading.to_data()
             
             if SAVE_TO_DATABASE:
                 # --- LÓGICA DE BANCO DE DADOS ATIVADA ---
                 
-                # 4a. Salva TransceiverReading (Temp, Rx, Tx)
-                try:
-                    if reading_data.get('transceiver_status'): # Só salva se tiver status
-                        reading_data['interface_id'] = iface.id
-                        await db.transceiverreading.create(data=reading_data)
-                        readings_salvas += 1
-                except Exception as e:
-                    print(f"     [ERRO-DB-READ] Falha ao salvar leitura de {iface.interface_name}: {e}")
+                # 4a. TransceiverReading (Temp, Rx, Tx): gravado em lote depois do loop
+                if reading_data.get('transceiver_status'): # Só salva se tiver status
+                    reading_data['interface_id'] = iface.id
+                    reading_rows.append(reading_data)
                 
                 # 4b. Salva TransceiverModule (S/N e Thresholds) - CONDICIONAL
-                # Nota: este comando NÃO pega S/N, então o S/N será 'None'
+                # Nota: este comando NÃO pega S/N, então o S/N será 'None'.
+                # Sem S/N não dá para saber se o módulo mudou: a troca fica com o
+                # 'tresholdjn.py', que lê o S/N. (Comparar 'None' com o S/N que o
+                # tresholdjn gravou criava um módulo novo a cada varredura, e o
+                # tresholdjn criava o verdadeiro de novo na seguinte.)
                 try:
-                    last_module = iface.modules[0] if iface.modules else None
+                    last_module = iface.current_module
                     last_serial = last_module.serial_number if last_module and last_module.serial_number else None
-                    new_serial = module_data.get('serial_number') # Será 'None'
+                    new_serial = parsed_data.module.serial_number # Será 'None'
 
-                    if new_serial != last_serial:
+                    if new_serial is not None and new_serial != last_serial:
                         print(f"     [SAVE-MODULE] *** Detecção de mudança de módulo em {iface.interface_name}! ***")
                         print(f"       S/N Antigo: {last_serial} -> S/N Novo: {new_serial}")
                         
-                        module_data['interface_id'] = iface.id
-                        await db.transceivermodule.create(data=module_data)
+                        await create_current_module(db, iface.id, module_data)
                         modules_salvos += 1
                 except Exception as e:
                     print(f"     [ERRO-DB-MODULE] Falha ao salvar módulo de {iface.interface_name}: {e}")
             
             else:
                 # --- LÓGICA DE PRINT NO CONSOLE ATIVADA ---
-                print_output_data[iface_name] = parsed_data
+                print_output_data[iface_name] = parsed_data.as_dict()
 
         # --- Resumo por dispositivo ---
         if SAVE_TO_DATABASE:
+            readings_salvas = await create_rows(db.transceiverreading, reading_rows, 'READ')
+            TIMER.record('db_write', time.monotonic() - db_start)
             print(f"\n--- [DEV] Concluído Processamento Óptico de {dev.hostname} (Modo: Salvar) ---")
             print(f"   - {readings_salvas} novas leituras de transceiver (Temp/Rx/Tx) salvas.")
             print(f"   - {modules_salvos} novos eventos de módulo (Thresholds) registrados.")
@@ -325,15 +397,20 @@ async def process_device_monitoring(db: Prisma, dev: Device, semaphore: asyncio.
 async def main():
     db = Prisma()
     
+    # Com USE_ASYNC_SSH não há uma thread por coleta: dá para subir bastante.
     MAX_CONCURRENT_TASKS = 20 
-    semaphore = asyncio.Semaphore(MAX_CONCURRENT_TASKS)
+    # Valor inicial: o limitador adaptativo ('concurrency.py') ajusta durante a varredura
+    limiter = AdaptiveLimiter("optics_jn", initial=MAX_CONCURRENT_TASKS)
+    # Custo aprendido por dispositivo: os mais demorados são despachados primeiro
+    costs = DeviceCosts("optics_jn")
     
     print("[INFO] Iniciando script de DADOS ÓPTICOS (Juniper)...")
     if SAVE_TO_DATABASE:
         print("[INFO] Modo: SALVAR NO BANCO DE DADOS")
     else:
         print("[INFO] Modo: EXIBIR NO CONSOLE (Nenhum dado será salvo)")
-    print(f"[INFO] Limite de {MAX_CONCURRENT_TASKS} coletas simultâneas.")
+    print(f"[INFO] Limite inicial de {limiter.current} coletas simultâneas (adaptativo).")
+    print(f"[INFO] SSH: {'asyncio nativo (asyncssh)' if USE_ASYNC_SSH and ssh_async.AVAILABLE else 'threads (paramiko)'}")
     
     start_total_time = time.time()
     
@@ -351,13 +428,19 @@ async def main():
             print("[ERRO] Nenhum dispositivo com 'os' == 'junos' encontrado no banco.")
             return
 
-        print(f"[INFO] Encontrados {len(devices)} dispositivos. Criando tarefas...")
+        # Interfaces de todos os dispositivos, com o módulo atual (para comparar
+        # o S/N), numa consulta só - não uma por coleta
+        print("[DB] Buscando interfaces de todos os dispositivos...")
+        interfaces = await interfaces_by_device(db, devices, include={'current_module': True})
+        print(f"[INFO] Encontrados {len(devices)} dispositivos e {sum(map(len, interfaces.values()))} interfaces. Criando tarefas...")
         
         tasks = []
-        for dev in devices:
-            tasks.append(process_device_monitoring(db, dev, semaphore))
+        for dev in costs.order(devices, lambda d: d.ip_address):
+            tasks.append(process_device_monitoring(db, dev, interfaces[dev.id], limiter, costs))
         
         await asyncio.gather(*tasks)
+        print(f"[INFO] {limiter.summary()}")
+        costs.save()
         
         end_total_time = time.time()
         
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Pool de processos para o parsing das saídas, fora do loop de eventos.
+
+Os coletores rodam num loop asyncio só: enquanto uma saída grande (ex: o
+'show interfaces extensive' de um roteador com centenas de portas) está
+sendo analisada, o loop não atende os outros dispositivos nem o banco, e o
+parsing de toda a frota fica preso a um núcleo (o GIL vale também para o
+'asyncio.to_thread').
+
+Aqui o parse vai para um ProcessPoolExecutor com um processo por núcleo
+(WORKERS). Para o envio compensar:
+
+- o coletor manda só o necessário (os blocos das interfaces do banco,
+  não a saída inteira) e a função devolve só as interfaces do banco;
+- saídas menores que MIN_POOL_BYTES são analisadas no próprio loop: para
+  elas o pickle de ida e volta custa mais que o parse.
+
+Saídas lidas em stream (o 'show interfaces extensive' do tresholdjn.py)
+vão ao pool aos pedaços de CHUNK_BYTES ('submit') enquanto a leitura
+continua: a memória por dispositivo fica limitada a um pedaço guardado mais
+os que estão no pool (o leitor espera quando já há WORKERS deles), não à
+saída inteira.
+
+O pool é criado no primeiro uso ('forkserver': os processos não herdam as
+threads do pool SSH síncrono) e dura enquanto o processo viver; no
+'agendador.py', entre todos os jobs. Com PARSE_WORKERS=0 tudo volta a ser
+analisado no loop.
+"""
+import asyncio
+import functools
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# --- 1. CONFIGURAÇÕES ---
+# Processos do pool (padrão: um por núcleo). 0 = parse no próprio loop.
+WORKERS = int(os.environ.get("PARSE_WORKERS", os.cpu_count() or 1))
+
+# Abaixo disso (bytes de entrada) o parse fica no loop
+MIN_POOL_BYTES = 64 * 1024
+
+# Quem despacha uma saída aos pedaços durante a leitura ('submit', ex: o
+# tresholdjn.py) manda um pedaço a cada CHUNK_BYTES guardados
+CHUNK_BYTES = 4 * MIN_POOL_BYTES
+
+
+class ParsePool:
+    """Executor de parsing compartilhado pelos coletores."""
+
+    def __init__(self, workers: int = WORKERS):
+        self.workers = workers
+        self._executor = None
+        self._executor_lock = threading.Lock()  # 'submit' pode vir de threads
+        self.dispatched = 0   # Parses enviados ao pool
+        self.inline = 0       # Parses feitos no loop (pequenos ou pool desligado)
+
+    async def run(self, size: int, func, *args):
+        """
+        'func(*args)' num processo do pool, ou no loop se 'size' (bytes da
+        entrada) for pequeno. 'func' precisa ser de nível de módulo (pickle).
+        """
+        if self.workers <= 0 or size < MIN_POOL_BYTES:
+            self.inline += 1
+            return func(*args)
+        self.dispatched += 1
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._get_executor(), functools.partial(func, *args))
+        except BrokenProcessPool:
+            # Um processo do pool morreu (ex: OOM): o executor não serve mais.
+            # Esta saída é analisada no loop e o pool é recriado no próximo uso.
+            print("     [PARSE-POOL] Pool de processos quebrado. Analisando no loop e recriando o pool.")
+            self._executor = None
+            self.inline += 1
+            return func(*args)
+
+    def submit(self, func, *args):
+        """
+        Manda 'func(*args)' ao pool SEM esperar e devolve o
+        concurrent.futures.Future (ou None com o pool desligado: quem chama
+        analisa no próprio loop). Pode ser chamado de qualquer thread, ex:
+        de dentro do 'feed' de um parser incremental, para ir despachando
+        pedaços enquanto a saída ainda chega. Espere com 'asyncio.wrap_future'.
+        """
+        if self.workers <= 0:
+            return None
+        for _ in range(2):
+            try:
+                future = self._get_executor().submit(func, *args)
+                self.dispatched += 1
+                return future
+            except BrokenProcessPool:
+                print("     [PARSE-POOL] Pool de processos quebrado. Recriando o pool.")
+                self._executor = None
+        return None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context('forkserver')
+                )
+            return self._executor
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    def summary(self) -> str:
+        if self.workers <= 0:
+            return f"Parse: pool de processos desligado (PARSE_WORKERS=0), {self.inline} no loop."
+        return (f"Parse: {self.dispatched} no pool de {self.workers} processos, "
+                f"{self.inline} no loop (< {MIN_POOL_BYTES // 1024} KB).")
+
+
+# Instância única do processo
+PARSE_POOL = ParsePool()
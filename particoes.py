@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Manutenção das partições mensais do histórico ('InterfaceStats' e
+'TransceiverReading', ver 'prisma/partition_history.sql').
+
+Roda uma vez por dia (agendador / cron):
+
+- cria as partições do mês atual e dos AHEAD_MONTHS seguintes, para o
+  INSERT dos coletores nunca cair na partição DEFAULT;
+- com RETENTION_MONTHS > 0, apaga os meses inteiros mais antigos que a
+  retenção com DROP TABLE (instantâneo, sem varrer nem inchar a tabela),
+  e as linhas antigas que tenham ficado na DEFAULT.
+"""
+import asyncio
+import os
+import sys
+import traceback
+from datetime import date, datetime, timezone
+
+from prisma import Prisma
+
+# --- 1. CONFIGURAÇÕES ---
+HISTORY_TABLES = ('InterfaceStats', 'TransceiverReading')
+
+# Schema das partições (fora do 'public' que o Prisma enxerga)
+PARTITION_SCHEMA = 'particoes'
+
+# Meses criados à frente do atual (o 'partition_history.sql' cria os mesmos 2)
+AHEAD_MONTHS = 2
+
+# Meses de histórico mantidos, contando o atual. 0 = manter tudo.
+RETENTION_MONTHS = int(os.environ.get("HISTORY_RETENTION_MONTHS", "0"))
+
+
+def add_months(day: date, months: int) -> date:
+    """Primeiro dia do mês 'months' meses depois (ou antes) do mês de 'day'."""
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+async def is_partitioned(db, table: str) -> bool:
+    rows = await db.query_raw(
+        "SELECT relkind::text AS relkind FROM pg_class WHERE oid = to_regclass($1)", f'"{table}"'
+    )
+    return bool(rows) and rows[0]['relkind'] == 'p'
+
+
+async def create_partitions(db, table: str, today: date) -> int:
+    """Partições do mês atual até AHEAD_MONTHS à frente. Retorna quantas foram criadas."""
+    rows = await db.query_raw(
+        "SELECT create_history_partitions($1, $2::date, $3::date) AS created",
+        table, today.isoformat(), add_months(today, AHEAD_MONTHS).isoformat()
+    )
+    return rows[0]['created']
+
+
+async def drop_old_partitions(db, table: str, cutoff: date) -> list:
+    """
+    Apaga as partições de meses anteriores a 'cutoff' (primeiro dia do mês
+    mais antigo mantido) e as linhas anteriores a ele na DEFAULT. Retorna
+    os nomes das partições apagadas.
+    """
+    rows = await db.query_raw(
+        "SELECT c.relname AS name FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = to_regclass($1)", f'"{table}"'
+    )
+    dropped = []
+    for row in rows:
+        # "<tabela>_AAAA_MM" ou "<tabela>_default"
+        suffix = row['name'][len(table) + 1:]
+        if suffix == 'default':
+            continue
+        year, month = map(int, suffix.split('_'))
+        if date(year, month, 1) < cutoff:
+            await db.execute_raw(f'DROP TABLE {PARTITION_SCHEMA}."{row["name"]}"')
+            dropped.append(row['name'])
+
+    default_rows = await db.execute_raw(
+        f'DELETE FROM {PARTITION_SCHEMA}."{table}_default" WHERE "timestamp" < $1::date', cutoff.isoformat()
+    )
+    if default_rows:
+        print(f"     [PARTICOES] {table}: {default_rows} linhas antigas apagadas da partição DEFAULT.")
+    return sorted(dropped)
+
+
+async def main():
+    db = Prisma()
+    await db.connect()
+    # Os timestamps são gravados em UTC: o "mês atual" também é o de UTC
+    # (com date.today(), perto da meia-noite o mês podia sair trocado)
+    today = datetime.now(timezone.utc).date()
+
+    try:
+        for table in HISTORY_TABLES:
+            if not await is_partitioned(db, table):
+                print(f"     [ERRO-PARTICOES] '{table}' não é particionada. "
+                      f"Rode 'prisma/partition_history.sql' (ver dockerfile).")
+                continue
+
+            try:
+                created = await create_partitions(db, table, today)
+                print(f"[PARTICOES] {table}: {created} partições novas (até {add_months(today, AHEAD_MONTHS):%Y-%m}).")
+
+                if RETENTION_MONTHS > 0:
+                    cutoff = add_months(today, 1 - RETENTION_MONTHS)
+                    dropped = await drop_old_partitions(db, table, cutoff)
+                    print(f"[PARTICOES] {table}: {len(dropped)} partições anteriores a {cutoff:%Y-%m} apagadas. "
+                          f"{', '.join(dropped)}")
+            except Exception as e:
+                print(f"     [ERRO-PARTICOES] Falha na manutenção de '{table}': {e}")
+                traceback.print_exc(file=sys.stderr)
+    finally:
+        if db.is_connected():
+            await db.disconnect()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
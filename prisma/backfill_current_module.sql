@@ -0,0 +1,16 @@
+-- Preenche NetworkInterface.current_module_id com o último TransceiverModule
+-- de cada interface (o que os coletores buscavam antes com
+-- order_by timestamp desc / take 1 a cada varredura).
+--
+-- Idempotente: só mexe nas interfaces ainda sem ponteiro. Roda no build,
+-- logo depois do 'prisma db push' (ver dockerfile); à mão:
+--   python -m prisma db execute --file prisma/backfill_current_module.sql --schema prisma/schema.prisma
+UPDATE "NetworkInterface" AS ni
+SET current_module_id = latest.id
+FROM (
+    SELECT DISTINCT ON (interface_id) id, interface_id
+    FROM "TransceiverModule"
+    ORDER BY interface_id, "timestamp" DESC, id DESC
+) AS latest
+WHERE latest.interface_id = ni.id
+  AND ni.current_module_id IS NULL;
@@ -0,0 +1,14 @@
+-- Preenche "LatestInterfaceStats" com o registro mais novo de cada interface
+-- no histórico de "InterfaceStats", para o 'alarme.py' ter dados antes da
+-- primeira varredura com a tabela nova.
+--
+-- Só roda com a tabela vazia (uma vez): depois disso os coletores a mantêm
+-- e o histórico inteiro não é varrido de novo a cada build. Roda logo depois
+-- do 'prisma db push' (ver dockerfile); à mão:
+--   python -m prisma db execute --file prisma/backfill_latest_stats.sql --schema prisma/schema.prisma
+INSERT INTO "LatestInterfaceStats" (interface_id, "timestamp", in_uti, out_uti, in_errors, out_errors)
+SELECT DISTINCT ON (interface_id) interface_id, "timestamp", in_uti, out_uti, in_errors, out_errors
+FROM "InterfaceStats"
+WHERE NOT EXISTS (SELECT 1 FROM "LatestInterfaceStats")
+ORDER BY interface_id, "timestamp" DESC, id DESC
+ON CONFLICT (interface_id) DO NOTHING;
@@ -0,0 +1,118 @@
+-- Particionamento por tempo do histórico: "InterfaceStats" e "TransceiverReading"
+-- viram tabelas particionadas por RANGE ("timestamp"), uma partição por mês.
+--
+-- Com isso o Postgres só lê as partições do intervalo pedido (partition
+-- pruning, automático quando a consulta filtra por "timestamp"), o INSERT
+-- dos coletores cai direto na partição do mês (sem mudança no código) e a
+-- retenção apaga meses inteiros com DROP TABLE ('particoes.py'), em vez de
+-- um DELETE que varre o histórico e deixa a tabela inchada.
+--
+-- As partições ficam no schema "particoes", fora do 'public' que o Prisma
+-- enxerga: o 'prisma db push' vê só as tabelas-pai e não tenta apagar as
+-- filhas. A tabela-pai sai com as mesmas colunas, tipos, defaults (id na
+-- mesma sequência), chave "<tabela>_pkey" (id, timestamp), índice
+-- "<tabela>_interface_id_timestamp_idx" e FK "<tabela>_interface_id_fkey"
+-- (CASCADE) que o 'db push' criou para o 'schema.prisma': conferido no
+-- catálogo do Postgres 16 antes e depois da conversão, idênticos. Assim o
+-- 'db push' dos próximos builds não tem diferença a aplicar na tabela-pai.
+--
+-- Idempotente: a conversão só roda se a tabela ainda não for particionada
+-- (num banco já particionado, rodar de novo só recria a função).
+-- Roda no build, logo depois do 'prisma db push' (ver dockerfile); à mão:
+--   python -m prisma db execute --file prisma/partition_history.sql --schema prisma/schema.prisma
+-- As partições dos próximos meses são criadas todo dia pelo 'particoes.py'.
+
+CREATE SCHEMA IF NOT EXISTS particoes;
+
+-- Cria as partições mensais de 'parent' de 'first_month' até 'last_month'
+-- (inclusive) que ainda não existem, com o nome "<parent>_AAAA_MM". Linhas do
+-- mês que tenham caído na partição DEFAULT (partição criada atrasada) são
+-- movidas para a partição nova. Retorna quantas partições foram criadas.
+CREATE OR REPLACE FUNCTION create_history_partitions(parent text, first_month date, last_month date)
+RETURNS integer
+LANGUAGE plpgsql AS $$
+DECLARE
+    month_start date := date_trunc('month', first_month);
+    month_end   date;
+    partition   text;
+    created     integer := 0;
+BEGIN
+    WHILE month_start <= last_month LOOP
+        month_end := month_start + interval '1 month';
+        partition := parent || '_' || to_char(month_start, 'YYYY_MM');
+
+        IF to_regclass(format('particoes.%I', partition)) IS NULL THEN
+            -- O CREATE falha se a DEFAULT tiver linhas do mês: elas saem antes
+            -- e voltam pelo pai, já na partição certa.
+            EXECUTE format('CREATE TEMP TABLE history_moved (LIKE %I) ON COMMIT DROP', parent);
+            IF to_regclass(format('particoes.%I', parent || '_default')) IS NOT NULL THEN
+                EXECUTE format(
+                    'WITH moved AS (DELETE FROM particoes.%I WHERE "timestamp" >= %L AND "timestamp" < %L RETURNING *) '
+                    'INSERT INTO history_moved SELECT * FROM moved',
+                    parent || '_default', month_start, month_end
+                );
+            END IF;
+            EXECUTE format(
+                'CREATE TABLE particoes.%I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+                partition, parent, month_start, month_end
+            );
+            EXECUTE format('INSERT INTO %I SELECT * FROM history_moved', parent);
+            DROP TABLE history_moved;
+            created := created + 1;
+        END IF;
+
+        month_start := month_end;
+    END LOOP;
+    RETURN created;
+END $$;
+
+-- Conversão das tabelas comuns (criadas pelo 'prisma db push') em particionadas.
+-- O bloco DO roda numa transação só: se algo falhar, a tabela antiga fica como estava.
+DO $$
+DECLARE
+    parent      text;
+    legacy      text;
+    first_month date;
+BEGIN
+    FOREACH parent IN ARRAY ARRAY['InterfaceStats', 'TransceiverReading'] LOOP
+        -- Já particionada ('p') ou inexistente: nada a fazer
+        CONTINUE WHEN (SELECT relkind FROM pg_class WHERE oid = to_regclass(format('%I', parent))) IS DISTINCT FROM 'r';
+
+        legacy := parent || '_legacy';
+        RAISE NOTICE 'Particionando "%" por mês', parent;
+
+        -- A tabela antiga sai do caminho (índices têm nome único no schema)
+        EXECUTE format('ALTER TABLE %I RENAME TO %I', parent, legacy);
+        EXECUTE format('ALTER INDEX %I RENAME TO %I', parent || '_pkey', legacy || '_pkey');
+        EXECUTE format('ALTER INDEX %I RENAME TO %I', parent || '_interface_id_timestamp_idx', legacy || '_interface_id_timestamp_idx');
+        EXECUTE format('ALTER TABLE %I DROP CONSTRAINT %I', legacy, parent || '_interface_id_fkey');
+
+        -- Tabela-pai com as mesmas colunas e defaults (o id continua na mesma
+        -- sequência). Os nomes da chave, do índice e da FK são os que o Prisma
+        -- gera para o 'schema.prisma'. A chave inclui o "timestamp": no
+        -- Postgres, a chave de uma tabela particionada precisa conter a coluna
+        -- de partição.
+        EXECUTE format('CREATE TABLE %I (LIKE %I INCLUDING DEFAULTS) PARTITION BY RANGE ("timestamp")', parent, legacy);
+        EXECUTE format('ALTER TABLE %I ADD CONSTRAINT %I PRIMARY KEY (id, "timestamp")', parent, parent || '_pkey');
+        EXECUTE format('CREATE INDEX %I ON %I (interface_id, "timestamp")', parent || '_interface_id_timestamp_idx', parent);
+        EXECUTE format(
+            'ALTER TABLE %I ADD CONSTRAINT %I FOREIGN KEY (interface_id) REFERENCES "NetworkInterface"(id) '
+            'ON DELETE CASCADE ON UPDATE CASCADE',
+            parent, parent || '_interface_id_fkey'
+        );
+
+        -- DEFAULT: recebe o que não tiver partição (se o 'particoes.py' parar de rodar)
+        EXECUTE format('CREATE TABLE particoes.%I PARTITION OF %I DEFAULT', parent || '_default', parent);
+
+        -- Um mês por partição, do registro mais antigo até dois meses à frente
+        -- (AHEAD_MONTHS do 'particoes.py')
+        EXECUTE format('SELECT date_trunc(''month'', min("timestamp"))::date FROM %I', legacy) INTO first_month;
+        -- (mês em UTC, como os timestamps gravados)
+        PERFORM create_history_partitions(parent, coalesce(first_month, (now() AT TIME ZONE 'UTC')::date),
+                                          ((now() AT TIME ZONE 'UTC') + interval '2 months')::date);
+
+        EXECUTE format('INSERT INTO %I SELECT * FROM %I', parent, legacy);
+        EXECUTE format('ALTER SEQUENCE %I OWNED BY %I.id', parent || '_id_seq', parent);
+        EXECUTE format('DROP TABLE %I', legacy);
+    END LOOP;
+END $$;
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Registros compactos dos dados analisados de cada interface.
+
+Os parsers devolviam, por interface, um dict de dicts
+({'status': {...}, 'stats': {...}, 'module': {...}, 'reading': {...}}),
+repetindo as mesmas chaves em milhares de dicts por varredura. Aqui cada
+parte é um objeto com __slots__ (sem __dict__ por instância), um por tabela
+do 'schema.prisma':
+
+- InterfaceStatus:    physical_status / protocol_status (NetworkInterface)
+- InterfaceStats:     utilização e erros (InterfaceStats)
+- TransceiverModule:  identificação e limiares do módulo (TransceiverModule)
+- TransceiverReading: status e leituras do transceiver (TransceiverReading)
+- InterfaceData:      as partes de uma interface (None = o comando não traz)
+
+Campos não extraídos ficam None. Os coletores gravam 'to_data()' (só os
+campos da tabela que têm valor, como os dicts "limpos" de antes);
+'as_dict()' devolve o formato antigo, para logs e comparações.
+"""
+
+
+class _Record:
+    __slots__ = ()
+    # Campos que existem na tabela (None = todos os __slots__). Os demais
+    # são extraídos pelo parser, mas só aparecem nos logs.
+    DB_FIELDS = None
+
+    def as_dict(self) -> dict:
+        """Campos com valor, no formato dos dicts que os parsers devolviam."""
+        return {name: value for name in self.__slots__ if (value := getattr(self, name)) is not None}
+
+    def to_data(self) -> dict:
+        """Campos da tabela com valor: o 'data=' do Prisma (sem o interface_id)."""
+        fields = self.__slots__ if self.DB_FIELDS is None else self.DB_FIELDS
+        return {name: value for name in fields if (value := getattr(self, name)) is not None}
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __repr__(self):
+        fields = ', '.join(f"{name}={value!r}" for name, value in self.as_dict().items())
+        return f"{type(self).__name__}({fields})"
+
+
+class InterfaceStatus(_Record):
+    __slots__ = ('physical_status', 'protocol_status')
+
+    def __init__(self, physical_status=None, protocol_status=None):
+        self.physical_status = physical_status
+        self.protocol_status = protocol_status
+
+
+class InterfaceStats(_Record):
+    __slots__ = ('in_uti', 'out_uti', 'in_errors', 'out_errors', 'in_crc_errors')
+    # in_crc_errors (Junos) não tem coluna em InterfaceStats
+    DB_FIELDS = ('in_uti', 'out_uti', 'in_errors', 'out_errors')
+
+    def __init__(self, in_uti=None, out_uti=None, in_errors=None, out_errors=None, in_crc_errors=None):
+        self.in_uti = in_uti
+        self.out_uti = out_uti
+        self.in_errors = in_errors
+        self.out_errors = out_errors
+        self.in_crc_errors = in_crc_errors
+
+
+class TransceiverModule(_Record):
+    __slots__ = (
+        'transceiver_type', 'connector_type', 'wavelength_nm', 'transfer_distance_m',
+        'vendor_name', 'vendor_part_number', 'serial_number', 'manufacturing_date',
+        'temp_high', 'temp_low', 'volt_high', 'volt_low', 'bias_high', 'bias_low',
+        'rx_power_high', 'rx_power_low', 'tx_power_high', 'tx_power_low',
+        'rx_power_high_warning', 'rx_power_low_warning', 'tx_power_high_warning', 'tx_power_low_warning',
+        # Avisos de temperatura/tensão/bias do Junos: sem coluna em TransceiverModule
+        'temp_high_warning', 'temp_low_warning', 'volt_high_warning', 'volt_low_warning',
+        'bias_high_warning', 'bias_low_warning',
+    )
+    # Colunas de TransceiverModule (os avisos de temp/volt/bias acima ficam de fora)
+    DB_FIELDS = (
+        'transceiver_type', 'connector_type', 'wavelength_nm', 'transfer_distance_m',
+        'vendor_name', 'vendor_part_number', 'serial_number', 'manufacturing_date',
+        'temp_high', 'temp_low', 'volt_high', 'volt_low', 'bias_high', 'bias_low',
+        'rx_power_high', 'rx_power_low', 'tx_power_high', 'tx_power_low',
+        'rx_power_high_warning', 'rx_power_low_warning', 'tx_power_high_warning', 'tx_power_low_warning',
+    )
+
+    def __init__(self, serial_number=None, vendor_name=None, vendor_part_number=None):
+        # Os demais campos são preenchidos um a um pelos parsers
+        self.transceiver_type = self.connector_type = self.wavelength_nm = self.transfer_distance_m = None
+        self.manufacturing_date = None
+        self.temp_high = self.temp_low = self.volt_high = self.volt_low = self.bias_high = self.bias_low = None
+        self.rx_power_high = self.rx_power_low = self.tx_power_high = self.tx_power_low = None
+        self.rx_power_high_warning = self.rx_power_low_warning = None
+        self.tx_power_high_warning = self.tx_power_low_warning = None
+        self.temp_high_warning = self.temp_low_warning = self.volt_high_warning = self.volt_low_warning = None
+        self.bias_high_warning = self.bias_low_warning = None
+        self.serial_number = serial_number
+        self.vendor_name = vendor_name
+        self.vendor_part_number = vendor_part_number
+
+
+class TransceiverReading(_Record):
+    __slots__ = ('transceiver_status', 'temperature', 'voltage', 'bias_current', 'rx_power', 'tx_power')
+
+    def __init__(self, transceiver_status=None, temperature=None, voltage=None,
+                 bias_current=None, rx_power=None, tx_power=None):
+        self.transceiver_status = transceiver_status
+        self.temperature = temperature
+        self.voltage = voltage
+        self.bias_current = bias_current
+        self.rx_power = rx_power
+        self.tx_power = tx_power
+
+
+class InterfaceData:
+    """Tudo o que um comando trouxe de uma interface."""
+    __slots__ = ('status', 'stats', 'module', 'reading')
+
+    def __init__(self, status=None, stats=None, module=None, reading=None):
+        self.status = status
+        self.stats = stats
+        self.module = module
+        self.reading = reading
+
+    def as_dict(self) -> dict:
+        """O formato antigo ({'module': {...}, 'reading': {...}}), só com as partes presentes."""
+        return {name: record.as_dict() for name in self.__slots__ if (record := getattr(self, name)) is not None}
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __repr__(self):
+        parts = ', '.join(f"{name}={record!r}" for name in self.__slots__ if (record := getattr(self, name)) is not None)
+        return f"InterfaceData({parts})"
@@ -1,6 +1,5 @@
 #!/usr/bin/env python3
 import requests
-import paramiko
 import time
 import socket
 import re
@@ -8,6 +7,11 @@ import pprint
 import asyncio  # <-- Importante para o Prisma
 from prisma import Prisma # <-- O novo cliente de banco de dados
 from prisma.models import Device, NetworkInterface
+from ssh_pool import POOL, PromptTimeout, HUAWEI_BATCH # <-- Pool de sessões SSH compartilhado
+from concurrency import AdaptiveLimiter # <-- Limite de simultaneidade adaptativo
+from circuit_breaker import BREAKER # <-- Pula hosts inalcançáveis (backoff)
+from device_costs import DeviceCosts # <-- Custo por device (maior primeiro)
+from stage_timing import TIMER # <-- Tempo por etapa (bench_coletores.py)
 
 # --- 1. CONFIGURAÇÕES ---
 # (As configs de banco de dados agora estão no arquivo .env)
@@ -69,81 +73,42 @@ def get_huawei_devices():
         return []
 
 # --- 3. LÓGICA DO SSH ---
-# (Esta função permanece IDÊNTICA)
+# (Usa o pool compartilhado de 'ssh_pool.py')
 def get_ssh_output(host, username, password, command):
     """
-    Conecta via SSH, executa um comando lendo até o prompt,
-    e só então envia 'quit'. Isso evita misturar saídas.
+    Executa um comando no shell do switch lendo até o prompt.
+    A conexão e o shell (com paginação desligada) vêm do pool
+    compartilhado, então o login só é feito na primeira vez.
     """
     print(f"   -> [SSH] Executando em {host}: '{command[:30]}...'")
     output = ""
     try:
-        client = paramiko.SSHClient()
-        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-        client.connect(
-            hostname=host, port=22, username=username, password=password,
-            look_for_keys=False, allow_agent=False, banner_timeout=200, timeout=10
-        )
+        # Reaproveita a conexão já autenticada do pool (se houver)
+        POOL.connect(host, username, password)
     except Exception as e:
         print(f"     [ERRO-SSH] Falha ao conectar SSH em {host}: {e}")
         return None
     
     try:
-        channel = client.invoke_shell()
-        # Aumentamos o timeout de leitura, pois esperamos o prompt
-        channel.settimeout(10.0) 
-
-        # 1. Limpa o banner inicial
-        time.sleep(1)
-        try: channel.recv(65535)
-        except socket.timeout: pass
-        
-        # 2. Desliga paginação
-        channel.send('screen-length 0 temporary\n')
-        time.sleep(0.5)
-        try: channel.recv(65535)
-        except socket.timeout: pass
-        
-        # 3. Envia o comando principal
-        channel.send(command + '\n')
+        # 1 a 4. O pool entrega o shell pronto (sem banner, sem paginação),
+        #    envia o comando e lê ATÉ VER O PROMPT, sem pausas fixas.
+        #    O lote HUAWEI_BATCH sai numa sessão só e fica em cache para
+        #    o treshold.py/status.py do mesmo ciclo.
+        try:
+            output = POOL.run_command(
+                host, username, password, command,
+                setup_commands=['screen-length 0 temporary'], timeout=20.0,
+                batch=HUAWEI_BATCH
+            )
+        except PromptTimeout as e:
+            print(f"     [ERRO-SSH] Timeout de 20s atingido esperando o comando em {host}")
+            output = e.output
         
-        # Damos um tempo para o comando executar e começar a cuspir dados
-        time.sleep(1.0) 
+        timing = POOL.timings[host]
+        print(f"     [SSH-TEMPO] {host}: {timing.elapsed:.2f}s de leitura, ~{timing.saved:.2f}s de pausas fixas evitadas.")
         
-        start_time = time.time() # Timeout para o loop de leitura
-        
-        # 4. Loop de leitura ATÉ VER O PROMPT
-        while True:
-            try:
-                if channel.recv_ready():
-                    chunk = channel.recv(65535)
-                    if not chunk:
-                        break # Canal fechou
-                    output += chunk.decode('latin-1')
-                    
-                    # VERIFICAÇÃO DO PROMPT:
-                    stripped_output = output.strip()
-                    if stripped_output.endswith('>') or stripped_output.endswith(']'):
-                        break
-                
-                if channel.exit_status_ready():
-                    break
-                
-                if time.time() - start_time > 20.0:
-                    print(f"     [ERRO-SSH] Timeout de 20s atingido esperando o comando em {host}")
-                    break
-                    
-                time.sleep(0.2) # Não sobrecarregar a CPU
-                
-            except socket.timeout:
-                 # Deu timeout de leitura (recv), mas o canal pode estar vivo
-                 # A verificação de start_time vai pegar o timeout real
-                pass
-        
-        # 5. Agora que lemos tudo, enviamos o QUIT
-        channel.send('quit\n')
-        time.sleep(0.5)
-        client.close()
+        # 5. Não enviamos mais o QUIT: o shell volta para o pool
+        #    e fica aberto para o próximo coletor/ciclo.
         
         # 6. Limpeza da Saída
         lines = output.splitlines()
@@ -161,8 +126,8 @@ def get_ssh_output(host, username, password, command):
 
     except Exception as e:
         print(f"     [ERRO-SSH] Erro durante a execução do comando SSH em {host}: {e}")
-        if 'client' in locals() and client:
-            client.close()
+        # Sessão em estado incerto: descarta do pool
+        POOL.discard(host, username)
         return None
 # --- 4. LÓGICA DE PARSING ---
 # (Esta função permanece IDÊNTICA)
@@ -313,20 +278,26 @@ async def sync_database(devices_from_api, interfaces_data_map):
             print("[DB] Desconectado do banco de dados.")
 # --- 6. ORQUESTRAÇÃO (NOVA VERSÃO - PARALELA) ---
 
-async def process_device_interfaces(dev: dict, semaphore: asyncio.Semaphore) -> tuple | None:
+async def process_device_interfaces(dev: dict, limiter: AdaptiveLimiter, costs: DeviceCosts) -> tuple | None:
     """
     Worker para coletar e parsear interfaces de UM dispositivo.
     Executa a coleta SSH (blocking) em uma thread separada.
     Retorna uma tupla (hostname, parsed_data) ou None.
     """
     
-    # 'async with semaphore' garante que apenas X tarefas executem ao mesmo tempo
-    async with semaphore:
+    # Circuit breaker: host com falhas seguidas de conexão é pulado sem
+    # ocupar vaga (ou testado só com um connect TCP) - ver 'circuit_breaker.py'
+    if not await BREAKER.allow(dev['ip']):
+        return None
+    
+    # 'async with limiter' garante que só 'limiter.current' tarefas executem ao mesmo tempo
+    async with limiter as slot:
         host = dev['ip'] 
         hostname = dev['hostname']
         print(f"\n--- [COLETA] Iniciando: {hostname} (IP: {host}) ---")
         
         raw_output = None
+        ssh_start = time.monotonic()
         try:
             # 1. Executa a função SÍNCRONA (blocking) em uma thread
             raw_output = await asyncio.to_thread(
@@ -340,9 +311,18 @@ async def process_device_interfaces(dev: dict, semaphore: asyncio.Semaphore) ->
             print(f"     [ERRO-THREAD] Erro ao executar get_ssh_output na thread para {hostname}: {e}")
             return None # Falha na coleta
 
+        # Sinais (latência do login, timeouts, falhas de auth) para o limitador
+        slot.observe(POOL.timings.get(host))
+        if raw_output:
+            costs.record_ssh(host, POOL.timings.get(host), ssh_start, time.monotonic() - ssh_start)
+
         # 2. Processa a saída
         if raw_output:
+            parse_start = time.monotonic()
             parsed_data = parse_output(raw_output)
+            parse_seconds = time.monotonic() - parse_start
+            TIMER.record('parse', parse_seconds)
+            costs.record(host, parse=parse_seconds)
             if parsed_data:
                 print(f"   [COLETA] Sucesso! Parseadas {len(parsed_data)} interfaces de {hostname}.")
                 return (hostname, parsed_data) # Retorna dados
@@ -357,14 +337,17 @@ async def process_device_interfaces(dev: dict, semaphore: asyncio.Semaphore) ->
 async def main():
     # ======================================================================
     # AQUI VOCÊ CONTROLA A SIMULTANEIDADE
-    # Quantas conexões SSH podem ser abertas ao mesmo tempo.
+    # Quantas conexões SSH podem ser abertas ao mesmo tempo NO INÍCIO: o
+    # limitador adaptativo ('concurrency.py') aumenta/reduz durante a varredura.
     MAX_CONCURRENT_TASKS = 30
     # ======================================================================
     
-    semaphore = asyncio.Semaphore(MAX_CONCURRENT_TASKS)
+    limiter = AdaptiveLimiter("relatorio", initial=MAX_CONCURRENT_TASKS)
+    # Custo aprendido por dispositivo: os mais demorados são despachados primeiro
+    costs = DeviceCosts("relatorio")
     start_time = time.time() # Medir tempo total
     
-    print(f"[INFO] Iniciando script de inventário (Paralelismo: {MAX_CONCURRENT_TASKS} devices)")
+    print(f"[INFO] Iniciando script de inventário (Paralelismo inicial: {limiter.current} devices, adaptativo)")
 
     # 1. Buscar dispositivos no LibreNMS (Síncrono, mas em thread)
     print("[INFO] Buscando dispositivos do LibreNMS (em thread)...")
@@ -384,12 +367,12 @@ async def main():
 
     # 2. Criar lista de tarefas de coleta (uma para cada device)
     tasks = []
-    for dev in devices:
-        tasks.append(process_device_interfaces(dev, semaphore))
+    for dev in costs.order(devices, lambda d: d['ip']):
+        tasks.append(process_device_interfaces(dev, limiter, costs))
 
     # 3. Executar todas as tarefas de coleta simultaneamente
     # O 'gather' vai rodar até que todas as tarefas na lista sejam concluídas.
-    # O Semáforo vai garantir que apenas MAX_CONCURRENT_TASKS rodem de fato.
+    # O limitador vai garantir que apenas 'limiter.current' rodem de fato.
     results = await asyncio.gather(*tasks)
 
     # 4. Processar os resultados da coleta
@@ -410,11 +393,15 @@ async def main():
 
     end_collection_time = time.time()
     print(f"\n--- [INFO] Coleta SSH concluída em {end_collection_time - start_time:.2f} segundos ---")
+    print(f"[INFO] {limiter.summary()}")
+    costs.save()
     
     # 5. Salvar tudo no banco de dados (Assíncrono)
     # Passamos APENAS os devices que tiveram coleta (para o sync_db não se perder)
     if interfaces_data_map:
-        await sync_database(devices_com_sucesso, interfaces_data_map)
+        # Tempo de gravação da sincronização inteira (ver 'stage_timing.py')
+        with TIMER.measure('db_write'):
+            await sync_database(devices_com_sucesso, interfaces_data_map)
     else:
         print("[INFO] Nenhum dado de interface foi coletado. Nada para salvar no banco.")
 
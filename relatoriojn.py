@@ -1,6 +1,5 @@
 #!/usr/bin/env python3
 import requests
-import paramiko
 import time
 import socket
 import re
@@ -8,6 +7,11 @@ import pprint
 import asyncio  # <-- Importante para o Prisma
 from prisma import Prisma # <-- O novo cliente de banco de dados
 from prisma.models import Device, NetworkInterface
+from ssh_pool import POOL, PromptTimeout
+from concurrency import AdaptiveLimiter
+from circuit_breaker import BREAKER
+from device_costs import DeviceCosts
+from stage_timing import TIMER
 
 # --- 1. CONFIGURAÇÕES ---
 
@@ -71,73 +75,32 @@ def get_juniper_devices():
 
 def get_ssh_output(host, username, password, command):
     """
-    Conecta via SSH, executa um comando (Junos) e lê a saída.
+    Executa um comando (Junos) no shell do pool compartilhado e lê a saída.
     """
     print(f"   -> [SSH] Executando em {host}: '{command[:30]}...'")
     output = ""
     try:
-        client = paramiko.SSHClient()
-        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-        client.connect(
-            hostname=host, port=22, username=username, password=password,
-            look_for_keys=False, allow_agent=False, banner_timeout=200, timeout=10
-        )
+        POOL.connect(host, username, password)
     except Exception as e:
         print(f"     [ERRO-SSH] Falha ao conectar SSH em {host}: {e}")
         return None
     
     try:
-        channel = client.invoke_shell()
-        channel.settimeout(10.0) 
-
-        # 1. Limpa o banner inicial
-        time.sleep(1)
-        try: channel.recv(65535)
-        except socket.timeout: pass
-        
-        # 2. Desliga paginação (Comando Juniper)
-        channel.send('set cli screen-length 0\n')
-        time.sleep(0.5)
-        try: channel.recv(65535)
-        except socket.timeout: pass
-        
-        # 3. Envia o comando principal
-        channel.send(command + '\n')
-        
-        time.sleep(1.0) 
-        
-        start_time = time.time() # Timeout para o loop de leitura
+        # 1 a 4. Shell do pool (paginação já desligada, Comando Juniper),
+        #    leitura ATÉ VER O PROMPT ('>' ou ']') sem pausas fixas
+        try:
+            output = POOL.run_command(
+                host, username, password, command,
+                setup_commands=['set cli screen-length 0'], timeout=20.0
+            )
+        except PromptTimeout as e:
+            print(f"     [ERRO-SSH] Timeout de 20s atingido esperando o comando em {host}")
+            output = e.output
         
-        # 4. Loop de leitura ATÉ VER O PROMPT ('>' ou ']')
-        while True:
-            try:
-                if channel.recv_ready():
-                    chunk = channel.recv(65535)
-                    if not chunk:
-                        break 
-                    output += chunk.decode('latin-1')
-                    
-                    # VERIFICAÇÃO DO PROMPT:
-                    stripped_output = output.strip()
-                    if stripped_output.endswith('>') or stripped_output.endswith(']'):
-                        break
-                
-                if channel.exit_status_ready():
-                    break
-                
-                if time.time() - start_time > 20.0:
-                    print(f"     [ERRO-SSH] Timeout de 20s atingido esperando o comando em {host}")
-                    break
-                    
-                time.sleep(0.2)
-                
-            except socket.timeout:
-                pass
+        timing = POOL.timings[host]
+        print(f"     [SSH-TEMPO] {host}: {timing.elapsed:.2f}s de leitura, ~{timing.saved:.2f}s de pausas fixas evitadas.")
         
-        # 5. Envia o QUIT
-        channel.send('quit\n')
-        time.sleep(0.5)
-        client.close()
+        # 5. Sem QUIT: o shell continua aberto no pool
         
         # 6. Limpeza da Saída
         lines = output.splitlines()
@@ -155,8 +118,7 @@ def get_ssh_output(host, username, password, command):
 
     except Exception as e:
         print(f"     [ERRO-SSH] Erro durante a execução do comando SSH em {host}: {e}")
-        if 'client' in locals() and client:
-            client.close()
+        POOL.discard(host, username)
         return None
         
 # --- 4. LÓGICA DE PARSING (Adaptada para Juniper) ---
@@ -323,18 +285,24 @@ async def sync_database(devices_from_api, interfaces_data_map):
 
 # --- 6. ORQUESTRAÇÃO (Com lógica de flag) ---
 
-async def process_device_interfaces(dev: dict, semaphore: asyncio.Semaphore) -> tuple | None:
+async def process_device_interfaces(dev: dict, limiter: AdaptiveLimiter, costs: DeviceCosts) -> tuple | None:
     """
     Worker para coletar e parsear interfaces de UM dispositivo.
     (Função idêntica à original, não precisou de mudanças)
     """
     
-    async with semaphore:
+    # Circuit breaker: host com falhas seguidas de conexão é pulado sem
+    # ocupar vaga (ou testado só com um connect TCP) - ver 'circuit_breaker.py'
+    if not await BREAKER.allow(dev['ip']):
+        return None
+    
+    async with limiter as slot:
         host = dev['ip'] 
         hostname = dev['hostname']
         print(f"\n--- [COLETA] Iniciando: {hostname} (IP: {host}) ---")
         
         raw_output = None
+        ssh_start = time.monotonic()
         try:
             raw_output = await asyncio.to_thread(
                 get_ssh_output, 
@@ -347,8 +315,17 @@ async def process_device_interfaces(dev: dict, semaphore: asyncio.Semaphore) ->
             print(f"     [ERRO-THREAD] Erro ao executar get_ssh_output na thread para {hostname}: {e}")
             return None 
 
+        # Sinais (latência do login, timeouts, falhas de auth) para o limitador
+        slot.observe(POOL.timings.get(host))
+        if raw_output:
+            costs.record_ssh(host, POOL.timings.get(host), ssh_start, time.monotonic() - ssh_start)
+
         if raw_output:
+            parse_start = time.monotonic()
             parsed_data = parse_output(raw_output)
+            parse_seconds = time.monotonic() - parse_start
+            TIMER.record('parse', parse_seconds)
+            costs.record(host, parse=parse_seconds)
             if parsed_data:
                 print(f"   [COLETA] Sucesso! Parseadas {len(parsed_data)} interfaces de {hostname}.")
                 return (hostname, parsed_data)
@@ -363,10 +340,13 @@ async def process_device_interfaces(dev: dict, semaphore: asyncio.Semaphore) ->
 async def main():
     MAX_CONCURRENT_TASKS = 30
     
-    semaphore = asyncio.Semaphore(MAX_CONCURRENT_TASKS)
+    # Valor inicial: o limitador adaptativo ('concurrency.py') ajusta durante a varredura
+    limiter = AdaptiveLimiter("relatoriojn", initial=MAX_CONCURRENT_TASKS)
+    # Custo aprendido por dispositivo: os mais demorados são despachados primeiro
+    costs = DeviceCosts("relatoriojn")
     start_time = time.time()
     
-    print(f"[INFO] Iniciando script de inventário Juniper (Paralelismo: {MAX_CONCURRENT_TASKS} devices)")
+    print(f"[INFO] Iniciando script de inventário Juniper (Paralelismo inicial: {limiter.current} devices, adaptativo)")
     print(f"[INFO] Modo de salvamento: {'BANCO DE DADOS' if SAVE_TO_DATABASE else 'APENAS CONSOLE (JSON)'}")
 
     # 1. Buscar dispositivos no LibreNMS
@@ -385,8 +365,8 @@ async def main():
 
     # 2. Criar lista de tarefas de coleta
     tasks = []
-    for dev in devices:
-        tasks.append(process_device_interfaces(dev, semaphore))
+    for dev in costs.order(devices, lambda d: d['ip']):
+        tasks.append(process_device_interfaces(dev, limiter, costs))
 
     # 3. Executar todas as tarefas de coleta simultaneamente
     results = await asyncio.gather(*tasks)
@@ -406,6 +386,8 @@ async def main():
 
     end_collection_time = time.time()
     print(f"\n--- [INFO] Coleta SSH concluída em {end_collection_time - start_time:.2f} segundos ---")
+    print(f"[INFO] {limiter.summary()}")
+    costs.save()
     
     # 5. Salvar no banco OU Exibir no Console (LÓGICA DA NOVA FLAG)
     if not interfaces_data_map:
@@ -413,7 +395,9 @@ async def main():
     
     elif SAVE_TO_DATABASE:
         print("\n[INFO] SAVE_TO_DATABASE=True. Iniciando sincronização com o banco...")
-        await sync_database(devices_com_sucesso, interfaces_data_map)
+        # Tempo de gravação da sincronização inteira (ver 'stage_timing.py')
+        with TIMER.measure('db_write'):
+            await sync_database(devices_com_sucesso, interfaces_data_map)
     
     else:
         print(f"\n[INFO] SAVE_TO_DATABASE=False. Exibindo dados coletados (Total: {len(devices_com_sucesso)} devices).")
@@ -0,0 +1,724 @@
+#!/usr/bin/env python3
+"""
+Simulador local de dispositivos SSH (Huawei VRP e Junos) para testes de carga.
+
+Sobe N dispositivos falsos numa máquina só, cada um no seu IP de loopback
+(127.x.y.z, todos respondem no Linux sem configuração) e na mesma porta,
+imitando o prompt e as saídas que os coletores esperam:
+
+- Huawei ('<SW-SIM-0001>'): 'screen-length 0 temporary',
+  'display interface description', 'display interface brief' e
+  'display transceiver verbose' no shell interativo (inclusive em lote).
+  As portas e os dados de transceiver saem do log 'teste.txt' (um perfil
+  por switch do log); a descrição e o brief são montados a partir delas.
+- Junos ('simulador@pca-acs-ju118-0002> '): 'set cli screen-length 0' e
+  'show interfaces descriptions' no shell; 'show interfaces extensive' e
+  'show interfaces diagnostics optics' (com '| no-more') no canal exec,
+  repetindo as capturas 'show-interface-extensive.txt' e
+  'show-interfaces-diagnostics-optics.txt'. Os hostnames vêm de 'texte.txt'.
+
+Com --ports M, todos os dispositivos passam a ter M portas sintéticas
+(perfis do 'gerador_frota.py', com valores sorteados e portas ausentes ou
+sem diagnóstico), para testar coletores e banco com 10k-100k interfaces.
+
+Atraso, banda e falhas são configuráveis:
+    --login-latency  espera (s) antes de responder à autenticação
+    --latency        espera (s) antes de cada resposta, + até --jitter
+    --bandwidth      bytes/s por canal (0 = sem limite)
+    --dead           fração dos dispositivos que não escutam (conexão recusada)
+    --fail-auth      probabilidade de recusar a senha
+    --fail-hang      probabilidade de travar no meio da saída (sem prompt)
+    --fail-drop      probabilidade de derrubar a conexão no meio da saída
+
+A lista dos dispositivos (ip, hostname, vendor) é gravada em --inventory
+para popular o banco de teste. Os coletores usam a porta de SSH_PORT:
+
+    python simulador_ssh.py --huawei 800 --junos 200 --port 2222 --latency 0.2
+    SSH_PORT=2222 python status.py
+
+Requer o asyncssh (já usado por 'ssh_async.py').
+"""
+import argparse
+import ast
+import asyncio
+import functools
+import ipaddress
+import json
+import os
+import random
+import re
+import resource
+import time
+
+import asyncssh
+
+# --- 1. CONFIGURAÇÕES ---
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+HUAWEI_LOG_FILE = os.path.join(BASE_DIR, "teste.txt")
+JUNOS_LOG_FILE = os.path.join(BASE_DIR, "texte.txt")
+EXTENSIVE_CAPTURE_FILE = os.path.join(BASE_DIR, "show-interface-extensive.txt")
+OPTICS_CAPTURE_FILE = os.path.join(BASE_DIR, "show-interfaces-diagnostics-optics.txt")
+
+DEFAULT_FIRST_IP = "127.100.0.1"
+DEFAULT_PORT = 2222
+DEFAULT_INVENTORY = os.path.join(BASE_DIR, "simulador_inventario.json")
+
+JUNOS_USER = "simulador"
+
+# Tamanho dos pedaços enviados quando há limite de banda
+SEND_CHUNK = 4096
+
+HUAWEI_BANNER = (
+    "\r\nInfo: The max number of VTY users is 20, and the number\r\n"
+    "      of current VTY users on line is 1.\r\n"
+)
+
+
+# --- 2. PERFIS (a partir dos logs e capturas do repositório) ---
+
+def _read_log(path) -> str:
+    """Os logs 'teste.txt' / 'texte.txt' foram gravados em UTF-16 (console do Windows)."""
+    with open(path, 'rb') as f:
+        raw = f.read()
+    if raw.startswith((b'\xff\xfe', b'\xfe\xff')):
+        return raw.decode('utf-16')
+    return raw.decode('latin-1')
+
+
+def load_huawei_profiles(path=HUAWEI_LOG_FILE) -> list:
+    """
+    Lê o log do 'treshold.py' e devolve um perfil por switch:
+    {'ports': [(nome_longo, status, dados)], 'absent': [nome_longo]}.
+    'status' é 'present', 'no_diag' ou 'absent'; 'dados' é o dict extraído.
+    Switches sem nenhuma porta no log (falha de SSH) ficam de fora.
+    """
+    profiles = []
+    current = None
+    block_name = None
+    for line in _read_log(path).splitlines():
+        line = line.strip()
+        if line.startswith("--- [DEV] Processando Dispositivo:"):
+            current = {'ports': [], 'absent': []}
+            profiles.append(current)
+        elif current is None:
+            continue
+        elif line.startswith("--- [IFACE-PARSE] Processando Bloco para:"):
+            block_name = line.split("para:", 1)[1].split(" (como", 1)[0].strip()
+        elif line.startswith("[PARSE-BLOCK] Status detectado:") and block_name:
+            status = line.split(":", 1)[1].split()[0]
+            current['ports'].append((block_name, status, {}))
+        elif line.startswith("[PARSE-BLOCK] Dados extra") and current['ports']:
+            name, status, _ = current['ports'][-1]
+            current['ports'][-1] = (name, status, ast.literal_eval(line.split(": ", 1)[1]))
+        elif line.startswith("[PARSE-GLOBAL] Marcando"):
+            current['absent'].append(line.split("Marcando", 1)[1].split(" (como", 1)[0].strip())
+    return [p for p in profiles if p['ports'] or p['absent']]
+
+
+def load_junos_hostnames(path=JUNOS_LOG_FILE) -> list:
+    """Hostnames dos roteadores Juniper do log do 'tresholdjn.py'."""
+    names = re.findall(r"Iniciando Processamento: (\S+) \(IP:", _read_log(path))
+    return [name.split('.', 1)[0] for name in dict.fromkeys(names)]
+
+
+def load_capture(path) -> str:
+    """Captura de um comando Junos, sem a linha do prompt/eco e sem o prompt final."""
+    with open(path, encoding='latin-1') as f:
+        lines = f.read().splitlines()
+    if lines and '> show ' in lines[0]:
+        lines = lines[1:]
+    while lines and (not lines[-1].strip() or lines[-1].startswith('{master') or lines[-1].rstrip().endswith('>')):
+        lines.pop()
+    return '\n'.join(lines) + '\n'
+
+
+# --- 3. SAÍDAS DOS COMANDOS ---
+
+def _short_name(name: str) -> str:
+    """Mesma abreviação do 'treshold._normalize_interface_name'."""
+    for long_prefix, short_prefix in (("XGigabitEthernet", "XGE"), ("GigabitEthernet", "GE")):
+        if name.startswith(long_prefix):
+            return short_prefix + name[len(long_prefix):]
+    return name
+
+
+def _huawei_ports(profile) -> list:
+    """Todas as portas do perfil: (nome_longo, está_up)."""
+    ports = [(name, status != 'absent') for name, status, _ in profile['ports']]
+    ports += [(name, False) for name in profile['absent']]
+    return sorted(ports, key=lambda p: [int(n) for n in re.findall(r"\d+", p[0])])
+
+
+def render_huawei_description(profile) -> str:
+    lines = [
+        "PHY: Physical",
+        "*down: administratively down",
+        "(l): loopback",
+        "(s): spoofing",
+        "Interface                     PHY     Protocol Description",
+    ]
+    for index, (name, up) in enumerate(_huawei_ports(profile), start=1):
+        state = "up" if up else "down"
+        description = f"SIM-CLIENTE-{index:03d}" if up else ""
+        lines.append(f"{_short_name(name):<30}{state:<8}{state:<9}{description}".rstrip())
+    return '\r\n'.join(lines)
+
+
+def render_huawei_brief(profile, rng: random.Random) -> str:
+    """Utilização e erros sorteados a cada chamada (os contadores "andam")."""
+    lines = [
+        "PHY: Physical",
+        "*down: administratively down",
+        "InUti/OutUti: input utility/output utility",
+        "Interface                   PHY   Protocol  InUti OutUti   inErrors  outErrors",
+    ]
+    for name, up in _huawei_ports(profile):
+        state = "up" if up else "down"
+        in_uti = f"{rng.uniform(0, 60):.2f}%" if up else "0%"
+        out_uti = f"{rng.uniform(0, 60):.2f}%" if up else "0%"
+        in_errors = rng.choice((0, 0, 0, rng.randint(1, 500))) if up else 0
+        lines.append(f"{name:<28}{state:<6}{state:<10}{in_uti:>6} {out_uti:>6} {in_errors:>10} {0:>10}")
+    return '\r\n'.join(lines)
+
+
+def _value(data, key, fmt="{:.2f}"):
+    value = data.get(key)
+    if value is None:
+        return "-"
+    try:
+        return fmt.format(float(value))
+    except (TypeError, ValueError):
+        return str(value)
+
+
+def render_huawei_transceiver(profile) -> str:
+    """'display transceiver verbose' no layout que o 'treshold.py' analisa."""
+    separator = "-" * 61
+    out = []
+    for name, status, data in profile['ports']:
+        out.append(f"{name} transceiver information:")
+        out.append(separator)
+        if status == 'absent':
+            out.append(f"Info: Port {name}, transceiver is absent.")
+            out.append(separator)
+            continue
+        out += [
+            " Common information:",
+            f"   Transceiver Type                      :{data.get('transceiver_type', '-')}",
+            f"   Connector Type                        :{data.get('connector_type', '-')}",
+            f"   Wavelength(nm)                        :{data.get('wavelength_nm', '-')}",
+            f"   Transfer Distance(m)                  :{data.get('transfer_distance_m', '-')}",
+            f"   Digital Diagnostic Monitoring         :{'NO' if status == 'no_diag' else 'YES'}",
+            f"   Vendor Name                           :{data.get('vendor_name', '-')}",
+            f"   Vendor Part Number                    :{data.get('vendor_part_number', '-')}",
+            separator,
+            " Manufacture information:",
+            f"   Manu. Serial Number                   :{data.get('serial_number', '-')}",
+            f"   Manufacturing Date                    :{data.get('manufacturing_date', '-')}",
+            f"   Vendor Name                           :{data.get('vendor_name', '-')}",
+            separator,
+        ]
+        if status == 'no_diag':
+            out.append("Info: The transceiver does not support diagnostic information.")
+            out.append(separator)
+            continue
+        out += [
+            " Diagnostic information:",
+            f"   Temperature(\xb0C)                       :{_value(data, 'temperature')}",
+            f"   Temp High Threshold(\xb0C)               :{_value(data, 'temp_high')}",
+            f"   Temp Low  Threshold(\xb0C)               :{_value(data, 'temp_low')}",
+            f"   Voltage(V)                            :{_value(data, 'voltage')}",
+            f"   Volt High Threshold(V)                :{_value(data, 'volt_high')}",
+            f"   Volt Low  Threshold(V)                :{_value(data, 'volt_low')}",
+            f"   Bias Current(mA)                      :{_value(data, 'bias_current')}",
+            f"   Bias High Threshold(mA)               :{_value(data, 'bias_high')}",
+            f"   Bias Low  Threshold(mA)               :{_value(data, 'bias_low')}",
+            f"   RX Power(dBM)                         :{_value(data, 'rx_power')}",
+            f"   RX Power High Warning(dBM)            :{_value(data, 'rx_power_high_warning')}",
+            f"   RX Power Low  Warning(dBM)            :{_value(data, 'rx_power_low_warning')}",
+            f"   RX Power High Threshold(dBM)          :{_value(data, 'rx_power_high')}",
+            f"   RX Power Low  Threshold(dBM)          :{_value(data, 'rx_power_low')}",
+            f"   TX Power(dBM)                         :{_value(data, 'tx_power')}",
+            f"   TX Power High Warning(dBM)            :{_value(data, 'tx_power_high_warning')}",
+            f"   TX Power Low  Warning(dBM)            :{_value(data, 'tx_power_low_warning')}",
+            f"   TX Power High Threshold(dBM)          :{_value(data, 'tx_power_high')}",
+            f"   TX Power Low  Threshold(dBM)          :{_value(data, 'tx_power_low')}",
+            separator,
+        ]
+    for name in profile['absent']:
+        out.append(f"Info: Port {name}, transceiver is absent.")
+    return '\r\n'.join(out)
+
+
+def render_junos_descriptions(extensive: str) -> str:
+    """'show interfaces descriptions' com as interfaces descritas da captura extensive."""
+    lines = ["Interface       Admin Link Description"]
+    name = admin = link = None
+    for line in extensive.splitlines():
+        header = re.match(r"Physical interface: (\S+), (Enabled|Administratively down), Physical link is (\w+)", line)
+        if header:
+            name = header.group(1)
+            admin = "up" if header.group(2) == "Enabled" else "down"
+            link = header.group(3).lower()
+            continue
+        description = re.match(r"\s+Description: (.*)", line)
+        if description and name:
+            lines.append(f"{name:<16}{admin:<6}{link:<5}{description.group(1).strip()}")
+            name = None
+    return '\n'.join(lines) + '\n'
+
+
+# Campos do bloco 'et-' da captura extensive trocados pelos de cada porta
+# sintética: (regex, campo do str.format). Só a primeira ocorrência.
+_EXTENSIVE_TEMPLATE_FIELDS = (
+    (r"Physical interface: \S+, [^,]+, Physical link is \w+",
+     "Physical interface: {name}, {admin}, Physical link is {link}"),
+    (r"Description: [^\n]*", "Description: {description}"),
+    (r"Speed: \w+", "Speed: {speed}"),
+    (r"Input  bytes  : +\d+ +\d+ bps", "Input  bytes  : {in_bytes:>20} {in_bps:>20} bps"),
+    (r"Output bytes  : +\d+ +\d+ bps", "Output bytes  : {out_bytes:>20} {out_bps:>20} bps"),
+    (r"Errors: \d+, Drops: \d+, Framing errors: \d+", "Errors: {in_errors}, Drops: 0, Framing errors: {in_errors}"),
+    (r"Carrier transitions: \d+, Errors: \d+", "Carrier transitions: {flaps}, Errors: {out_errors}"),
+    (r"Logical interface \S+", "Logical interface {name}.0"),
+)
+
+
+@functools.lru_cache(maxsize=None)
+def _junos_extensive_template() -> str:
+    """Primeiro bloco 'et-' descrito da captura, com os campos por porta no formato do str.format."""
+    blocks = re.split(r"(?m)^(?=Physical interface: )", load_capture(EXTENSIVE_CAPTURE_FILE))
+    block = next(b for b in blocks if b.startswith("Physical interface: et-") and "Description:" in b)
+    template = block.replace("{", "{{").replace("}", "}}")
+    for pattern, field in _EXTENSIVE_TEMPLATE_FIELDS:
+        template, count = re.subn(pattern, field, template, count=1)
+        if not count:
+            raise ValueError(f"'{pattern}' não encontrado no bloco modelo de {EXTENSIVE_CAPTURE_FILE}")
+    return template
+
+
+def render_junos_extensive(profile, rng: random.Random) -> str:
+    """
+    'show interfaces extensive' de um perfil sintético ('gerador_frota.py'):
+    um bloco da captura por porta. Tráfego e erros sorteados a cada chamada.
+    """
+    template = _junos_extensive_template()
+    out = []
+    for name, status, data in profile['ports']:
+        up = status != 'absent' and data['enabled']
+        speed_bps = data['speed_gbps'] * 10 ** 9
+        in_bps = int(speed_bps * rng.uniform(0, 0.6)) if up else 0
+        out_bps = int(speed_bps * rng.uniform(0, 0.6)) if up else 0
+        out.append(template.format(
+            name=name,
+            admin="Enabled" if data['enabled'] else "Administratively down",
+            link="Up" if up else "Down",
+            description=data['description'],
+            speed=f"{data['speed_gbps']}Gbps",
+            in_bytes=rng.randrange(10 ** 15) if up else 0, in_bps=in_bps,
+            out_bytes=rng.randrange(10 ** 15) if up else 0, out_bps=out_bps,
+            in_errors=rng.choice((0, 0, 0, rng.randint(1, 500))) if up else 0,
+            out_errors=0,
+            flaps=rng.randint(1, 20),
+        ))
+    return ''.join(out)
+
+
+def render_junos_profile_descriptions(profile) -> str:
+    """'show interfaces descriptions' de um perfil sintético (as portas com descrição)."""
+    lines = ["Interface       Admin Link Description"]
+    for name, status, data in profile['ports']:
+        if data['description']:
+            admin = "up" if data['enabled'] else "down"
+            link = "up" if status != 'absent' and data['enabled'] else "down"
+            lines.append(f"{name:<16}{admin:<6}{link:<5}{data['description']}")
+    return '\n'.join(lines) + '\n'
+
+
+def _junos_line(label, value) -> str:
+    return f"    {label:<42}:  {value}"
+
+
+def _junos_celsius(value) -> str:
+    return f"{value:.0f} degrees C / {value * 9 / 5 + 32:.0f} degrees F"
+
+
+def _junos_dbm(value) -> str:
+    return f"{10 ** (value / 10):.4f} mW / {value:.2f} dBm"
+
+
+def render_junos_optics(profile) -> str:
+    """
+    'show interfaces diagnostics optics' de um perfil sintético, no layout da
+    captura: módulos QSFP com 'Lane 0..3', SFP com as leituras no próprio
+    bloco. Portas sem módulo não aparecem; sem diagnóstico, só o cabeçalho.
+    """
+    out = []
+    for name, status, data in profile['ports']:
+        if status == 'absent':
+            continue
+        out.append(f"Physical interface: {name}")
+        if status == 'no_diag':
+            continue
+        out += [
+            _junos_line("Module temperature", _junos_celsius(data['temperature'])),
+            _junos_line("Module voltage", f"{data['voltage']:.4f} V"),
+            *(_junos_line(f"Module {kind} {level} {severity}", "Off")
+              for kind in ("temperature", "voltage") for severity in ("alarm", "warning")
+              for level in ("high", "low")),
+            _junos_line("Module temperature high alarm threshold", _junos_celsius(data['temp_high'])),
+            _junos_line("Module temperature low alarm threshold", _junos_celsius(data['temp_low'])),
+            _junos_line("Module temperature high warning threshold", _junos_celsius(data['temp_high'] - 5)),
+            _junos_line("Module temperature low warning threshold", _junos_celsius(data['temp_low'] + 5)),
+            _junos_line("Module voltage high alarm threshold", f"{data['volt_high']:.4f} V"),
+            _junos_line("Module voltage low alarm threshold", f"{data['volt_low']:.4f} V"),
+            _junos_line("Module voltage high warning threshold", f"{data['volt_high'] - 0.1:.4f} V"),
+            _junos_line("Module voltage low warning threshold", f"{data['volt_low'] + 0.1:.4f} V"),
+            _junos_line("Laser bias current high alarm threshold", f"{data['bias_high']:.3f} mA"),
+            _junos_line("Laser bias current low alarm threshold", f"{data['bias_low']:.3f} mA"),
+            _junos_line("Laser bias current high warning threshold", f"{data['bias_high'] * 0.9:.3f} mA"),
+            _junos_line("Laser bias current low warning threshold", f"{data['bias_low'] * 1.1:.3f} mA"),
+            _junos_line("Laser output power high alarm threshold", _junos_dbm(data['tx_power_high'])),
+            _junos_line("Laser output power low alarm threshold", _junos_dbm(data['tx_power_low'])),
+            _junos_line("Laser output power high warning threshold", _junos_dbm(data['tx_power_high_warning'])),
+            _junos_line("Laser output power low warning threshold", _junos_dbm(data['tx_power_low_warning'])),
+            _junos_line("Laser rx power high alarm threshold", _junos_dbm(data['rx_power_high'])),
+            _junos_line("Laser rx power low alarm threshold", _junos_dbm(data['rx_power_low'])),
+            _junos_line("Laser rx power high warning threshold", _junos_dbm(data['rx_power_high_warning'])),
+            _junos_line("Laser rx power low warning threshold", _junos_dbm(data['rx_power_low_warning'])),
+        ]
+        lanes = data['lanes']
+        for index, (bias, tx_power, rx_power) in enumerate(lanes):
+            if len(lanes) > 1:
+                out.append(f"  Lane {index}")
+            out += [
+                _junos_line("Laser bias current", f"{bias:.3f} mA"),
+                _junos_line("Laser output power", _junos_dbm(tx_power)),
+                _junos_line("Laser receiver power", _junos_dbm(rx_power)),
+                *(_junos_line(f"Laser {kind} {level} {severity}", "Off")
+                  for kind in ("bias current", "receiver power", "output power")
+                  for severity in ("alarm", "warning") for level in ("high", "low")),
+                _junos_line("Tx loss of signal functionality alarm", "Off"),
+                _junos_line("Rx loss of signal alarm", "Off"),
+                _junos_line("Tx laser disabled alarm", "Off"),
+            ]
+    return '\n'.join(out) + '\n'
+
+
+# --- 4. DISPOSITIVOS SIMULADOS ---
+
+class SimulatedDevice:
+    """Um dispositivo falso: IP de loopback, prompt e as saídas de um perfil."""
+
+    def __init__(self, ip, hostname, vendor, profile=None, fleet_index=None):
+        self.ip = ip
+        self.hostname = hostname
+        self.vendor = vendor
+        self.profile = profile
+        self.fleet_index = fleet_index  # Posição na frota sintética (--ports)
+        self.rng = random.Random(ip)
+        self.alive = True
+
+    @property
+    def prompt(self) -> str:
+        if self.vendor == 'huawei':
+            return f"<{self.hostname}>"
+        return f"{JUNOS_USER}@{self.hostname}> "
+
+    def shell_output(self, command: str, simulator):
+        """Saída de um comando do shell, ou None se o comando é desconhecido."""
+        command = command.replace('| no-more', '').strip()
+        if self.vendor == 'huawei':
+            if command == 'screen-length 0 temporary':
+                return "Info: The configuration takes effect on the current user terminal interface only."
+            if command == 'display interface description':
+                return render_huawei_description(simulator.profile_of(self))
+            if command == 'display interface brief':
+                return render_huawei_brief(simulator.profile_of(self), self.rng)
+            if command == 'display transceiver verbose':
+                return simulator.transceiver_cache(self)
+            return None
+        if command == 'set cli screen-length 0':
+            return "Screen length set to 0"
+        return self.exec_output(command, simulator)
+
+    def exec_output(self, command: str, simulator):
+        """Saída de um comando Junos no canal exec, ou None se desconhecido."""
+        command = command.replace('| no-more', '').strip()
+        if self.vendor != 'junos':
+            return None
+        if simulator.fleet is not None:
+            if command == 'show interfaces extensive':
+                return render_junos_extensive(simulator.profile_of(self), self.rng)
+            if command == 'show interfaces diagnostics optics':
+                return render_junos_optics(simulator.profile_of(self))
+            if command == 'show interfaces descriptions':
+                return render_junos_profile_descriptions(simulator.profile_of(self))
+            return None
+        if command == 'show interfaces extensive':
+            return simulator.extensive
+        if command == 'show interfaces diagnostics optics':
+            return simulator.optics
+        if command == 'show interfaces descriptions':
+            return simulator.descriptions
+        return None
+
+
+class Simulator:
+    """Os N dispositivos, as opções de atraso/falha e os contadores."""
+
+    def __init__(self, args):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.fleet = None
+        if args.ports:
+            from gerador_frota import FleetGenerator  # O gerador importa os renderizadores daqui
+            self.fleet = FleetGenerator(args.ports, seed=args.seed)
+        self.extensive = load_capture(EXTENSIVE_CAPTURE_FILE)
+        self.optics = load_capture(OPTICS_CAPTURE_FILE)
+        self.descriptions = render_junos_descriptions(self.extensive)
+        self._transceiver = {}
+        self.devices = self._build_devices()
+        self.stats = {'connections': 0, 'auth_failures': 0, 'commands': 0,
+                      'bytes': 0, 'hangs': 0, 'drops': 0, 'active': 0}
+
+    def _build_devices(self) -> list:
+        huawei_profiles = load_huawei_profiles()
+        junos_names = load_junos_hostnames() or ["mx-sim"]
+        ip = ipaddress.IPv4Address(self.args.first_ip)
+        devices = []
+        for index in range(self.args.huawei):
+            # Com a frota sintética o perfil é gerado a cada pedido (ver 'profile_of')
+            profile = None if self.fleet else huawei_profiles[index % len(huawei_profiles)]
+            devices.append(SimulatedDevice(str(ip), f"SW-SIM-{index + 1:04d}", 'huawei', profile, index))
+            ip += 1
+        for index in range(self.args.junos):
+            name = f"{junos_names[index % len(junos_names)]}-{index + 1:04d}"
+            devices.append(SimulatedDevice(str(ip), name, 'junos', fleet_index=index))
+            ip += 1
+
+        # Dispositivos "fora do ar": espalhados pela frota, sempre os mesmos para a mesma semente
+        dead_count = int(len(devices) * self.args.dead)
+        for device in random.Random(self.args.seed).sample(devices, dead_count):
+            device.alive = False
+        return devices
+
+    def profile_of(self, device) -> dict:
+        """
+        Perfil do dispositivo. Os da frota sintética não ficam em memória
+        (seriam centenas de MB com 100k portas): saem de novo do gerador,
+        iguais a cada chamada para a mesma semente.
+        """
+        if self.fleet is None:
+            return device.profile
+        return self.fleet.profile(device.vendor, device.fleet_index)
+
+    def transceiver_cache(self, device) -> str:
+        """O verbose só depende do perfil: é montado uma vez por perfil (dos logs)."""
+        if self.fleet is not None:
+            return render_huawei_transceiver(self.profile_of(device))
+        key = id(device.profile)
+        if key not in self._transceiver:
+            self._transceiver[key] = render_huawei_transceiver(device.profile)
+        return self._transceiver[key]
+
+    def chance(self, probability) -> bool:
+        return probability > 0 and self.rng.random() < probability
+
+    def inventory(self) -> list:
+        return [
+            {'ip': d.ip, 'hostname': d.hostname, 'vendor': d.vendor, 'alive': d.alive}
+            for d in self.devices
+        ]
+
+    # --- Envio com atraso, banda e falhas ---
+
+    async def respond(self, process, text):
+        """
+        Espera a latência configurada e envia 'text' respeitando a banda.
+        Retorna False se uma falha injetada interrompeu a saída.
+        """
+        args = self.args
+        await asyncio.sleep(args.latency + self.rng.uniform(0, args.jitter))
+
+        hang = self.chance(args.fail_hang)
+        drop = not hang and self.chance(args.fail_drop)
+        cut = len(text) // 2 if (hang or drop) else len(text)
+        data = text[:cut]
+        chunk = SEND_CHUNK if args.bandwidth else len(data) or 1
+        for start in range(0, len(data), chunk):
+            piece = data[start:start + chunk]
+            process.stdout.write(piece)
+            self.stats['bytes'] += len(piece)
+            if args.bandwidth:
+                await asyncio.sleep(len(piece) / args.bandwidth)
+
+        if hang:
+            self.stats['hangs'] += 1
+            await asyncio.Event().wait()  # Nunca termina: o cliente que desista
+        if drop:
+            self.stats['drops'] += 1
+            process.channel.get_connection().abort()
+            return False
+        return True
+
+
+# --- 5. SERVIDOR SSH ---
+
+class _DeviceServer(asyncssh.SSHServer):
+    """Autenticação de um dispositivo: aceita qualquer senha, salvo falha injetada."""
+
+    def __init__(self, simulator: Simulator, device: SimulatedDevice):
+        self.simulator = simulator
+        self.device = device
+
+    def connection_made(self, conn):
+        self.simulator.stats['connections'] += 1
+        self.simulator.stats['active'] += 1
+
+    def connection_lost(self, exc):
+        self.simulator.stats['active'] -= 1
+
+    def begin_auth(self, username):
+        return True
+
+    def password_auth_supported(self):
+        return True
+
+    async def validate_password(self, username, password):
+        await asyncio.sleep(self.simulator.args.login_latency)
+        if self.simulator.chance(self.simulator.args.fail_auth):
+            self.simulator.stats['auth_failures'] += 1
+            return False
+        return True
+
+
+async def _handle_process(simulator: Simulator, device: SimulatedDevice, process):
+    """Canal aberto no dispositivo: 'exec' (Junos) ou shell interativo."""
+    try:
+        if process.command:
+            await _handle_exec(simulator, device, process)
+        else:
+            await _handle_shell(simulator, device, process)
+    except (asyncssh.BreakReceived, asyncssh.TerminalSizeChanged, asyncssh.DisconnectError,
+            BrokenPipeError, ConnectionError):
+        pass
+    process.close()
+
+
+async def _handle_exec(simulator, device, process):
+    simulator.stats['commands'] += 1
+    output = device.exec_output(process.command, simulator)
+    if output is None:
+        process.stderr.write(f"error: syntax error: {process.command}\n")
+        process.exit(1)
+        return
+    if await simulator.respond(process, output):
+        process.exit(0)
+
+
+async def _handle_shell(simulator, device, process):
+    newline = '\r\n' if device.vendor == 'huawei' else '\n'
+    if device.vendor == 'huawei':
+        process.stdout.write(HUAWEI_BANNER + device.prompt)
+    else:
+        process.stdout.write(f"--- JUNOS 21.4R3 (simulado)\n{device.prompt}")
+
+    while True:
+        line = await process.stdin.readline()
+        if not line:
+            return
+        command = line.strip()
+        if command in ('quit', 'exit'):
+            return
+        simulator.stats['commands'] += 1
+        output = device.shell_output(command, simulator) if command else ""
+        if output is None:
+            if device.vendor == 'huawei':
+                output = "                 ^\r\nError: Unrecognized command found at '^' position."
+            else:
+                output = "                 ^\nunknown command."
+        # Eco do comando, saída e prompt (como o VTY faz com o que foi digitado)
+        text = f"{command}{newline}{output}{newline}{device.prompt}" if output else f"{command}{newline}{device.prompt}"
+        if not await simulator.respond(process, text):
+            return
+
+
+def _raise_file_limit(needed: int):
+    """Cada dispositivo usa um socket de escuta e um por conexão."""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < needed:
+        new_soft = needed if hard == resource.RLIM_INFINITY else min(needed, hard)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (new_soft, hard))
+        if new_soft < needed:
+            print(f"[AVISO] Limite de arquivos abertos ({hard}) menor que o necessário ({needed}).")
+
+
+async def serve(args):
+    simulator = Simulator(args)
+    alive = [d for d in simulator.devices if d.alive]
+    _raise_file_limit(len(simulator.devices) * 3 + 256)
+
+    host_key = (asyncssh.read_private_key(args.host_key) if args.host_key
+                else asyncssh.generate_private_key('ssh-ed25519'))
+
+    for device in alive:
+        await asyncssh.listen(
+            device.ip, args.port,
+            server_factory=lambda d=device: _DeviceServer(simulator, d),
+            process_factory=lambda p, d=device: _handle_process(simulator, d, p),
+            server_host_keys=[host_key], encoding='latin-1', line_editor=False,
+            backlog=args.backlog,
+        )
+
+    with open(args.inventory, 'w') as f:
+        json.dump(simulator.inventory(), f, indent=1)
+
+    print(f"[INFO] Simulador no ar: {args.huawei} Huawei + {args.junos} Junos "
+          f"({len(simulator.devices) - len(alive)} fora do ar)"
+          f"{f', {args.ports} portas sintéticas cada' if args.ports else ''}, "
+          f"{simulator.devices[0].ip}..{simulator.devices[-1].ip} porta {args.port}.")
+    print(f"[INFO] Inventário gravado em {args.inventory}. Use SSH_PORT={args.port} nos coletores.")
+
+    started = time.monotonic()
+    while True:
+        await asyncio.sleep(args.report_interval)
+        stats = simulator.stats
+        elapsed = time.monotonic() - started
+        print(f"[STATS] {elapsed:.0f}s: {stats['connections']} conexões ({stats['active']} ativas), "
+              f"{stats['commands']} comandos, {stats['bytes'] / 1e6:.1f} MB enviados, "
+              f"falhas injetadas: {stats['auth_failures']} auth, {stats['hangs']} travas, {stats['drops']} quedas.")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Simulador local de switches Huawei e roteadores Junos via SSH (testes de carga)'
+    )
+    parser.add_argument('--huawei', type=int, default=10, help='Quantidade de dispositivos Huawei')
+    parser.add_argument('--junos', type=int, default=5, help='Quantidade de dispositivos Junos')
+    parser.add_argument('--first-ip', default=DEFAULT_FIRST_IP, help='Primeiro IP de loopback (os demais são sequenciais)')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='Porta SSH de todos os dispositivos')
+    parser.add_argument('--inventory', default=DEFAULT_INVENTORY, help='Arquivo JSON com a lista dos dispositivos')
+    parser.add_argument('--host-key', help='Chave privada do servidor (padrão: gerada na hora)')
+    parser.add_argument('--login-latency', type=float, default=0.0, help='Atraso (s) da autenticação')
+    parser.add_argument('--latency', type=float, default=0.0, help='Atraso (s) antes de cada resposta')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Atraso extra aleatório (s) até este valor')
+    parser.add_argument('--bandwidth', type=float, default=0.0, help='Banda por canal em bytes/s (0 = ilimitada)')
+    parser.add_argument('--dead', type=float, default=0.0, help='Fração dos dispositivos fora do ar')
+    parser.add_argument('--fail-auth', type=float, default=0.0, help='Probabilidade de recusar a senha')
+    parser.add_argument('--fail-hang', type=float, default=0.0, help='Probabilidade de travar no meio da saída')
+    parser.add_argument('--fail-drop', type=float, default=0.0, help='Probabilidade de derrubar a conexão no meio da saída')
+    parser.add_argument('--ports', type=int, default=0,
+                        help='Portas por dispositivo da frota sintética (gerador_frota.py); 0 = logs e capturas')
+    parser.add_argument('--seed', type=int, default=1, help='Semente das falhas, dos contadores e da frota sintética')
+    parser.add_argument('--backlog', type=int, default=128, help='Backlog de cada socket de escuta')
+    parser.add_argument('--report-interval', type=float, default=30.0, help='Intervalo (s) do resumo no console')
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        print("\n[INFO] Simulador encerrado.")
+
+
+if __name__ == "__main__":
+    main()
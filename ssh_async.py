@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Versão asyncio do pool SSH ('ssh_pool.py'), feita sobre o asyncssh.
+
+Tudo roda dentro do loop de eventos: nenhuma thread por dispositivo, então
+o número de coletas simultâneas (MAX_CONCURRENT_TASKS) deixa de ser limitado
+pelo pool de threads do 'asyncio.to_thread' e uma coleta travada pode ser
+cancelada normalmente (asyncio.wait_for / task.cancel()).
+
+Mesmas regras do pool síncrono: uma conexão autenticada por (host, porta,
+usuário) com keepalive, shell interativo persistente para Huawei e canais
+'exec' para Junos. Se o asyncssh não estiver instalado, AVAILABLE é False e
+os coletores voltam para o modo com threads.
+"""
+import asyncio
+import time
+
+try:
+    import asyncssh
+except ImportError:  # Dependência opcional
+    asyncssh = None
+
+from ssh_pool import (
+    SSH_PORT, CONNECT_TIMEOUT, BANNER_TIMEOUT, KEEPALIVE_INTERVAL, MAX_IDLE_SECONDS,
+    READ_TIMEOUT, PromptTimeout, DeviceTiming, OutputBuffer,
+    classify_ssh_error as _classify_base_error,
+)
+from circuit_breaker import BREAKER
+from stage_timing import TIMER
+
+AVAILABLE = asyncssh is not None
+
+
+class _ConnectClock(asyncssh.SSHClient if AVAILABLE else object):
+    """Anota quando o TCP conectou, para separar 'connect' de 'auth' no TIMER."""
+
+    def __init__(self):
+        self.tcp_at = None
+
+    def connection_made(self, conn):
+        self.tcp_at = time.monotonic()
+
+
+class _AsyncSession:
+    """Estado de UM dispositivo dentro do pool assíncrono."""
+
+    def __init__(self):
+        self.conn = None        # asyncssh.SSHClientConnection
+        self.shell = None       # asyncssh.SSHClientProcess (shell interativo)
+        self.last_used = 0.0
+        self.connect_lock = asyncio.Lock()
+        self.shell_lock = asyncio.Lock()
+
+    def is_alive(self) -> bool:
+        return self.conn is not None and not self.conn.is_closed()
+
+    def close_shell(self):
+        if self.shell is not None:
+            self.shell.close()
+        self.shell = None
+
+    def close(self):
+        self.close_shell()
+        if self.conn is not None:
+            self.conn.close()
+        self.conn = None
+
+
+class AsyncSSHSessionPool:
+    """Pool de conexões asyncssh indexado por (host, porta, usuário)."""
+
+    def __init__(self, keepalive_interval: int = KEEPALIVE_INTERVAL, max_idle: float = MAX_IDLE_SECONDS):
+        self.keepalive_interval = keepalive_interval
+        self.max_idle = max_idle
+        self._sessions = {}
+        self.connects = 0
+        self.reuses = 0
+        self.timings = {}  # host -> DeviceTiming
+
+    def _get_session(self, host, username, port) -> _AsyncSession:
+        key = (host, port, username)
+        session = self._sessions.get(key)
+        if session is None:
+            session = self._sessions[key] = _AsyncSession()
+        return session
+
+    async def connect(self, host, username, password, port=SSH_PORT):
+        """Retorna a conexão autenticada do dispositivo, reconectando se preciso."""
+        session = self._get_session(host, username, port)
+        async with session.connect_lock:
+            if session.is_alive():
+                self.reuses += 1
+                session.last_used = time.time()
+                return session.conn
+
+            session.close()
+            connect_start = time.monotonic()
+            clock = _ConnectClock()
+            try:
+                session.conn = await asyncssh.connect(
+                    host, port=port, username=username, password=password,
+                    known_hosts=None, client_keys=None, agent_path=None,
+                    connect_timeout=CONNECT_TIMEOUT, login_timeout=BANNER_TIMEOUT,
+                    keepalive_interval=self.keepalive_interval,
+                    client_factory=lambda: clock,
+                )
+            except Exception as e:
+                self._timing(host).record_error(classify_ssh_error(e))
+                BREAKER.record_failure(host, classify_ssh_error(e))
+                raise
+            connected_at = time.monotonic()
+            tcp_at = clock.tcp_at or connect_start
+            TIMER.record('connect', tcp_at - connect_start)
+            TIMER.record('auth', connected_at - tcp_at)
+            self._timing(host).record_connect(connected_at - connect_start)
+            BREAKER.record_success(host)
+            session.last_used = time.time()
+            self.connects += 1
+            return session.conn
+
+    async def run_command(self, host, username, password, command, setup_commands=(),
+                          timeout=READ_TIMEOUT, port=SSH_PORT) -> str:
+        """
+        Envia 'command' pelo shell persistente e lê até o prompt.
+        Retorna a saída bruta (eco + saída + prompt), como 'POOL.run_command'.
+        Em caso de erro/timeout o shell é descartado.
+        """
+        session = self._get_session(host, username, port)
+        timing = self._timing(host)
+        start_time = time.monotonic()
+
+        async with session.shell_lock:
+            conn = await self.connect(host, username, password, port)
+            try:
+                if session.shell is None or session.shell.is_closing():
+                    session.shell = await conn.create_process(term_type='vt100', encoding='latin-1')
+                    await read_until_prompt(session.shell.stdout)
+                    for setup_command in setup_commands:
+                        session.shell.stdin.write(setup_command + '\n')
+                        await read_until_prompt(session.shell.stdout)
+
+                clock = TIMER.read_clock()
+                session.shell.stdin.write(command + '\n')
+                output = await read_until_prompt(session.shell.stdout, timeout, clock)
+            except BaseException as e:
+                # Inclui CancelledError: shell em estado incerto
+                session.close_shell()
+                if isinstance(e, Exception):
+                    timing.record_error(classify_ssh_error(e))
+                raise
+            finally:
+                session.last_used = time.time()
+
+        timing.elapsed = time.monotonic() - start_time
+        return output
+
+    async def exec_command(self, host, username, password, command, timeout=None, port=SSH_PORT):
+        """
+        Executa 'command' num canal 'exec' novo sobre a conexão do pool.
+        Retorna (stdout, stderr) já decodificados. Estourando 'timeout',
+        levanta asyncio.TimeoutError.
+        """
+        process = await self.open_exec(host, username, password, command, port)
+        try:
+            return await asyncio.wait_for(_read_exec(process, TIMER.read_clock()), timeout)
+        finally:
+            process.close()
+
+    async def open_exec(self, host, username, password, command, port=SSH_PORT):
+        """
+        Abre um canal 'exec' e devolve o processo SEM esperar o fim, para quem
+        quer ler 'process.stdout' aos pedaços. Quem chama fecha o processo.
+        """
+        conn = await self.connect(host, username, password, port)
+        try:
+            return await conn.create_process(command, encoding='latin-1')
+        except asyncssh.ChannelOpenError:
+            self.discard(host, username, port)
+            conn = await self.connect(host, username, password, port)
+            return await conn.create_process(command, encoding='latin-1')
+
+    def _timing(self, host) -> DeviceTiming:
+        return self.timings.setdefault(host, DeviceTiming())
+
+    def record_error(self, host, kind: str):
+        """Registra um erro visto fora do pool (ex: timeout lendo um canal 'exec')."""
+        self._timing(host).record_error(kind)
+
+    def discard(self, host, username, port=SSH_PORT):
+        session = self._sessions.pop((host, port, username), None)
+        if session is not None:
+            session.close()
+
+    def prune_idle(self) -> int:
+        """Fecha sessões mortas ou ociosas há mais de 'max_idle' segundos (ex: dispositivos removidos)."""
+        now = time.time()
+        # Sessões em uso (conectando ou com comando no shell) ficam
+        stale = [
+            key for key, s in self._sessions.items()
+            if not (s.connect_lock.locked() or s.shell_lock.locked())
+            and (not s.is_alive() or now - s.last_used > self.max_idle)
+        ]
+        for key in stale:
+            self._sessions.pop(key).close()
+        return len(stale)
+
+    def close_all(self):
+        for session in self._sessions.values():
+            session.close()
+        self._sessions.clear()
+
+    def __len__(self):
+        return len(self._sessions)
+
+
+def classify_ssh_error(exc: BaseException) -> str:
+    """Como 'ssh_pool.classify_ssh_error', reconhecendo também as exceções do asyncssh."""
+    if asyncssh is not None and isinstance(exc, asyncssh.PermissionDenied):
+        return 'auth'
+    if isinstance(exc, asyncio.TimeoutError):  # No Python 3.10 não é um TimeoutError
+        return 'timeout'
+    return _classify_base_error(exc)
+
+
+async def _read_exec(process, clock):
+    """Lê um canal 'exec' até o fim: (stdout, stderr)."""
+    chunks = []
+    while True:
+        chunk = await process.stdout.read(65535)
+        if not chunk:
+            break
+        clock.chunk()
+        chunks.append(chunk)
+    error_output = await process.stderr.read()
+    clock.done()
+    return "".join(chunks), error_output
+
+
+async def read_until_prompt(stdout, timeout: float = READ_TIMEOUT, clock=None) -> str:
+    """
+    Lê o stream do shell até o prompt, acordando só quando chega dado.
+    'clock' ('stage_timing.ReadClock') separa espera e leitura, como no pool síncrono.
+    """
+    loop = asyncio.get_running_loop()
+    buffer = OutputBuffer()
+    deadline = loop.time() + timeout
+    while not buffer.done():
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            raise PromptTimeout(buffer.getvalue(), timeout)
+        try:
+            chunk = await asyncio.wait_for(stdout.read(65535), remaining)
+        except asyncio.TimeoutError:
+            raise PromptTimeout(buffer.getvalue(), timeout)
+        if not chunk:
+            break  # Canal fechou
+        if clock is not None:
+            clock.chunk()
+        buffer.append(chunk)
+    if clock is not None:
+        clock.done()
+    return buffer.getvalue()
+
+
+# Pool assíncrono único do processo
+ASYNC_POOL = AsyncSSHSessionPool()
@@ -0,0 +1,618 @@
+#!/usr/bin/env python3
+"""
+Pool de sessões SSH compartilhado por todos os coletores.
+
+Cada dispositivo (host, porta, usuário) ganha UMA conexão SSH autenticada,
+mantida viva com keepalives. Os coletores pedem canais a essa conexão em vez
+de abrir um SSHClient novo (handshake + login) a cada comando.
+
+- Huawei/VRP: o shell interativo (com a paginação já desligada) também fica
+  guardado no pool e é reutilizado, com acesso exclusivo por dispositivo.
+- Junos: cada comando abre um canal 'exec' novo sobre o transporte existente.
+
+'run_commands' manda um lote de comandos numa única ida ao shell e separa a
+transcrição pelos prompts, para que a descrição, o brief e o transceiver de
+um switch Huawei saiam de uma só sessão por ciclo.
+
+A leitura é guiada pelo prompt ('read_until_prompt'): a thread dorme em
+select() até chegar dado no canal e para assim que o prompt aparece, sem as
+pausas fixas (1s + 0.5s + 1s) que o código antigo fazia em todo dispositivo.
+
+O ganho entre ciclos só aparece quando os jobs rodam no mesmo processo
+(veja 'agendador.py'); rodando via cron, cada execução ainda tem o seu pool.
+"""
+import os
+import socket
+import threading
+import time
+import select
+from contextlib import contextmanager
+
+import paramiko
+
+from circuit_breaker import BREAKER
+from stage_timing import TIMER
+
+# --- 1. CONFIGURAÇÕES ---
+# Sobrescrita por SSH_PORT para apontar os coletores ao 'simulador_ssh.py'
+SSH_PORT = int(os.environ.get("SSH_PORT", 22))
+CONNECT_TIMEOUT = 10
+BANNER_TIMEOUT = 200
+
+# Intervalo (s) dos keepalives enviados pelo transporte SSH
+KEEPALIVE_INTERVAL = 30
+
+# Sessões sem uso por mais que isso são fechadas em 'prune_idle()'
+MAX_IDLE_SECONDS = 20 * 60
+
+# Tempo máximo (s) esperando o prompt (banner, setup e cada comando)
+READ_TIMEOUT = 20.0
+
+# Um prompt Huawei ('<SW>' / '[SW]') ou Junos ('user@host>') termina assim
+PROMPT_ENDINGS = ('>', ']')
+
+# Quantos caracteres do fim da saída são olhados para achar o prompt
+# (bem maior que qualquer prompt, mas constante: custo O(1) por chunk)
+TAIL_WINDOW = 256
+
+# Pausas fixas do leitor antigo, usadas só para medir o tempo economizado:
+# 1s pelo banner, 0.5s por comando de setup, 1s após o comando e, em média,
+# meia volta do polling de 0.2s no 'recv_ready()'.
+LEGACY_BANNER_SLEEP = 1.0
+LEGACY_SETUP_SLEEP = 0.5
+LEGACY_COMMAND_SLEEP = 1.0
+LEGACY_POLL_INTERVAL = 0.2
+
+# Por quanto tempo (s) as saídas de um lote ('run_commands') ficam em cache
+# para os outros coletores do mesmo ciclo
+BATCH_CACHE_SECONDS = 120
+
+# Comandos Huawei coletados juntos, numa só sessão, a cada ciclo de 15 min
+# (relatorio.py: descrição, status.py: brief, treshold.py: transceiver)
+HUAWEI_BATCH = (
+    'display interface description',
+    'display interface brief',
+    'display transceiver verbose',
+)
+
+
+class PromptTimeout(TimeoutError):
+    """O prompt não apareceu a tempo. 'output' guarda o que já foi lido."""
+
+    def __init__(self, output: str, timeout: float = READ_TIMEOUT):
+        super().__init__(f"prompt não encontrado em {timeout:.0f}s")
+        self.output = output
+
+
+class DeviceTiming:
+    """Tempo da última leitura e pausas fixas evitadas, por dispositivo."""
+
+    def __init__(self):
+        self.elapsed = 0.0      # Duração da última leitura (shell + comando)
+        self.saved = 0.0        # Pausas evitadas na última leitura
+        self.total_saved = 0.0  # Acumulado desde o início do processo
+        # Sinais para o limitador de concorrência ('concurrency.py');
+        # os instantes são time.monotonic(), para saber se são da coleta atual.
+        self.connect_seconds = None  # Duração do último handshake + login
+        self.connected_at = 0.0
+        self.error = None            # 'auth' | 'timeout' | 'connect' | 'other'
+        self.error_at = 0.0
+
+    def record_connect(self, seconds: float):
+        self.connect_seconds = seconds
+        self.connected_at = time.monotonic()
+
+    def record_error(self, kind: str):
+        self.error = kind
+        self.error_at = time.monotonic()
+
+
+class _Session:
+    """Estado de UM dispositivo dentro do pool."""
+
+    def __init__(self):
+        self.client = None      # paramiko.SSHClient autenticado
+        self.shell = None       # Canal interativo persistente (Huawei)
+        self.prompt = None      # Prompt exato visto ao abrir o shell
+        self.last_used = 0.0
+        # Serializa connect/reconnect do dispositivo
+        self.connect_lock = threading.Lock()
+        # Garante que só um coletor use o shell por vez
+        self.shell_lock = threading.Lock()
+        # Um lote por vez: quem chega enquanto outro coletor busca o lote
+        # espera e usa as saídas dele (cache) em vez de mandar tudo de novo
+        self.batch_lock = threading.Lock()
+
+    def is_alive(self) -> bool:
+        if self.client is None:
+            return False
+        transport = self.client.get_transport()
+        return transport is not None and transport.is_active()
+
+    def close_shell(self):
+        if self.shell is not None:
+            try:
+                self.shell.close()
+            except Exception:
+                pass
+        self.shell = None
+
+    def close(self):
+        self.close_shell()
+        if self.client is not None:
+            try:
+                self.client.close()
+            except Exception:
+                pass
+        self.client = None
+
+
+class SSHSessionPool:
+    """
+    Pool de conexões SSH indexado por (host, porta, usuário).
+    Seguro para uso a partir de várias threads (asyncio.to_thread).
+    """
+
+    def __init__(self, keepalive_interval: int = KEEPALIVE_INTERVAL, max_idle: float = MAX_IDLE_SECONDS):
+        self.keepalive_interval = keepalive_interval
+        self.max_idle = max_idle
+        self._sessions = {}
+        self._guard = threading.Lock()
+        # Contadores simples para os logs
+        self.connects = 0
+        self.reuses = 0
+        self.timings = {}  # host -> DeviceTiming
+        self._cache = {}   # (host, comando) -> (timestamp, saída bruta)
+
+    # --- Acesso às sessões ---
+
+    def _get_session(self, host, username, port) -> _Session:
+        key = (host, port, username)
+        with self._guard:
+            session = self._sessions.get(key)
+            if session is None:
+                session = _Session()
+                self._sessions[key] = session
+            return session
+
+    def connect(self, host, username, password, port=SSH_PORT) -> paramiko.SSHClient:
+        """
+        Retorna um SSHClient autenticado para o dispositivo,
+        reaproveitando o transporte se ele ainda estiver ativo.
+        """
+        session = self._get_session(host, username, port)
+        with session.connect_lock:
+            if session.is_alive():
+                self.reuses += 1
+                session.last_used = time.time()
+                return session.client
+
+            # Transporte morto (ou inexistente): descarta e reconecta
+            session.close()
+            client = paramiko.SSHClient()
+            client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+            connect_start = time.monotonic()
+            sock = None
+            try:
+                # O connect TCP é feito à parte para separar as etapas
+                # 'connect' e 'auth' (handshake + login) no TIMER
+                sock = socket.create_connection((host, port), timeout=CONNECT_TIMEOUT)
+                auth_start = time.monotonic()
+                TIMER.record('connect', auth_start - connect_start)
+                client.connect(
+                    hostname=host, port=port, username=username, password=password,
+                    look_for_keys=False, allow_agent=False,
+                    banner_timeout=BANNER_TIMEOUT, timeout=CONNECT_TIMEOUT, sock=sock
+                )
+                TIMER.record('auth', time.monotonic() - auth_start)
+            except Exception as e:
+                client.close()
+                if sock is not None:
+                    sock.close()
+                self._timing(host).record_error(classify_ssh_error(e))
+                BREAKER.record_failure(host, classify_ssh_error(e))
+                raise
+            # O 'prune_idle' pode ter tirado a sessão do pool durante o login:
+            # ela volta para o pool se a vaga estiver livre; se outra sessão já
+            # ocupou a vaga, o cliente novo é fechado (senão o transporte e a
+            # thread de keepalive dele ficariam abertos para sempre)
+            with self._guard:
+                registered = self._sessions.setdefault((host, port, username), session) is session
+            if not registered:
+                client.close()
+                raise paramiko.SSHException(f"Sessão de {host} removida do pool durante o connect")
+            client.get_transport().set_keepalive(self.keepalive_interval)
+            self._timing(host).record_connect(time.monotonic() - connect_start)
+            BREAKER.record_success(host)
+
+            session.client = client
+            session.last_used = time.time()
+            self.connects += 1
+            return client
+
+    @contextmanager
+    def shell(self, host, username, password, setup_commands=(), port=SSH_PORT):
+        """
+        Empresta o shell interativo persistente do dispositivo.
+
+        Na primeira vez o shell é aberto, o banner é descartado e os
+        'setup_commands' (ex: 'screen-length 0 temporary') são enviados.
+        Nas próximas, o mesmo canal é devolvido já pronto.
+        Se o bloco levantar exceção, o shell é descartado (estado incerto).
+        """
+        session = self._get_session(host, username, port)
+        with session.shell_lock:
+            client = self.connect(host, username, password, port)
+
+            if session.shell is None or session.shell.closed:
+                try:
+                    self._open_shell(host, session, client, setup_commands)
+                except Exception as e:
+                    self._timing(host).record_error(classify_ssh_error(e))
+                    raise
+            else:
+                _drain(session.shell)
+                # Shell reaproveitado: nem banner nem setup para esperar
+                self._timing(host).saved += LEGACY_BANNER_SLEEP + LEGACY_SETUP_SLEEP * len(setup_commands)
+
+            try:
+                yield session.shell
+            except Exception as e:
+                session.close_shell()
+                self._timing(host).record_error(classify_ssh_error(e))
+                raise
+            finally:
+                session.last_used = time.time()
+
+    def _open_shell(self, host, session: _Session, client: paramiko.SSHClient, setup_commands):
+        channel = client.invoke_shell()
+        saved = 0.0
+        try:
+            # Espera o banner terminar (primeiro prompt)
+            phase_start = time.monotonic()
+            output = read_until_prompt(channel)
+            saved += max(0.0, LEGACY_BANNER_SLEEP - (time.monotonic() - phase_start))
+
+            for setup_command in setup_commands:
+                phase_start = time.monotonic()
+                channel.send(setup_command + '\n')
+                output = read_until_prompt(channel)
+                saved += max(0.0, LEGACY_SETUP_SLEEP - (time.monotonic() - phase_start))
+        except Exception:
+            channel.close()
+            raise
+
+        # Guarda o prompt exato (ex: '<SW-01>'), usado para separar os lotes
+        session.prompt = output.rsplit('\n', 1)[-1].strip()
+        session.shell = channel
+        self._timing(host).saved += saved
+
+    def run_command(self, host, username, password, command, setup_commands=(),
+                    timeout=READ_TIMEOUT, port=SSH_PORT, batch=()) -> str:
+        """
+        Envia 'command' pelo shell do pool e lê até o prompt.
+        Retorna a saída bruta (eco + saída + prompt).
+        Levanta PromptTimeout (com a saída parcial) se o prompt não vier;
+        nesse caso o shell é descartado do pool.
+
+        Com 'batch', o comando vai junto com os outros do lote numa única
+        ida ao shell ('run_commands') e as saídas ficam em cache por
+        BATCH_CACHE_SECONDS: outro coletor que peça um comando do mesmo
+        lote no mesmo ciclo recebe a saída sem tocar no dispositivo. Dois
+        coletores pedindo o lote ao mesmo tempo (ex: relatorio e treshold no
+        mesmo tick do agendador) não o mandam duas vezes: o segundo espera
+        o primeiro ('batch_lock') e lê o cache.
+        """
+        if batch:
+            cached = self._cached_output(host, command)
+            if cached is None:
+                session = self._get_session(host, username, port)
+                with session.batch_lock:
+                    # O cache é conferido de novo: pode ter sido preenchido
+                    # enquanto esperávamos o lote de outro coletor
+                    cached = self._cached_output(host, command)
+                    if cached is None:
+                        commands = list(batch) if command in batch else [command] + list(batch)
+                        try:
+                            outputs = self.run_commands(host, username, password, commands, setup_commands, timeout, port)
+                            return outputs[command]
+                        except PromptTimeout as e:
+                            # Lote incompleto. Se o comando pedido terminou antes do
+                            # timeout, a saída dele está completa (e no cache). Senão
+                            # o timeout sobe só com a parte dele da transcrição: com
+                            # o lote inteiro, o coletor parsearia a saída dos outros
+                            # comandos como se fosse a do seu
+                            cached = self._cached_output(host, command)
+                            if cached is None:
+                                raise PromptTimeout(e.outputs.get(command, ''), timeout * len(commands)) from e
+
+            timing = self._timing(host)
+            timing.elapsed = timing.saved = 0.0
+            return cached
+
+        timing = self._timing(host)
+        timing.saved = 0.0
+        start_time = time.monotonic()
+
+        with self.shell(host, username, password, setup_commands, port) as channel:
+            command_start = time.monotonic()
+            clock = TIMER.read_clock()
+            channel.send(command + '\n')
+            output = read_until_prompt(channel, timeout, clock=clock)
+            command_elapsed = time.monotonic() - command_start
+
+        # Sem pausas: economizamos o sleep pós-comando que sobrar
+        # e o atraso médio do polling antigo.
+        timing.saved += max(0.0, LEGACY_COMMAND_SLEEP - command_elapsed) + LEGACY_POLL_INTERVAL / 2
+        timing.elapsed = time.monotonic() - start_time
+        timing.total_saved += timing.saved
+        return output
+
+    def run_commands(self, host, username, password, commands, setup_commands=(),
+                     timeout=READ_TIMEOUT, port=SSH_PORT) -> dict:
+        """
+        Executa uma lista de comandos numa ÚNICA sessão do dispositivo.
+
+        Os comandos são enviados de uma vez (o VTY ecoa cada um depois do
+        prompt do anterior) e a transcrição é lida até aparecerem
+        len(commands) prompts. Depois ela é cortada nos prompts, e cada
+        comando recebe a sua saída bruta (eco + saída + prompt), no mesmo
+        formato de 'run_command'. 'timeout' vale por comando.
+
+        No timeout, a PromptTimeout leva em 'outputs' a parte de cada comando
+        da transcrição parcial ('' para os que nem começaram); os que
+        terminaram antes do timeout vão para o cache.
+        """
+        timing = self._timing(host)
+        timing.saved = 0.0
+        start_time = time.monotonic()
+        session = self._get_session(host, username, port)
+
+        prompt = None
+        try:
+            with self.shell(host, username, password, setup_commands, port) as channel:
+                prompt = session.prompt
+                clock = TIMER.read_clock()
+                channel.send(''.join(command + '\n' for command in commands))
+                transcript = read_until_prompt(channel, timeout * len(commands), prompt, len(commands), clock)
+                command_elapsed = time.monotonic() - start_time
+        except PromptTimeout as e:
+            e.outputs = split_transcript(e.output, prompt, commands) if prompt else {}
+            # Terminou = a parte dele vai até o prompt seguinte
+            self._store_outputs(host, {command: output for command, output in e.outputs.items()
+                                       if output.endswith(prompt)})
+            raise
+
+        outputs = split_transcript(transcript, prompt, commands)
+
+        # Além das pausas, cada comando a mais no lote deixou de pagar
+        # um login inteiro (não medido aqui) e as pausas do leitor antigo.
+        legacy_sleeps = LEGACY_BANNER_SLEEP + LEGACY_SETUP_SLEEP * len(setup_commands) + LEGACY_COMMAND_SLEEP
+        timing.saved += (
+            max(0.0, LEGACY_COMMAND_SLEEP - command_elapsed) + LEGACY_POLL_INTERVAL / 2
+            + (legacy_sleeps + LEGACY_POLL_INTERVAL / 2) * (len(commands) - 1)
+        )
+        timing.elapsed = time.monotonic() - start_time
+        timing.total_saved += timing.saved
+
+        self._store_outputs(host, outputs)
+        return outputs
+
+    def _store_outputs(self, host, outputs: dict):
+        with self._guard:
+            now = time.time()
+            for command, output in outputs.items():
+                self._cache[(host, command)] = (now, output)
+
+    def _cached_output(self, host, command):
+        with self._guard:
+            entry = self._cache.get((host, command))
+            if entry is None:
+                return None
+            fetched_at, output = entry
+            if time.time() - fetched_at > BATCH_CACHE_SECONDS:
+                del self._cache[(host, command)]
+                return None
+            return output
+
+    def _timing(self, host) -> DeviceTiming:
+        timing = self.timings.get(host)
+        if timing is None:
+            timing = self.timings.setdefault(host, DeviceTiming())
+        return timing
+
+    def record_error(self, host, kind: str):
+        """Registra um erro visto fora do pool (ex: timeout lendo um canal 'exec')."""
+        self._timing(host).record_error(kind)
+
+    @property
+    def total_saved(self) -> float:
+        return sum(t.total_saved for t in list(self.timings.values()))
+
+    def exec_command(self, host, username, password, command, timeout=None, port=SSH_PORT):
+        """
+        Executa 'command' num canal 'exec' novo sobre o transporte do pool.
+        Retorna (stdin, stdout, stderr) como o 'SSHClient.exec_command'.
+        """
+        client = self.connect(host, username, password, port)
+        try:
+            return client.exec_command(command, timeout=timeout)
+        except paramiko.SSHException:
+            # O transporte pode ter morrido entre o teste e o uso: tenta uma vez mais
+            self.discard(host, username, port)
+            client = self.connect(host, username, password, port)
+            return client.exec_command(command, timeout=timeout)
+
+    # --- Manutenção ---
+
+    def discard(self, host, username, port=SSH_PORT):
+        """Fecha e remove a sessão de um dispositivo (ex: após erro)."""
+        with self._guard:
+            session = self._sessions.pop((host, port, username), None)
+        if session is not None:
+            session.close()
+
+    def prune_idle(self) -> int:
+        """
+        Fecha sessões mortas ou ociosas há mais de 'max_idle' segundos e
+        esquece as saídas de lote vencidas (o '_cached_output' só apaga a
+        entrada que for lida de novo: no 'agendador.py', as dos dispositivos
+        que saem do inventário ficariam para sempre).
+        """
+        now = time.time()
+        with self._guard:
+            expired = [key for key, (fetched_at, _) in self._cache.items() if now - fetched_at > BATCH_CACHE_SECONDS]
+            for key in expired:
+                del self._cache[key]
+            # Sessões em uso (conectando, com comando no shell ou buscando um
+            # lote) ficam: a que está no connect ainda não tem cliente e
+            # pareceria morta
+            stale = [
+                key for key, s in self._sessions.items()
+                if not (s.connect_lock.locked() or s.shell_lock.locked() or s.batch_lock.locked())
+                and (not s.is_alive() or now - s.last_used > self.max_idle)
+            ]
+            sessions = [self._sessions.pop(key) for key in stale]
+        for session in sessions:
+            session.close()
+        return len(sessions)
+
+    def clear_cache(self):
+        """Esquece as saídas de lote guardadas (ex: entre rodadas de benchmark)."""
+        with self._guard:
+            self._cache.clear()
+
+    def close_all(self):
+        with self._guard:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for session in sessions:
+            session.close()
+
+    def __len__(self):
+        return len(self._sessions)
+
+
+def classify_ssh_error(exc: BaseException) -> str:
+    """Classifica uma falha de SSH em 'auth', 'timeout', 'connect' ou 'other'."""
+    if isinstance(exc, paramiko.AuthenticationException):
+        return 'auth'
+    if isinstance(exc, TimeoutError):  # Inclui socket.timeout e PromptTimeout
+        return 'timeout'
+    if isinstance(exc, OSError):  # Recusada, sem rota, NoValidConnectionsError...
+        return 'connect'
+    return 'other'
+
+
+def _ends_with_prompt(output: str) -> bool:
+    """O prompt não tem quebra de linha depois: basta olhar a última linha."""
+    last_line = output.rsplit('\n', 1)[-1].strip()
+    return last_line.endswith(PROMPT_ENDINGS)
+
+
+class OutputBuffer:
+    """
+    Acumula a saída de um comando em tempo linear.
+
+    Os chunks vão para uma lista (o texto só é montado uma vez, no final) e
+    a detecção do prompt olha apenas os últimos TAIL_WINDOW caracteres, em
+    vez de fazer 'output.strip()' no buffer inteiro a cada chunk, o que era
+    quadrático nas saídas grandes ('display transceiver verbose' etc.).
+    """
+
+    def __init__(self, prompt: str | None = None):
+        self.chunks = []
+        self.size = 0
+        self.tail = ""
+        self.prompt = prompt
+        self.prompt_count = 0  # Ocorrências de 'prompt' vistas até agora
+
+    def append(self, chunk: str):
+        self.chunks.append(chunk)
+        self.size += len(chunk)
+        if self.prompt:
+            # Inclui o fim da cauda para achar um prompt partido entre dois chunks
+            overlap = self.tail[-(len(self.prompt) - 1):] if len(self.prompt) > 1 else ""
+            self.prompt_count += (overlap + chunk).count(self.prompt)
+        self.tail = (self.tail + chunk[-TAIL_WINDOW:])[-TAIL_WINDOW:]
+
+    def ends_with_prompt(self) -> bool:
+        return _ends_with_prompt(self.tail)
+
+    def done(self, count: int = 1) -> bool:
+        """Terminou: termina em prompt (e, com 'prompt', já viu 'count' deles)."""
+        if not self.ends_with_prompt():
+            return False
+        return not self.prompt or self.prompt_count >= count
+
+    def getvalue(self) -> str:
+        return ''.join(self.chunks)
+
+
+def read_until_prompt(channel: paramiko.Channel, timeout: float = READ_TIMEOUT,
+                      prompt: str | None = None, count: int = 1, clock=None) -> str:
+    """
+    Lê o canal até aparecer o prompt do dispositivo.
+    A thread fica parada em select() até chegar dado (sem sleep/polling),
+    então o retorno acontece assim que o switch termina de responder.
+
+    Com 'prompt' (o texto exato), espera 'count' ocorrências dele: é assim
+    que 'run_commands' sabe que todos os comandos do lote terminaram.
+    'clock' ('stage_timing.ReadClock'), se dado, separa a espera pelo
+    primeiro byte do tempo de leitura.
+    """
+    buffer = OutputBuffer(prompt)
+    deadline = time.monotonic() + timeout
+    while not buffer.done(count):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise PromptTimeout(buffer.getvalue(), timeout)
+
+        readable, _, _ = select.select([channel], [], [], remaining)
+        if not readable:
+            continue
+
+        chunk = channel.recv(65535)
+        if not chunk:
+            break  # Canal fechou
+        if clock is not None:
+            clock.chunk()
+        buffer.append(chunk.decode('latin-1'))
+    if clock is not None:
+        clock.done()
+    return buffer.getvalue()
+
+
+def split_transcript(transcript: str, prompt: str, commands) -> dict:
+    """
+    Corta a transcrição de um lote nos prompts (só os que começam linha)
+    e devolve {comando: eco + saída + prompt}, na ordem em que foram enviados.
+    """
+    outputs = {}
+    start = 0
+    search_from = 0
+    for command in commands:
+        while True:
+            index = transcript.find(prompt, search_from)
+            if index == -1:
+                # Lote incompleto (ex: timeout): o resto vai para este comando
+                outputs[command] = transcript[start:]
+                start = search_from = len(transcript)
+                break
+            search_from = index + len(prompt)
+            if index == 0 or transcript[index - 1] in '\r\n':
+                outputs[command] = transcript[start:search_from]
+                start = search_from
+                break
+    return outputs
+
+
+def _drain(channel: paramiko.Channel):
+    """Descarta restos de saída de um uso anterior do shell."""
+    while channel.recv_ready():
+        if not channel.recv(65535):
+            break
+
+
+# Pool único do processo, usado por todos os coletores
+POOL = SSHSessionPool()
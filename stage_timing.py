@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Tempo por etapa das coletas: connect, auth, command, read, parse e db_write.
+
+Os coletores só mediam o tempo total da varredura. Aqui cada etapa de cada
+dispositivo vira uma amostra, para o 'bench_coletores.py' (ou qualquer job)
+mostrar a distribuição (p50/p90/p99) e achar onde o tempo vai:
+
+- connect:  connect TCP até a porta SSH;
+- auth:     handshake SSH + autenticação;
+- command:  do envio do comando ao primeiro byte da resposta;
+- read:     do primeiro byte ao prompt (ou ao fim do canal 'exec');
+- parse:    parsing da saída;
+- db_write: gravações no banco do dispositivo ('relatorio.py' e
+            'relatoriojn.py' sincronizam todos de uma vez: uma amostra só).
+
+As amostras ficam em memória (no máximo MAX_SAMPLES por etapa, para o
+'agendador.py', que roda sem parar) e são lidas com 'TIMER.summary()'.
+"""
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# --- 1. CONFIGURAÇÕES ---
+STAGES = ('connect', 'auth', 'command', 'read', 'parse', 'db_write')
+
+# Amostras guardadas por etapa (as mais antigas são descartadas)
+MAX_SAMPLES = 100_000
+
+
+class ReadClock:
+    """
+    Cronômetro de um comando: criado logo antes do envio, 'chunk()' a cada
+    pedaço recebido e 'done()' no fim. Separa 'command' (espera pelo
+    primeiro byte) de 'read' (transferência até o fim).
+    """
+
+    def __init__(self, timer):
+        self.timer = timer
+        self.sent_at = time.monotonic()
+        self.first_at = None
+
+    def chunk(self):
+        if self.first_at is None:
+            self.first_at = time.monotonic()
+
+    def done(self):
+        now = time.monotonic()
+        first_at = self.first_at if self.first_at is not None else now
+        self.timer.record('command', first_at - self.sent_at)
+        self.timer.record('read', now - first_at)
+
+
+class StageTimer:
+    """Amostras (s) por etapa, gravadas pelos pools SSH e pelos coletores."""
+
+    def __init__(self):
+        self._lock = threading.Lock()  # Os pools síncronos gravam de threads
+        self.samples = {stage: deque(maxlen=MAX_SAMPLES) for stage in STAGES}
+
+    def record(self, stage, seconds):
+        with self._lock:
+            self.samples[stage].append(seconds)
+
+    @contextmanager
+    def measure(self, stage):
+        """'with TIMER.measure("parse"):' grava o tempo do bloco (só se não falhar)."""
+        start = time.monotonic()
+        yield
+        self.record(stage, time.monotonic() - start)
+
+    def read_clock(self) -> ReadClock:
+        return ReadClock(self)
+
+    def reset(self):
+        with self._lock:
+            for samples in self.samples.values():
+                samples.clear()
+
+    def summary(self) -> dict:
+        """{etapa: {count, total, mean, p50, p90, p99, max}} (etapas sem amostra ficam de fora)."""
+        with self._lock:
+            snapshot = {stage: sorted(samples) for stage, samples in self.samples.items() if samples}
+        return {
+            stage: {
+                'count': len(values),
+                'total': round(sum(values), 4),
+                'mean': round(sum(values) / len(values), 4),
+                'p50': round(_percentile(values, 50), 4),
+                'p90': round(_percentile(values, 90), 4),
+                'p99': round(_percentile(values, 99), 4),
+                'max': round(values[-1], 4),
+            }
+            for stage, values in snapshot.items()
+        }
+
+
+def _percentile(sorted_values, percent):
+    """Percentil por vizinho mais próximo (lista já ordenada)."""
+    index = max(0, min(len(sorted_values) - 1, round(percent / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+# Instância única do processo
+TIMER = StageTimer()
@@ -1,5 +1,4 @@
 #!/usr/bin/env python3
-import paramiko
 import time
 import socket
 import re
@@ -7,68 +6,90 @@ import asyncio
 from prisma import Prisma
 # Importe o novo modelo
 from prisma.models import Device, NetworkInterface, InterfaceStats
+from ssh_pool import POOL, PromptTimeout
+import ssh_async
+from ssh_async import ASYNC_POOL
+from concurrency import AdaptiveLimiter
+from circuit_breaker import BREAKER
+from device_costs import DeviceCosts
+from stage_timing import TIMER
+from db_batch import StatusWrites, create_rows, interfaces_by_device, update_groups, upsert_latest_stats
+import records
 
 # --- 1. CONFIGURAÇÕES ---
 SSH_USERNAME = "zabbix.view"
 SSH_PASSWORD = "view@123"
 
-# --- 2. LÓGICA DO SSH (Idêntica, não modificada) ---
+# True: SSH nativo do asyncio (asyncssh), sem 'asyncio.to_thread'.
+# Se o asyncssh não estiver instalado, volta sozinho para o modo com threads.
+# Desligado para os Huawei: o pool assíncrono não tem o lote/cache do
+# HUAWEI_BATCH nem a sessão do 'POOL', então cada switch ficaria com duas
+# conexões autenticadas (a do relatorio/treshold e a do status) e o brief
+# nunca viria do lote. Com o 'POOL', o status usa a mesma sessão e o cache.
+USE_ASYNC_SSH = False
+
+# --- 2. LÓGICA DO SSH (Pool compartilhado) ---
 def get_ssh_output(host, username, password, command):
     """
-    Conecta via SSH, executa um comando lendo até o prompt,
-    e só então envia 'quit'.
+    Executa um comando no shell do switch lendo até o prompt.
+    Conexão e shell vêm do pool compartilhado ('ssh_pool.py').
     """
     print(f"   -> [SSH] Executando em {host}: '{command[:35]}...'")
     output = ""
     try:
-        client = paramiko.SSHClient()
-        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-        client.connect(
-            hostname=host, port=22, username=username, password=password,
-            look_for_keys=False, allow_agent=False, banner_timeout=200, timeout=10
-        )
+        POOL.connect(host, username, password)
     except Exception as e:
         print(f"     [ERRO-SSH] Falha ao conectar SSH em {host}: {e}")
         return None
     
     try:
-        channel = client.invoke_shell()
-        channel.settimeout(10.0) 
-
-        time.sleep(1)
-        try: channel.recv(65535)
-        except socket.timeout: pass
-        
-        channel.send('screen-length 0 temporary\n')
-        time.sleep(0.5)
-        try: channel.recv(65535)
-        except socket.timeout: pass
+        # Lote de um comando só: usa o cache se o relatorio.py/treshold.py
+        # acabou de buscar o brief junto com o resto do HUAWEI_BATCH.
+        try:
+            output = POOL.run_command(
+                host, username, password, command,
+                setup_commands=['screen-length 0 temporary'], timeout=20.0,
+                batch=(command,)
+            )
+        except PromptTimeout as e:
+            print(f"     [ERRO-SSH] Timeout de 20s atingido esperando o comando em {host}")
+            output = e.output
         
-        channel.send(command + '\n')
+        timing = POOL.timings[host]
+        print(f"     [SSH-TEMPO] {host}: {timing.elapsed:.2f}s de leitura, ~{timing.saved:.2f}s de pausas fixas evitadas.")
         
-        start_time = time.time()
-        while True:
-            if channel.recv_ready():
-                chunk = channel.recv(65535)
-                if not chunk: 
-                    break 
-                output += chunk.decode('latin-1')
-                stripped_output = output.strip()
-                if stripped_output.endswith('>') or stripped_output.endswith(']'):
-                    break
-            
-            if channel.exit_status_ready():
-                break
+        lines = output.splitlines()
+        if len(lines) <= 2: return "" 
+        clean_lines = [line for line in lines[1:-1] if line.strip()]
+        return "\n".join(clean_lines)
 
-            if time.time() - start_time > 20.0:
-                print(f"     [ERRO-SSH] Timeout de 20s atingido esperando o comando em {host}")
-                break
-                
-            time.sleep(0.2)
-            
-        channel.send('quit\n')
-        time.sleep(0.5)
-        client.close()
+    except Exception as e:
+        print(f"     [ERRO-SSH] Erro durante a execução do comando SSH em {host}: {e}")
+        POOL.discard(host, username)
+        return None
+
+async def get_ssh_output_async(host, username, password, command):
+    """
+    Mesma coleta de 'get_ssh_output', mas dentro do loop de eventos
+    (asyncssh): não ocupa uma thread por dispositivo e pode ser cancelada.
+    """
+    print(f"   -> [SSH-ASYNC] Executando em {host}: '{command[:35]}...'")
+    output = ""
+    try:
+        await ASYNC_POOL.connect(host, username, password)
+    except Exception as e:
+        print(f"     [ERRO-SSH] Falha ao conectar SSH em {host}: {e}")
+        return None
+    
+    try:
+        try:
+            output = await ASYNC_POOL.run_command(
+                host, username, password, command,
+                setup_commands=['screen-length 0 temporary'], timeout=20.0
+            )
+        except PromptTimeout as e:
+            print(f"     [ERRO-SSH] Timeout de 20s atingido esperando o comando em {host}")
+            output = e.output
         
         lines = output.splitlines()
         if len(lines) <= 2: return "" 
@@ -77,7 +98,7 @@ def get_ssh_output(host, username, password, command):
 
     except Exception as e:
         print(f"     [ERRO-SSH] Erro durante a execução do comando SSH em {host}: {e}")
-        if 'client' in locals() and client: client.close()
+        ASYNC_POOL.discard(host, username)
         return None
 
 # --- 3. LÓGICA DE PARSING (Idêntica, não modificada) ---
@@ -97,10 +118,13 @@ def _normalize_interface_name(name: str) -> str:
     # Nomes como 100GE, 40GE, Eth-Trunk já são "curtos"
     return name
 
-def parse_interface_brief(output_text: str) -> dict:
+def parse_interface_brief(output_text: str, wanted: set | None = None) -> dict:
     """
     Analisa a saída do 'display interface brief' e retorna um dicionário
-    com dados de estatísticas e status por interface.
+    {interface: records.InterfaceData} com estatísticas e status.
+
+    'wanted' (opcional): nomes (já normalizados) das interfaces que
+    interessam; as outras linhas ficam fora do resultado.
     """
     all_data = {}
     lines = output_text.splitlines()
@@ -129,25 +153,22 @@ def parse_interface_brief(output_text: str) -> dict:
             
             # Normaliza o nome (ex: XGigabitEthernet0/0/3 -> XGE0/0/3)
             normalized_name = _normalize_interface_name(interface_name)
+            if wanted is not None and normalized_name not in wanted:
+                continue
 
-            # 1. Dados para a tabela de histórico 'InterfaceStats'
-            stats_data = {
-                'in_uti': float(in_uti.replace('%', '')),
-                'out_uti': float(out_uti.replace('%', '')),
-                'in_errors': int(in_errors),
-                'out_errors': int(out_errors)
-            }
-            
-            # 2. Dados para a tabela principal 'NetworkInterface'
-            status_data = {
-                'physical_status': phy,
-                'protocol_status': protocol
-            }
-
-            all_data[normalized_name] = {
-                "stats": stats_data,
-                "status": status_data
-            }
+            # Argumentos posicionais: esta linha roda uma vez por interface
+            # da frota, e a chamada com nomes custa mais que o próprio registro.
+            all_data[normalized_name] = records.InterfaceData(
+                # 1. Dados para a tabela principal 'NetworkInterface' (physical, protocol)
+                records.InterfaceStatus(phy, protocol),
+                # 2. Dados para a tabela de histórico 'InterfaceStats' (in_uti, out_uti, in_errors, out_errors)
+                records.InterfaceStats(
+                    float(in_uti.replace('%', '')),
+                    float(out_uti.replace('%', '')),
+                    int(in_errors),
+                    int(out_errors),
+                ),
+            )
         except (ValueError, IndexError) as e:
             print(f"   [WARN-PARSE] Falha ao processar linha: '{line}'. Erro: {e}")
 
@@ -156,111 +177,137 @@ def parse_interface_brief(output_text: str) -> dict:
 
 # --- 4. ORQUESTRAÇÃO (NOVA VERSÃO - PARALELA) ---
 
-async def process_stats_for_device(db: Prisma, dev: Device, semaphore: asyncio.Semaphore):
+async def process_stats_for_device(db: Prisma, dev: Device, db_interfaces: list, limiter: AdaptiveLimiter,
+                                   costs: DeviceCosts, status_writes: StatusWrites):
     """
-    Processa um UNICO dispositivo, desde a busca de interfaces, 
-    coleta SSH (em thread) e salvamento no DB.
+    Processa um UNICO dispositivo, da coleta SSH (em thread) ao salvamento
+    no DB. 'db_interfaces' são as interfaces dele no banco, já carregadas
+    pelo main() numa consulta só para toda a varredura.
     """
     
     COMMAND = "display interface brief"
     
-    # 'async with semaphore' garante que apenas X tarefas executem ao mesmo tempo
-    async with semaphore:
-        print(f"\n--- [DEV] Iniciando Processamento: {dev.hostname} (IP: {dev.ip_address}) ---")
+    if not db_interfaces:
+        print(f"   [INFO] Nenhuma interface encontrada para {dev.hostname} no DB. Pulando dispositivo.")
+        return
 
-        # --- PARTE 1: Buscar interfaces no DB (Async) ---
-        try:
-            db_interfaces = await db.networkinterface.find_many(
-                where={'device_id': dev.id}
-            )
-            
-            if not db_interfaces:
-                print(f"   [INFO] Nenhuma interface encontrada para {dev.hostname} no DB. Pulando dispositivo.")
-                return
-                
-            print(f"   [INFO] Encontradas {len(db_interfaces)} interfaces no DB. Buscando estatísticas...")
+    # Circuit breaker: host com falhas seguidas de conexão é pulado sem
+    # ocupar vaga (ou testado só com um connect TCP) - ver 'circuit_breaker.py'
+    if not await BREAKER.allow(dev.ip_address):
+        return
+    
+    # 'async with limiter' garante que só 'limiter.current' tarefas executem ao mesmo tempo
+    async with limiter as slot:
+        print(f"\n--- [DEV] Iniciando Processamento: {dev.hostname} (IP: {dev.ip_address}) ---")
 
-        except Exception as e:
-            print(f"   [ERRO-DB] Falha ao buscar interfaces de {dev.hostname}: {e}")
-            return # Pula este dispositivo
+        # --- PARTE 1: Interfaces do DB (já carregadas pelo main) ---
+        print(f"   [INFO] Encontradas {len(db_interfaces)} interfaces no DB. Buscando estatísticas...")
 
         # --- PARTE 2: Coleta SSH (Executada em Thread) ---
         raw_output = None
+        ssh_start = time.monotonic()
         try:
-            # asyncio.to_thread (Python 3.9+) roda a função síncrona
-            # em uma thread separada, sem bloquear o loop principal.
-            raw_output = await asyncio.to_thread(
-                get_ssh_output, 
-                dev.ip_address, 
-                SSH_USERNAME, 
-                SSH_PASSWORD, 
-                COMMAND
-            )
+            if USE_ASYNC_SSH and ssh_async.AVAILABLE:
+                # SSH nativo do asyncio: roda no próprio loop, sem thread
+                raw_output = await get_ssh_output_async(
+                    dev.ip_address, SSH_USERNAME, SSH_PASSWORD, COMMAND
+                )
+            else:
+                # asyncio.to_thread (Python 3.9+) roda a função síncrona
+                # em uma thread separada, sem bloquear o loop principal.
+                raw_output = await asyncio.to_thread(
+                    get_ssh_output, 
+                    dev.ip_address, 
+                    SSH_USERNAME, 
+                    SSH_PASSWORD, 
+                    COMMAND
+                )
         except Exception as e:
             print(f"   [ERRO-THREAD] Erro ao executar get_ssh_output na thread para {dev.hostname}: {e}")
             return # Pula este dispositivo
         
+        # Sinais (latência do login, timeouts, falhas de auth) para o limitador
+        ssh_timing = (ASYNC_POOL if USE_ASYNC_SSH and ssh_async.AVAILABLE else POOL).timings.get(dev.ip_address)
+        slot.observe(ssh_timing)
+        
         if not raw_output or "Error:" in raw_output:
             print(f"   [ERRO-SSH] Falha ao obter dados de {dev.ip_address} ou comando retornou erro. Pulando dispositivo.")
             return
+        costs.record_ssh(dev.ip_address, ssh_timing, ssh_start, time.monotonic() - ssh_start)
 
-        # --- PARTE 3: Parsing (Síncrono - Rápido) ---
+        # --- PARTE 3: Parsing (no próprio loop) ---
+        # O brief tem ~8-10 KB: o parse leva menos que o pickle de ida e volta
+        # até o PARSE_POOL (ver MIN_POOL_BYTES em 'parse_pool.py'), então fica aqui.
+        parse_start = time.monotonic()
         try:
-            parsed_data = parse_interface_brief(raw_output)
+            parsed_data = parse_interface_brief(
+                raw_output, {iface.interface_name for iface in db_interfaces}
+            )
         except Exception as e:
             print(f"   [ERRO-PARSE] Falha ao analisar dados de {dev.hostname}: {e}")
             return
+        parse_seconds = time.monotonic() - parse_start
+        TIMER.record('parse', parse_seconds)
+        costs.record(dev.ip_address, parse=parse_seconds)
 
         if not parsed_data:
             print(f"   [WARN] Parser não encontrou dados na saída de {dev.ip_address}.")
             return
             
         # --- PARTE 4: Salvar no DB (Async) ---
-        stats_salvas = 0
-        status_atualizado = 0
+        db_start = time.monotonic()
+        stats_rows = []
+        status_changes = {}  # tuple(status_data.items()) -> ids das interfaces que mudaram
+        status_iguais = 0
         
         for iface in db_interfaces:
             if iface.interface_name in parsed_data:
                 
                 data = parsed_data[iface.interface_name]
-                stats_data = data['stats']
-                status_data = data['status']
+                stats_data = data.stats.to_data()
+                status_data = data.status.to_data()
                 
-                # 4a. Salva o histórico na nova tabela 'InterfaceStats'
-                try:
-                    stats_data['interface_id'] = iface.id
-                    await db.interfacestats.create(data=stats_data)
-                    stats_salvas += 1
-                except Exception as e:
-                    print(f"     [ERRO-DB-STATS] Falha ao salvar stats de {iface.interface_name}: {e}")
+                # 4a. Histórico da tabela 'InterfaceStats': gravado em lote no fim
+                stats_data['interface_id'] = iface.id
+                stats_rows.append(stats_data)
 
-                # 4b. Atualiza o status (up/down) na tabela 'NetworkInterface'
-                try:
-                    await db.networkinterface.update(
-                        where={'id': iface.id},
-                        data=status_data
-                    )
-                    status_atualizado += 1
-                except Exception as e:
-                    print(f"     [ERRO-DB-STATUS] Falha ao atualizar status de {iface.interface_name}: {e}")
+                # 4b. Status (up/down) da 'NetworkInterface': só se mudou em relação
+                # ao que o find_many trouxe. As que mudaram são gravadas em lote.
+                if all(getattr(iface, field) == value for field, value in status_data.items()):
+                    status_iguais += 1
+                else:
+                    status_changes.setdefault(tuple(status_data.items()), []).append(iface.id)
+        stats_salvas = await create_rows(db.interfacestats, stats_rows, 'STATS')
+        # Última estatística de cada interface (lida pelo 'alarme.py')
+        await upsert_latest_stats(db, stats_rows)
+        status_atualizado = await update_groups(db.networkinterface, status_changes, 'STATUS')
+        status_writes.record(status_atualizado, status_iguais)
+        TIMER.record('db_write', time.monotonic() - db_start)
 
         print(f"\n--- [DEV] Concluído Processamento de {dev.hostname} ---")
         print(f"   - {stats_salvas} novos registros de estatísticas salvos.")
-        print(f"   - {status_atualizado} interfaces com status (up/down) atualizado.")
+        print(f"   - {status_atualizado} interfaces com status (up/down) atualizado, {status_iguais} sem mudança.")
 
 async def main():
     db = Prisma()
     
     # ======================================================================
     # AQUI VOCÊ CONTROLA A SIMULTANEIDADE
-    # Quantas conexões SSH podem ser abertas ao mesmo tempo.
+    # Quantas conexões SSH podem ser abertas ao mesmo tempo NO INÍCIO: o
+    # limitador adaptativo ('concurrency.py') aumenta/reduz durante a varredura.
+    # (Com USE_ASYNC_SSH não há uma thread por coleta: dá para subir bastante.)
     MAX_CONCURRENT_TASKS = 30
     # ======================================================================
     
-    semaphore = asyncio.Semaphore(MAX_CONCURRENT_TASKS)
+    limiter = AdaptiveLimiter("status", initial=MAX_CONCURRENT_TASKS)
+    # Custo aprendido por dispositivo: os mais demorados são despachados primeiro
+    costs = DeviceCosts("status")
+    # Status regravados x pulados (sem mudança) nesta varredura
+    status_writes = StatusWrites()
     
     print("[INFO] Iniciando script de coleta de ESTATÍSTICAS de interface...")
-    print(f"[INFO] Limite de {MAX_CONCURRENT_TASKS} coletas simultâneas.")
+    print(f"[INFO] Limite inicial de {limiter.current} coletas simultâneas (adaptativo).")
+    print(f"[INFO] SSH: {'asyncio nativo (asyncssh)' if USE_ASYNC_SSH and ssh_async.AVAILABLE else 'threads (paramiko)'}")
     
     start_total_time = time.time() # Medir tempo total
     
@@ -276,16 +323,22 @@ async def main():
             print("[ERRO] Nenhum dispositivo encontrado no banco de dados.")
             return
 
-        print(f"[INFO] Encontrados {len(devices)} dispositivos. Criando tarefas...")
+        # Interfaces de todos os dispositivos numa consulta só (não uma por coleta)
+        print("[DB] Buscando interfaces de todos os dispositivos...")
+        interfaces = await interfaces_by_device(db, devices)
+        print(f"[INFO] Encontrados {len(devices)} dispositivos e {sum(map(len, interfaces.values()))} interfaces. Criando tarefas...")
         
         # --- LÓGICA DE PARALELISMO ---
-        # 1. Cria uma lista de tarefas (tasks)
+        # 1. Cria uma lista de tarefas (tasks), do maior custo esperado para o menor
         tasks = []
-        for dev in devices:
-            tasks.append(process_stats_for_device(db, dev, semaphore))
+        for dev in costs.order(devices, lambda d: d.ip_address):
+            tasks.append(process_stats_for_device(db, dev, interfaces[dev.id], limiter, costs, status_writes))
         
         # 2. Executa todas as tarefas "simultaneamente"
         await asyncio.gather(*tasks)
+        print(f"[INFO] {limiter.summary()}")
+        print(f"[INFO] {status_writes.summary()}")
+        costs.save()
         # --- FIM DA LÓGICA DE PARALELISMO ---
         
         end_total_time = time.time()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Parser incremental para as saídas "um bloco por interface".
+
+'show interfaces extensive' (Junos) e 'display transceiver verbose' (Huawei)
+são uma sequência de blocos, cada um começando numa linha de cabeçalho
+('Physical interface: ...' / '... transceiver information:'). Em vez de
+esperar a saída inteira e depois fatiar, o 'BlockStreamParser' recebe os
+chunks conforme chegam do canal SSH e entrega cada bloco assim que o
+cabeçalho do PRÓXIMO aparece.
+
+Assim o parsing acontece enquanto o switch ainda está mandando dados, e a
+memória por dispositivo fica limitada a um bloco (mais a linha incompleta
+do chunk atual).
+"""
+import re
+
+
+class BlockStreamParser:
+    """
+    Divide um stream de texto em blocos que começam em 'header_regex'.
+
+    - 'on_block(name, block_text)' é chamado a cada bloco completo, com o
+      grupo 1 do cabeçalho e o texto do bloco (cabeçalho incluído), igual ao
+      fatiamento antigo 'texto[header_i.start():header_i+1.start()]'.
+    - 'on_line(line)' (opcional) vê TODAS as linhas completas, para padrões
+      que ficam fora dos blocos (ex: 'Info: Port ..., transceiver is absent.').
+    - 'accept(name)' (opcional) decide, só pelo cabeçalho, se o bloco
+      interessa: as linhas dos blocos recusados nem são guardadas e
+      'on_block' não é chamado (ficam contados em 'skipped').
+
+    Chame 'feed(chunk)' para cada pedaço recebido e 'close()' no final.
+    """
+
+    def __init__(self, header_regex: str, on_block, on_line=None, accept=None):
+        self.header = re.compile(header_regex)
+        self.on_block = on_block
+        self.on_line = on_line
+        self.accept = accept
+        self.blocks = 0          # Cabeçalhos vistos (inclusive os recusados)
+        self.skipped = 0
+        self.lines = 0
+        self._partial = ""       # Linha incompleta do último chunk
+        self._block_name = None
+        self._block_lines = []
+
+    def feed(self, chunk: str):
+        if not chunk:
+            return
+        # Só '\n' separa linhas (mesma regra do '^' com re.MULTILINE);
+        # o último pedaço fica guardado até a quebra de linha chegar.
+        lines = (self._partial + chunk).split('\n')
+        self._partial = lines.pop()
+        for line in lines:
+            self._handle_line(line + '\n')
+
+    def close(self):
+        """Processa a última linha (sem quebra) e entrega o bloco pendente."""
+        if self._partial:
+            self._handle_line(self._partial)
+            self._partial = ""
+        self._flush()
+
+    def _handle_line(self, line: str):
+        self.lines += 1
+        if self.on_line is not None:
+            self.on_line(line)
+
+        match = self.header.match(line)
+        if match:
+            self._flush()
+            self.blocks += 1
+            name = match.group(1)
+            if self.accept is None or self.accept(name):
+                self._block_name = name
+            else:
+                self.skipped += 1
+        if self._block_name is not None:
+            self._block_lines.append(line)
+
+    def _flush(self):
+        if self._block_name is None:
+            return
+        name, text = self._block_name, ''.join(self._block_lines)
+        self._block_name = None
+        self._block_lines = []
+        self.on_block(name, text)
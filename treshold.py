@@ -1,5 +1,4 @@
 #!/usr/bin/env python3
-import paramiko
 import time
 import socket
 import re
@@ -7,68 +6,46 @@ import asyncio
 from prisma import Prisma
 # Importe os novos modelos
 from prisma.models import Device, NetworkInterface, TransceiverModule, TransceiverReading
+from ssh_pool import POOL, PromptTimeout, HUAWEI_BATCH
+from stream_parser import BlockStreamParser
+from circuit_breaker import BREAKER
+from stage_timing import TIMER
+import records
+from db_batch import create_current_module, create_rows, interfaces_by_device
 
 # --- 1. CONFIGURAÇÕES ---
 SSH_USERNAME = "zabbix.view"
 SSH_PASSWORD = "view@123"
 
-# --- 2. LÓGICA DO SSH (ROBUSTA) ---
+# --- 2. LÓGICA DO SSH (ROBUSTA, Pool compartilhado) ---
 def get_ssh_output(host, username, password, command):
     """
-    Conecta via SSH, executa um comando lendo até o prompt,
-    e só então envia 'quit'.
+    Executa um comando no shell do switch lendo até o prompt.
+    Conexão e shell vêm do pool compartilhado ('ssh_pool.py').
     """
     print(f"   -> [SSH] Executando em {host}: '{command[:35]}...'")
     output = ""
     try:
-        client = paramiko.SSHClient()
-        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-        client.connect(
-            hostname=host, port=22, username=username, password=password,
-            look_for_keys=False, allow_agent=False, banner_timeout=200, timeout=10
-        )
+        POOL.connect(host, username, password)
     except Exception as e:
         print(f"     [ERRO-SSH] Falha ao conectar SSH em {host}: {e}")
         return None
     
     try:
-        channel = client.invoke_shell()
-        channel.settimeout(10.0) 
-
-        time.sleep(1)
-        try: channel.recv(65535)
-        except socket.timeout: pass
-        
-        channel.send('screen-length 0 temporary\n')
-        time.sleep(0.5)
-        try: channel.recv(65535)
-        except socket.timeout: pass
-        
-        channel.send(command + '\n')
+        # Lote HUAWEI_BATCH: descrição/brief/transceiver numa sessão só,
+        # reaproveitado pelos outros coletores Huawei do mesmo ciclo.
+        try:
+            output = POOL.run_command(
+                host, username, password, command,
+                setup_commands=['screen-length 0 temporary'], timeout=20.0,
+                batch=HUAWEI_BATCH
+            )
+        except PromptTimeout as e:
+            print(f"     [ERRO-SSH] Timeout de 20s atingido esperando o comando em {host}")
+            output = e.output
         
-        start_time = time.time()
-        while True:
-            if channel.recv_ready():
-                chunk = channel.recv(65535)
-                if not chunk: 
-                    break 
-                output += chunk.decode('latin-1')
-                stripped_output = output.strip()
-                if stripped_output.endswith('>') or stripped_output.endswith(']'):
-                    break
-            
-            if channel.exit_status_ready():
-                break
-
-            if time.time() - start_time > 20.0:
-                print(f"     [ERRO-SSH] Timeout de 20s atingido esperando o comando em {host}")
-                break
-                
-            time.sleep(0.2)
-            
-        channel.send('quit\n')
-        time.sleep(0.5)
-        client.close()
+        timing = POOL.timings[host]
+        print(f"     [SSH-TEMPO] {host}: {timing.elapsed:.2f}s de leitura, ~{timing.saved:.2f}s de pausas fixas evitadas.")
         
         lines = output.splitlines()
         if len(lines) <= 2: return "" 
@@ -77,7 +54,7 @@ def get_ssh_output(host, username, password, command):
 
     except Exception as e:
         print(f"     [ERRO-SSH] Erro durante a execução do comando SSH em {host}: {e}")
-        if 'client' in locals() and client: client.close()
+        POOL.discard(host, username)
         return None
 
 # --- 3. LÓGICA DE PARSING (AJUSTADA PARA SAÍDA GLOBAL) ---
@@ -97,196 +74,253 @@ def _normalize_interface_name(name: str) -> str:
     # Nomes como 100GE, 40GE, Eth-Trunk já são "curtos"
     return name
 
-def _parse_single_interface_block(output_text: str) -> dict | None:
+# Campos de 'display transceiver verbose' -> chave (já normalizada) na saída.
+# As chaves de temperatura ficam sem a unidade ('Temperature(°C)' -> 'Temperature').
+MODULE_STRING_FIELDS = {
+    'transceiver_type': "Transceiver Type",
+    'connector_type': "Connector Type",
+    'wavelength_nm': "Wavelength(nm)",
+    'transfer_distance_m': "Transfer Distance(m)",
+    'vendor_part_number': "Vendor Part Number",
+    'serial_number': "Manu. Serial Number",
+    'manufacturing_date': "Manufacturing Date",
+}
+READING_FLOAT_FIELDS = {
+    'temperature': "Temperature",
+    'voltage': "Voltage(V)",
+}
+# Podem vir em várias lanes ('7.10|7.10(Lane0|Lane1)'): vale o primeiro número
+READING_MULTILANE_FIELDS = {
+    'bias_current': "Bias Current(mA)",
+    'rx_power': "RX Power(dBM)",
+    'tx_power': "TX Power(dBM)",
+}
+MODULE_THRESHOLD_FIELDS = {
+    'temp_high': "Temp High Threshold",
+    'temp_low': "Temp Low Threshold",
+    'volt_high': "Volt High Threshold(V)",
+    'volt_low': "Volt Low Threshold(V)",
+    'bias_high': "Bias High Threshold(mA)",
+    'bias_low': "Bias Low Threshold(mA)",
+    'rx_power_high': "RX Power High Threshold(dBM)",
+    'rx_power_low': "RX Power Low Threshold(dBM)",
+    'tx_power_high': "TX Power High Threshold(dBM)",
+    'tx_power_low': "TX Power Low Threshold(dBM)",
+    'rx_power_high_warning': "RX Power High Warning(dBM)",
+    'rx_power_low_warning': "RX Power Low Warning(dBM)",
+    'tx_power_high_warning': "TX Power High Warning(dBM)",
+    'tx_power_low_warning': "TX Power Low Warning(dBM)",
+}
+_TEMPERATURE_KEYS = ("Temperature(", "Temp High Threshold(", "Temp Low Threshold(")
+_NUMBER_REGEX = re.compile(r"-?[\d.]+")
+
+
+def _tokenize_verbose_block(output_text: str) -> tuple[dict, str | None]:
+    """
+    Percorre o bloco UMA vez e devolve ({chave: valor}, vendor_name da seção
+    'Common information').
+
+    - Só linhas indentadas 'Chave : valor' viram campos; vale a primeira
+      ocorrência de cada chave (o 'Vendor Name' aparece em duas seções).
+    - Espaços repetidos na chave são normalizados ('Temp Low  Threshold').
+    - Linhas indentadas sem ':' continuam o valor do campo anterior
+      (leituras multi-lane quebradas em duas linhas).
+    """
+    fields = {}
+    common_vendor = None
+    in_common = False
+    last_key = None
+
+    for line in output_text.splitlines():
+        stripped = line.strip()
+        if not stripped:
+            continue
+        if stripped.startswith("---"):
+            in_common = False
+            last_key = None
+            continue
+        if stripped.startswith("Common information:"):
+            in_common = True
+            continue
+        if stripped.startswith("Manufacture information:"):
+            in_common = False
+            continue
+        if not line[0].isspace():
+            last_key = None  # Cabeçalho ou 'Info: ...'
+            continue
+
+        key, separator, value = stripped.partition(':')
+        if not separator:
+            if last_key is not None:
+                fields[last_key] += ' ' + stripped
+            continue
+
+        key = ' '.join(key.split())
+        if key.startswith(_TEMPERATURE_KEYS):
+            key = key[:key.index('(')]
+        value = value.strip()
+
+        if in_common and key == "Vendor Name" and common_vendor is None:
+            common_vendor = value
+        if key in fields:
+            last_key = None
+        else:
+            fields[key] = value
+            last_key = key
+
+    return fields, common_vendor
+
+
+def _field_string(fields: dict, key: str) -> str | None:
+    value = fields.get(key)
+    if not value or value == '-':
+        return None
+    return value
+
+
+def _field_float(fields: dict, key: str) -> float | None:
+    """Primeiro número do valor (funciona para '33.50' e '7.10|7.10(Lane0|Lane1)')."""
+    value = fields.get(key)
+    if value is None:
+        return None
+    match = _NUMBER_REGEX.search(value)
+    if not match:
+        return None
+    try:
+        return float(match.group(0))
+    except ValueError:
+        return None
+
+
+def _parse_single_interface_block(output_text: str) -> records.InterfaceData | None:
     """
-    Analisa um *único bloco* de texto e retorna um dicionário
-    separado em 'module_data' (estático) e 'reading_data' (dinâmico).
+    Analisa um *único bloco* de texto e retorna um records.InterfaceData
+    com 'module' (estático) e 'reading' (dinâmico).
+
+    O bloco é lido uma vez só ('_tokenize_verbose_block') e os campos saem
+    do mapa chave -> valor, em vez de uma busca regex por campo.
     """
     
-    # Dicionários para os novos modelos
-    module_data = {}
-    reading_data = {}
+    # Registros dos novos modelos (campos não extraídos ficam None)
+    module_data = records.TransceiverModule()
+    reading_data = records.TransceiverReading()
 
     # --- Nível 1: Verificar status principal ---
     if "transceiver is absent" in output_text:
-        reading_data['transceiver_status'] = "absent"
+        reading_data.transceiver_status = "absent"
         print("       [PARSE-BLOCK] Status detectado: absent")
         
     elif "does not support diagnostic" in output_text:
-        reading_data['transceiver_status'] = "no_diag"
+        reading_data.transceiver_status = "no_diag"
         print("       [PARSE-BLOCK] Status detectado: no_diag")
         
     elif "This interface does not support transceiver" in output_text:
         return None # Ignora interfaces lógicas
     else:
-        reading_data['transceiver_status'] = "present"
+        reading_data.transceiver_status = "present"
         print("       [PARSE-BLOCK] Status detectado: present (com diagnóstico)")
 
-    # --- Nível 2: Funções auxiliares de Regex (ancoradas) ---
-    def get_string(key_regex):
-        match = re.search(r"^\s+" + key_regex, output_text, re.MULTILINE)
-        if match:
-            value = match.group(1).strip()
-            return value if value != '-' else None
-        return None
+    # --- Nível 2: Uma passada pelo bloco ---
+    fields, common_vendor = _tokenize_verbose_block(output_text)
+
+    # --- Nível 3: Mapear e Extrair Dados ---
+    
+    # Dados do Módulo (Estáticos)
+    for name, key in MODULE_STRING_FIELDS.items():
+        setattr(module_data, name, _field_string(fields, key))
+    if common_vendor is not None:
+        module_data.vendor_name = common_vendor
+            
+    # Dados de Leitura (Dinâmicos) e Thresholds (Estáticos)
+    if reading_data.transceiver_status == "present":
+        for name, key in READING_FLOAT_FIELDS.items():
+            setattr(reading_data, name, _field_float(fields, key))
+        for name, key in READING_MULTILANE_FIELDS.items():
+            setattr(reading_data, name, _field_float(fields, key))
+        for name, key in MODULE_THRESHOLD_FIELDS.items():
+            setattr(module_data, name, _field_float(fields, key))
+
+    print(f"       [PARSE-MOD] Dados Módulo: {module_data.as_dict()}")
+    print(f"       [PARSE-READ] Dados Leitura: {reading_data.as_dict()}")
+
+    return records.InterfaceData(module=module_data, reading=reading_data)
 
-    def get_float(key_regex):
-        match = re.search(r"^\s+" + key_regex, output_text, re.MULTILINE)
-        if not match: return None
+class VerboseStreamParser(BlockStreamParser):
+    """
+    Parser incremental de 'display transceiver verbose': cada bloco de
+    'transceiver information' é analisado assim que o próximo cabeçalho
+    chega, e as linhas 'transceiver is absent' são anotadas no caminho.
+    Use 'feed(chunk)' durante a leitura e 'result()' no final.
+    """
+
+    # CORREÇÃO: Permite nomes que começam com números (ex: 100GE, 40GE)
+    HEADER_REGEX = r"^([A-Za-z0-9-/.]+) transceiver information:"
+    ABSENT_REGEX = re.compile(r"Info: Port ([A-Za-z-]+\d+[\d/.]+), transceiver is absent\.")
+
+    def __init__(self):
+        super().__init__(self.HEADER_REGEX, self._parse_block, self._check_absent)
+        self.data = {}
+        self.absent_interfaces_long = []
+
+    def _check_absent(self, line):
+        absent_match = self.ABSENT_REGEX.search(line)
+        if absent_match:
+            self.absent_interfaces_long.append(absent_match.group(1))
+
+    def _parse_block(self, long_name, interface_block_text):
         try:
-            val_match = re.search(r"(-?[\d.]+)", match.group(1))
-            return float(val_match.group(1)) if val_match else None
-        except (ValueError, TypeError, AttributeError):
-            return None
+            interface_name = _normalize_interface_name(long_name)
             
-    def get_multilane_string(key_regex, stop_keyword):
-        regex = rf"^\s+{key_regex}\s*:\s*([\s\S]*?)(?=^\s+{stop_keyword}|^\s+-{{3,}})"
-        match = re.search(regex, output_text, re.MULTILINE)
-        if match:
-            return ' '.join(match.group(1).split())
-        return None
+            print(f"\n     --- [IFACE-PARSE] Processando Bloco para: {long_name} (como {interface_name}) ---")
+            
+            # parsed_data é um records.InterfaceData (module + reading)
+            parsed_data = _parse_single_interface_block(interface_block_text) 
+            
+            if parsed_data:
+                self.data[interface_name] = parsed_data
+            else:
+                print(f"       [PARSE-BLOCK] Interface {long_name} ({interface_name}) ignorada.")
+        except Exception as e:
+            print(f"     [ERRO-PARSE] Erro ao processar bloco para {long_name}: {e}")
 
-    # ***** INÍCIO DA NOVA FUNÇÃO DE CORREÇÃO *****
-    def get_first_float_from_string(raw_string: str | None) -> float | None:
+    def result(self) -> dict:
         """
-        Tenta extrair o *primeiro* valor float de uma string.
-        Funciona para '33.50' e para '7.10|7.10(Lane0|Lane1)'.
+        Fecha o stream e retorna um dicionário
+        {interface: records.InterfaceData} (module e reading).
         """
-        if raw_string is None:
-            return None
-        
-        # Tenta encontrar o primeiro número (com decimal ou sinal negativo)
-        match = re.search(r"(-?[\d.]+)", raw_string)
-        if not match:
-            return None
-            
-        try:
-            return float(match.group(1))
-        except (ValueError, TypeError):
-            return None
-    # ***** FIM DA NOVA FUNÇÃO DE CORREÇÃO *****
+        self.close()
+        all_data = self.data
 
+        if self.blocks:
+            print(f"     [PARSE-GLOBAL] Encontrados {self.blocks} blocos de interface na saída.")
 
-    # --- Nível 3: Mapear e Extrair Dados ---
-    
-    # Dados do Módulo (Estáticos)
-    module_data['transceiver_type'] = get_string(r"Transceiver Type\s*:\s*(.*)")
-    module_data['connector_type'] = get_string(r"Connector Type\s*:\s*(.*)")
-    module_data['wavelength_nm'] = get_string(r"Wavelength\(nm\)\s*:\s*(.*)")
-    module_data['transfer_distance_m'] = get_string(r"Transfer Distance\(m\)\s*:\s*(.*)")
-    module_data['vendor_part_number'] = get_string(r"Vendor Part Number\s*:\s*(.*)")
-    module_data['serial_number'] = get_string(r"Manu\. Serial Number\s*:\s*(.*)")
-    module_data['manufacturing_date'] = get_string(r"Manufacturing Date\s*:\s*(.*)")
-    
-    common_info_match = re.search(r"Common information:([\s\S]*?)(?:Manufacture information:|-{3,})", output_text, re.MULTILINE)
-    if common_info_match:
-        vendor_match = re.search(r"^\s+Vendor Name\s*:\s*(.*)", common_info_match.group(1), re.MULTILINE)
-        if vendor_match:
-            module_data['vendor_name'] = vendor_match.group(1).strip()
-            
-    # Dados de Leitura (Dinâmicos) e Thresholds (Estáticos)
-    if reading_data['transceiver_status'] == "present":
-        # Leituras (Dinâmicas)
-        reading_data['temperature'] = get_float(r"Temperature\(\S+\)\s*:\s*(.*)")
-        reading_data['voltage'] = get_float(r"Voltage\(V\)\s*:\s*(.*)")
-        
-        # ***** INÍCIO DA CORREÇÃO DE TIPO (String -> Float) *****
-        # Obtém a string bruta (que pode ser multi-lane)
-        bias_str = get_multilane_string(r"Bias Current\(mA\)", r"Bias High Threshold")
-        rx_str = get_multilane_string(r"RX Power\(dBM\)", r"RX Power High Warning")
-        tx_str = get_multilane_string(r"TX Power\(dBM\)", r"TX Power High Warning")
-
-        # Converte para float pegando apenas o primeiro valor
-        reading_data['bias_current'] = get_first_float_from_string(bias_str)
-        reading_data['rx_power'] = get_first_float_from_string(rx_str)
-        reading_data['tx_power'] = get_first_float_from_string(tx_str)
-        # ***** FIM DA CORREÇÃO DE TIPO *****
+        # Portas 'absent' só entram se não vieram num bloco próprio
+        if self.absent_interfaces_long:
+            print(f"     [PARSE-GLOBAL] Encontradas {len(self.absent_interfaces_long)} interfaces 'absent'.")
+            for long_name in self.absent_interfaces_long:
+                iface_name = _normalize_interface_name(long_name) 
+                if iface_name not in all_data:
+                    print(f"     [PARSE-GLOBAL] Marcando {long_name} (como {iface_name}) como 'absent'.")
+                    all_data[iface_name] = records.InterfaceData(
+                        module=records.TransceiverModule(serial_number=None), # Serial None é crucial para a lógica
+                        reading=records.TransceiverReading(transceiver_status="absent"),
+                    )
         
-        # Thresholds (Estáticos, parte do Módulo)
-        module_data['temp_high'] = get_float(r"Temp High Threshold\(\S+\)\s*:\s*(.*)")
-        module_data['temp_low'] = get_float(r"Temp Low\s+Threshold\(\S+\)\s*:\s*(.*)")
-        module_data['volt_high'] = get_float(r"Volt High Threshold\(V\)\s*:\s*(.*)")
-        module_data['volt_low'] = get_float(r"Volt Low\s+Threshold\(V\)\s*:\s*(.*)")
-        module_data['bias_high'] = get_float(r"Bias High Threshold\(mA\)\s*:\s*(.*)")
-        module_data['bias_low'] = get_float(r"Bias Low\s+Threshold\(mA\)\s*:\s*(.*)")
-        module_data['rx_power_high'] = get_float(r"RX Power High Threshold\(dBM\)\s*:\s*(.*)")
-        module_data['rx_power_low'] = get_float(r"RX Power Low\s+Threshold\(dBM\)\s*:\s*(.*)")
-        module_data['tx_power_high'] = get_float(r"TX Power High Threshold\(dBM\)\s*:\s*(.*)")
-        module_data['tx_power_low'] = get_float(r"TX Power Low\s+Threshold\(dBM\)\s*:\s*(.*)")
-        module_data['rx_power_high_warning'] = get_float(r"RX Power High Warning\(dBM\)\s*:\s*(.*)")
-        module_data['rx_power_low_warning'] = get_float(r"RX Power Low\s+Warning\(dBM\)\s*:\s*(.*)")
-        module_data['tx_power_high_warning'] = get_float(r"TX Power High Warning\(dBM\)\s*:\s*(.*)")
-        module_data['tx_power_low_warning'] = get_float(r"TX Power Low\s+Warning\(dBM\)\s*:\s*(.*)")
-
-    # Limpa valores nulos (None) dos dicionários
-    clean_module_data = {k: v for k, v in module_data.items() if v is not None}
-    clean_reading_data = {k: v for k, v in reading_data.items() if v is not None}
-
-    print(f"       [PARSE-MOD] Dados Módulo: {clean_module_data}")
-    print(f"       [PARSE-READ] Dados Leitura: {clean_reading_data}")
-
-    return {
-        "module": clean_module_data,
-        "reading": clean_reading_data
-    }
+        if not self.blocks and not self.absent_interfaces_long:
+             print("     [PARSE-GLOBAL] Nenhuma interface (presente ou ausente) encontrada na saída.")
+             return {}
+
+        print(f"\n     [PARSE-GLOBAL] Análise concluída. {len(all_data)} interfaces com dados extraídos.")
+        return all_data
 
 def parse_global_verbose_output(global_output_text: str) -> dict:
     """
-    Analisa a saída completa e retorna um dicionário de dicionários
-    (module_data e reading_data) por interface.
+    Analisa a saída completa e retorna um dicionário
+    {interface: records.InterfaceData} (module e reading).
     """
-    all_data = {}
-    
-    # --- PASSO 1: Encontrar e processar blocos de transceivers PRESENTES ---
-    # CORREÇÃO: Permite nomes que começam com números (ex: 100GE, 40GE)
-    interface_header_regex = r"^([A-Za-z0-9-/.]+) transceiver information:"
-    
-    headers = list(re.finditer(interface_header_regex, global_output_text, re.MULTILINE))
-    
-    if headers:
-        print(f"     [PARSE-GLOBAL] Encontrados {len(headers)} blocos de interface na saída.")
-        for i, header_match in enumerate(headers):
-            try:
-                long_name = header_match.group(1)
-                interface_name = _normalize_interface_name(long_name)
-                
-                start_index = header_match.start()
-                end_index = headers[i + 1].start() if (i + 1) < len(headers) else len(global_output_text)
-                interface_block_text = global_output_text[start_index:end_index]
-                
-                print(f"\n     --- [IFACE-PARSE] Processando Bloco para: {long_name} (como {interface_name}) ---")
-                
-                # parsed_data agora é {'module': {...}, 'reading': {...}}
-                parsed_data = _parse_single_interface_block(interface_block_text) 
-                
-                if parsed_data:
-                    all_data[interface_name] = parsed_data
-                else:
-                    print(f"       [PARSE-BLOCK] Interface {long_name} ({interface_name}) ignorada.")
-            except Exception as e:
-                print(f"     [ERRO-PARSE] Erro ao processar bloco para {long_name}: {e}")
-
-    # --- PASSO 2: Encontrar e processar portas 'absent' ---
-    absent_regex = r"Info: Port ([A-Za-z-]+\d+[\d/.]+), transceiver is absent\."
-    absent_interfaces_long = re.findall(absent_regex, global_output_text)
-    
-    if absent_interfaces_long:
-        print(f"     [PARSE-GLOBAL] Encontradas {len(absent_interfaces_long)} interfaces 'absent'.")
-        for long_name in absent_interfaces_long:
-            iface_name = _normalize_interface_name(long_name) 
-            if iface_name not in all_data:
-                print(f"     [PARSE-GLOBAL] Marcando {long_name} (como {iface_name}) como 'absent'.")
-                all_data[iface_name] = {
-                    "module": {"serial_number": None}, # Serial None é crucial para a lógica
-                    "reading": {"transceiver_status": "absent"}
-                }
-    
-    if not headers and not absent_interfaces_long:
-         print("     [PARSE-GLOBAL] Nenhuma interface (presente ou ausente) encontrada na saída.")
-         return {}
-
-    print(f"\n     [PARSE-GLOBAL] Análise concluída. {len(all_data)} interfaces com dados extraídos.")
-    return all_data
+    parser = VerboseStreamParser()
+    parser.feed(global_output_text)
+    return parser.result()
 
 
 # --- 4. ORQUESTRAÇÃO (MAIN) ---
@@ -308,23 +342,22 @@ async def main():
             print("[ERRO] Nenhum dispositivo encontrado no banco de dados. Execute 'relatorio.py' primeiro.")
             return
 
-        print(f"[INFO] Encontrados {len(devices)} dispositivos no banco de dados para verificar.")
+        # Interfaces de todos os dispositivos (com o módulo atual, para comparar
+        # o S/N) numa consulta só - não uma por dispositivo
+        print("[DB] Buscando interfaces de todos os dispositivos...")
+        interfaces = await interfaces_by_device(db, devices, include={'current_module': True})
+        print(f"[INFO] Encontrados {len(devices)} dispositivos ({sum(map(len, interfaces.values()))} interfaces) no banco de dados para verificar.")
         
         COMMAND_GLOBAL = "display transceiver verbose"
         
         for dev in devices:
             print(f"\n--- [DEV] Processando Dispositivo: {dev.hostname} (IP: {dev.ip_address}) ---")
             
-            # Incluir as relações na busca
-            db_interfaces = await db.networkinterface.find_many(
-                where={'device_id': dev.id},
-                include={
-                    'modules': { # Pega apenas o último módulo registrado
-                        'order_by': {'timestamp': 'desc'},
-                        'take': 1
-                    }
-                }
-            )
+            # Circuit breaker: host com falhas seguidas de conexão é pulado
+            if not await BREAKER.allow(dev.ip_address):
+                continue
+            
+            db_interfaces = interfaces[dev.id]
             
             if not db_interfaces:
                 print(f"   [INFO] Nenhuma interface encontrada para {dev.hostname} no DB. Pulando dispositivo.")
@@ -332,54 +365,54 @@ async def main():
                 
             print(f"   [INFO] Encontradas {len(db_interfaces)} interfaces no DB. Buscando dados de transceiver...")
             
-            global_raw_output = get_ssh_output(dev.ip_address, SSH_USERNAME, SSH_PASSWORD, COMMAND_GLOBAL)
+            # Em thread, para não travar o loop quando rodar junto com outros jobs ('agendador.py')
+            global_raw_output = await asyncio.to_thread(
+                get_ssh_output, dev.ip_address, SSH_USERNAME, SSH_PASSWORD, COMMAND_GLOBAL
+            )
             
             if not global_raw_output or "Error:" in global_raw_output:
                 print(f"   [ERRO-SSH] Falha ao obter dados de {dev.ip_address} ou comando retornou erro. Pulando dispositivo.")
                 continue
             
-            all_transceiver_data = parse_global_verbose_output(global_raw_output)
+            with TIMER.measure('parse'):
+                all_transceiver_data = parse_global_verbose_output(global_raw_output)
             
             if not all_transceiver_data:
                 print(f"   [WARN] Parser não encontrou dados de transceiver na saída de {dev.ip_address}.")
                 continue
             
-            readings_salvas = 0
+            db_start = time.monotonic()
             modules_salvos = 0
             interfaces_sem_dados = 0
+            reading_rows = []
             
             for iface in db_interfaces:
                 
                 if iface.interface_name in all_transceiver_data:
                     
                     parsed_data = all_transceiver_data[iface.interface_name]
-                    module_data = parsed_data.get('module', {})
-                    reading_data = parsed_data.get('reading', {})
+                    module_data = parsed_data.module.to_data()
+                    reading_data = parsed_data.reading.to_data()
 
                     # --- LÓGICA DE SALVAMENTO DE LEITURA (A CADA 5 MIN) ---
-                    try:
-                        # Adiciona o ID da interface e salva na tabela de Leituras
-                        reading_data['interface_id'] = iface.id
-                        await db.transceiverreading.create(data=reading_data)
-                        readings_salvas += 1
-                        print(f"     [SAVE-READ] Leitura de {iface.interface_name} salva.")
-                    except Exception as e:
-                        print(f"     [ERRO-DB-READ] Falha ao salvar leitura de {iface.interface_name}: {e}")
+                    # Adiciona o ID da interface; as leituras do dispositivo
+                    # são gravadas em lote depois do loop
+                    reading_data['interface_id'] = iface.id
+                    reading_rows.append(reading_data)
 
                     # --- LÓGICA DE SALVAMENTO DE MÓDULO (CONDICIONAL) ---
                     try:
-                        # Compara S/N novo com o S/N antigo
-                        last_module = iface.modules[0] if iface.modules else None
+                        # Compara S/N novo com o S/N do módulo atual
+                        last_module = iface.current_module
                         last_serial = last_module.serial_number if last_module else None
-                        new_serial = module_data.get('serial_number') # Pode ser None se 'absent'
+                        new_serial = parsed_data.module.serial_number # Pode ser None se 'absent'
 
                         if new_serial != last_serial:
                             print(f"     [SAVE-MODULE] *** Detecção de mudança de módulo em {iface.interface_name}! ***")
                             print(f"       S/N Antigo: {last_serial} -> S/N Novo: {new_serial}")
                             
-                            # Adiciona o ID da interface e salva na tabela de Módulos
-                            module_data['interface_id'] = iface.id
-                            await db.transceivermodule.create(data=module_data)
+                            # Salva na tabela de Módulos e vira o módulo atual da interface
+                            await create_current_module(db, iface.id, module_data)
                             modules_salvos += 1
                         
                     except Exception as e:
@@ -387,6 +420,9 @@ async def main():
 
                 else:
                     interfaces_sem_dados += 1
+            readings_salvas = await create_rows(db.transceiverreading, reading_rows, 'READ')
+            print(f"     [SAVE-READ] {readings_salvas} leituras de {dev.hostname} salvas em lote.")
+            TIMER.record('db_write', time.monotonic() - db_start)
 
             print(f"\n--- [DEV] Concluído Processamento de {dev.hostname} ---")
             print(f"   - {readings_salvas} leituras dinâmicas salvas.")
@@ -1,5 +1,4 @@
 #!/usr/bin/env python3
-import paramiko
 import time
 import socket
 import re
@@ -7,6 +6,19 @@ import asyncio
 import pprint
 from prisma import Prisma
 from prisma.models import Device, NetworkInterface, TransceiverModule, TransceiverReading, InterfaceStats
+from ssh_pool import POOL
+from stream_parser import BlockStreamParser
+import ssh_async
+from ssh_async import ASYNC_POOL
+from concurrency import AdaptiveLimiter
+from circuit_breaker import BREAKER
+from device_costs import DeviceCosts
+from stage_timing import TIMER
+from concurrent.futures.process import BrokenProcessPool
+from parse_pool import PARSE_POOL, CHUNK_BYTES, MIN_POOL_BYTES
+import records
+from db_batch import (StatusWrites, create_current_module, create_rows, interfaces_by_device, update_groups,
+                      upsert_latest_stats)
 
 # --- 1. CONFIGURAÇÕES ---
 
@@ -18,29 +30,34 @@ SAVE_TO_DATABASE = True
 SSH_USERNAME = "zabbix.view"
 SSH_PASSWORD = "view@123"
 
+# True: SSH nativo do asyncio (asyncssh), sem 'asyncio.to_thread'.
+# Se o asyncssh não estiver instalado, volta sozinho para o modo com threads.
+USE_ASYNC_SSH = True
+
 
 
 # --- 2. LÓGICA DO SSH (NOVA VERSÃO - USANDO EXEC_COMMAND) ---
-def get_ssh_output(host, username, password, command):
+def stream_ssh_output(host, username, password, command, on_chunk, drain=None):
     """
     Conecta via SSH e usa 'exec_command' para rodar um único comando,
     que é a forma mais robusta de capturar saídas longas no Juniper.
+
+    A saída NÃO é acumulada: cada chunk recebido do canal vai direto para
+    'on_chunk' (ex: 'ExtensiveStreamParser.feed'), então o parsing acontece
+    enquanto o roteador ainda está enviando o resto. 'drain' (opcional) é
+    chamado depois de cada chunk e pode segurar a leitura (ex:
+    'ExtensiveStreamParser.drain', enquanto o pool de parse está cheio).
+    Retorna True em caso de sucesso e None em caso de erro/saída curta.
     """
     
     # Anexa o comando '| no-more' para desabilitar a paginação no Junos
     full_command = f"{command} | no-more"
     
     print(f"   -> [SSH] Executando em {host}: '{full_command[:45]}...'")
-    output = ""
-    error_output = ""
     
     try:
-        client = paramiko.SSHClient()
-        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-        client.connect(
-            hostname=host, port=22, username=username, password=password,
-            look_for_keys=False, allow_agent=False, banner_timeout=200, timeout=10
-        )
+        # Reaproveita a conexão já autenticada do pool (se houver)
+        POOL.connect(host, username, password)
     except Exception as e:
         print(f"     [ERRO-SSH] Falha ao conectar SSH em {host}: {e}")
         return None
@@ -51,15 +68,29 @@ def get_ssh_output(host, username, password, command):
         COMMAND_TIMEOUT = 180.0 
         
         print(f"     [SSH-WAIT] Aguardando comando (Timeout global: {COMMAND_TIMEOUT}s)...")
-        stdin, stdout, stderr = client.exec_command(full_command, timeout=COMMAND_TIMEOUT)
+        # Canal 'exec' novo sobre o transporte compartilhado
+        clock = TIMER.read_clock()
+        stdin, stdout, stderr = POOL.exec_command(host, username, password, full_command, timeout=COMMAND_TIMEOUT)
         
-        # Lê a saída padrão (os dados que queremos)
-        output = stdout.read().decode('latin-1')
+        # Lê a saída padrão (os dados que queremos) conforme ela chega
+        line_count = 0
+        head = ""  # Começo da saída, só para o log de resposta curta
+        while True:
+            chunk = stdout.channel.recv(65535)
+            if not chunk:
+                break  # EOF: comando terminou
+            clock.chunk()
+            text = chunk.decode('latin-1')
+            line_count += text.count('\n')
+            if len(head) < 2048:
+                head += text[:2048]
+            on_chunk(text)
+            if drain is not None:
+                drain()
         
         # Lê a saída de erro (para debug)
         error_output = stderr.read().decode('latin-1')
-        
-        client.close()
+        clock.done()
         
         # --- DEBUG (LOGS QUE VOCÊ PEDIU) ---
         if error_output:
@@ -71,25 +102,102 @@ def get_ssh_output(host, username, password, command):
             if "not found" in error_output or "error:" in error_output:
                 return None 
                 
-        if len(output.splitlines()) <= 5: 
-            print(f"     [WARN-SSH] Recebida resposta muito curta de {host} ({len(output.splitlines())} linhas).")
+        if line_count <= 5: 
+            print(f"     [WARN-SSH] Recebida resposta muito curta de {host} ({line_count} linhas).")
             print("     [WARN-SSH] === INÍCIO DA SAÍDA DESCARTADA ===")
-            print(output if output else "[NENHUMA SAÍDA RECEBIDA]")
+            print(head if head else "[NENHUMA SAÍDA RECEBIDA]")
             print("     [WARN-SSH] === FIM DA SAÍDA DESCARTADA ===")
-            return "" # Retorna vazio, o que causa o erro na 'main'
+            return None # Causa o erro na 'main'
         
         print(f"     [SSH-OK] Coleta de {host} concluída com sucesso.")
-        return output
+        return True
 
     except socket.timeout:
         print(f"     [ERRO-SSH] Timeout GLOBAL de {COMMAND_TIMEOUT}s atingido em {host}. O comando travou.")
-        if 'client' in locals() and client: client.close()
+        POOL.record_error(host, 'timeout')
+        POOL.discard(host, username)
         return None
     except Exception as e:
         print(f"     [ERRO-SSH] Erro durante a execução do comando SSH em {host}: {e}")
-        if 'client' in locals() and client: client.close()
+        POOL.discard(host, username)
         return None
 
+async def stream_ssh_output_async(host, username, password, command, on_chunk, drain=None):
+    """
+    Mesma coleta de 'stream_ssh_output', mas dentro do loop de eventos
+    (asyncssh): não ocupa uma thread por dispositivo e pode ser cancelada.
+    Aqui 'drain' é uma corrotina (ex: 'ExtensiveStreamParser.drain_async').
+    """
+    full_command = f"{command} | no-more"
+    
+    print(f"   -> [SSH-ASYNC] Executando em {host}: '{full_command[:45]}...'")
+    
+    try:
+        await ASYNC_POOL.connect(host, username, password)
+    except Exception as e:
+        print(f"     [ERRO-SSH] Falha ao conectar SSH em {host}: {e}")
+        return None
+    
+    COMMAND_TIMEOUT = 180.0 
+    process = None
+    try:
+        print(f"     [SSH-WAIT] Aguardando comando (Timeout global: {COMMAND_TIMEOUT}s)...")
+        clock = TIMER.read_clock()
+        process = await ASYNC_POOL.open_exec(host, username, password, full_command)
+        
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + COMMAND_TIMEOUT
+        line_count = 0
+        while True:
+            chunk = await asyncio.wait_for(process.stdout.read(65535), deadline - loop.time())
+            if not chunk:
+                break  # EOF: comando terminou
+            clock.chunk()
+            line_count += chunk.count('\n')
+            on_chunk(chunk)
+            if drain is not None:
+                await drain()
+        
+        error_output = await asyncio.wait_for(process.stderr.read(), deadline - loop.time())
+        clock.done()
+        if error_output:
+            print(f"     [WARN-SSH] {host} retornou um erro (stderr): {error_output[:100]}")
+            if "not found" in error_output or "error:" in error_output:
+                return None 
+                
+        if line_count <= 5: 
+            print(f"     [WARN-SSH] Recebida resposta muito curta de {host} ({line_count} linhas).")
+            return None
+        
+        print(f"     [SSH-OK] Coleta de {host} concluída com sucesso.")
+        return True
+
+    except asyncio.TimeoutError:
+        print(f"     [ERRO-SSH] Timeout GLOBAL de {COMMAND_TIMEOUT}s atingido em {host}. O comando travou.")
+        ASYNC_POOL.record_error(host, 'timeout')
+        ASYNC_POOL.discard(host, username)
+        return None
+    except Exception as e:
+        print(f"     [ERRO-SSH] Erro durante a execução do comando SSH em {host}: {e}")
+        ASYNC_POOL.discard(host, username)
+        return None
+    finally:
+        if process is not None:
+            process.close()
+
+def get_ssh_output(host, username, password, command):
+    """Versão que devolve a saída inteira (útil para depurar um dispositivo)."""
+    chunks = []
+    if not stream_ssh_output(host, username, password, command, chunks.append):
+        return None
+    return "".join(chunks)
+
+async def get_ssh_output_async(host, username, password, command):
+    chunks = []
+    if not await stream_ssh_output_async(host, username, password, command, chunks.append):
+        return None
+    return "".join(chunks)
+
 # --- 3. LÓGICA DE PARSING (NOVO PARSER ÚNICO) ---
 
 def _normalize_interface_name(name: str) -> str:
@@ -121,300 +229,520 @@ def _parse_speed_to_bps(speed_str: str | None) -> int | None:
     except Exception:
         return None
 
-def _get_juniper_float(key_regex: str, text: str, target_unit_regex: str) -> float | None:
+# Campos de 'show interfaces extensive' -> (chave antes do ':', unidade preferida).
+# Valores com duas unidades ('1.695 mW / 2.29 dBm') usam o número da unidade preferida.
+READING_FIELDS = {
+    'temperature': ("Module temperature", "degrees C"),
+    'voltage': ("Module voltage", "V"),
+}
+# Lidos da seção 'Lane 0' quando ela existe (ópticos multi-lane)
+LANE_READING_FIELDS = {
+    'bias_current': ("Laser bias current", "mA"),
+    'tx_power': ("Laser output power", "dBm"),
+    'rx_power': ("Laser receiver power", "dBm"),
+}
+MODULE_THRESHOLD_FIELDS = {
+    'temp_high': ("Module temperature high alarm threshold", "degrees C"),
+    'temp_low': ("Module temperature low alarm threshold", "degrees C"),
+    'temp_high_warning': ("Module temperature high warning threshold", "degrees C"),
+    'temp_low_warning': ("Module temperature low warning threshold", "degrees C"),
+    'volt_high': ("Module voltage high alarm threshold", "V"),
+    'volt_low': ("Module voltage low alarm threshold", "V"),
+    'volt_high_warning': ("Module voltage high warning threshold", "V"),
+    'volt_low_warning': ("Module voltage low warning threshold", "V"),
+    'bias_high': ("Laser bias current high alarm threshold", "mA"),
+    'bias_low': ("Laser bias current low alarm threshold", "mA"),
+    'bias_high_warning': ("Laser bias current high warning threshold", "mA"),
+    'bias_low_warning': ("Laser bias current low warning threshold", "mA"),
+    'tx_power_high': ("Laser output power high alarm threshold", "dBm"),
+    'tx_power_low': ("Laser output power low alarm threshold", "dBm"),
+    'tx_power_high_warning': ("Laser output power high warning threshold", "dBm"),
+    'tx_power_low_warning': ("Laser output power low warning threshold", "dBm"),
+    'rx_power_high': ("Laser rx power high alarm threshold", "dBm"),
+    'rx_power_low': ("Laser rx power low alarm threshold", "dBm"),
+    'rx_power_high_warning': ("Laser rx power high warning threshold", "dBm"),
+    'rx_power_low_warning': ("Laser rx power low warning threshold", "dBm"),
+}
+MODULE_STRING_FIELDS = {
+    'serial_number': "Vendor S/N",
+    'vendor_part_number': "Vendor P/N",
+    'vendor_name': "Vendor Name",
+    'connector_type': "Connector",
+    'wavelength_nm': "Wavelength",
+}
+STATS_KEYS = ("Speed", "Input  bytes", "Output bytes", "Errors", "CRC/Align errors")
+
+# Linhas que abrem seções do bloco -> nome da seção (None: a linha só fecha uma seção)
+SECTION_HEADERS = {
+    "Input errors:": 'input_errors',
+    "Output errors:": 'output_errors',
+    "Statistics last cleared:": None,
+    "Module:": 'module',
+    "Transceiver diagnostic:": 'diag',
+    "Lane 0": 'lane0',
+    "Lane 1": None,
+}
+
+_EXTENSIVE_KEYS = sorted(
+    set(STATS_KEYS) | set(MODULE_STRING_FIELDS.values())
+    | {key for fields in (READING_FIELDS, LANE_READING_FIELDS, MODULE_THRESHOLD_FIELDS)
+       for key, _ in fields.values()},
+    key=len, reverse=True,  # 'Module temperature high alarm threshold' antes de 'Module temperature'
+)
+# Uma única regex para o bloco todo: só casa no começo das linhas que interessam
+# (cabeçalho de seção, 'Chave : valor' conhecida ou linha em branco), o resto
+# do bloco (contadores das interfaces lógicas, filas de CoS...) é pulado em C.
+# Ancorada no '\n' (e não em '^' com MULTILINE), para a busca saltar de uma
+# quebra de linha para a outra em vez de testar cada posição, e com a primeira
+# letra das chaves na frente, para descartar logo as linhas sem interesse.
+_FIRST_CHARS = ''.join(sorted({key[0] for key in (*_EXTENSIVE_KEYS, *SECTION_HEADERS)}))
+_EXTENSIVE_LINE_REGEX = re.compile(
+    r"\n[ \t]*(?=[" + re.escape(_FIRST_CHARS) + r"\n]|\Z)"
+    r"(?:(?P<header>" + "|".join(map(re.escape, SECTION_HEADERS)) + r")(?P<rest>[^\n]*)"
+    r"|(?P<key>" + "|".join(map(re.escape, _EXTENSIVE_KEYS)) + r")[ \t]*:[ \t]*(?P<value>[^\n]*)"
+    r"|(?=\n|\Z))"
+)
+_WORD_LINE_REGEX = re.compile(r"^\s*\w", re.MULTILINE)
+_NUMBER_REGEX = re.compile(r"(-?[\d\.]+)")
+_DIGITS_REGEX = re.compile(r"\d+")
+_UNIT_NUMBER_REGEXES = {unit: re.compile(r"(-?[\d\.]+)\s*" + unit) for unit in ("bps", "degrees C", "V", "mA", "dBm")}
+
+
+def _tokenize_extensive_block(output_text: str) -> dict:
     """
-    Helper para extrair um float de uma linha do Juniper,
-    priorizando a unidade alvo (ex: 'dBm' em vez de 'mW').
+    Percorre o bloco UMA vez e devolve {seção: {chave: valor}}, com a primeira
+    ocorrência de cada 'Chave : valor' de cada seção. 'block' é o bloco
+    inteiro; as outras seções têm os mesmos recortes das buscas regex da
+    versão anterior:
+
+    - 'input_errors':  de 'Input errors:' até a linha 'Output errors:';
+    - 'output_errors': de 'Output errors:' até 'Statistics last cleared:';
+    - 'module':        o resto da linha 'Module:' (o recorte antigo parava na
+                       primeira linha começando com letra ou número);
+    - 'diag':          de 'Transceiver diagnostic:' até o fim do bloco;
+    - 'lane0':         dentro de 'diag', de 'Lane 0' até 'Lane 1' ou uma
+                       linha em branco.
+
+    Uma seção cujo fim não aparece fica de fora (a regex antiga não casava),
+    menos 'diag', que vai até o fim.
     """
-    try:
-        line_match = re.search(r"^\s*" + key_regex + r"\s*:\s*(.*)$", text, re.MULTILINE)
-        if not line_match:
-            return None
-        
-        content = line_match.group(1)
-        
-        target_match = re.search(r"(-?[\d\.]+)\s*" + target_unit_regex, content)
-        if target_match:
-            return float(target_match.group(1))
-        
-        first_float_match = re.search(r"(-?[\d\.]+)", content)
-        if first_float_match:
-            return float(first_float_match.group(1))
-            
-    except (ValueError, TypeError, AttributeError):
-        pass
-    return None
+    sections = {'block': {}}
+    active = {'block': sections['block']}  # Seções abertas -> campos
+
+    text = '\n' + output_text  # A primeira linha também começa depois de um '\n'
+    for match in _EXTENSIVE_LINE_REGEX.finditer(text):
+        header, rest, key, value = match.group('header', 'rest', 'key', 'value')
+
+        if key is not None:
+            for fields in active.values():
+                if key not in fields:
+                    fields[key] = value
+            continue
+
+        if header is None:
+            # Linha em branco
+            if 'lane0' in active:
+                sections['lane0'] = active.pop('lane0')
+            continue
+
+        # Fecha a seção que termina nesta linha
+        if header == "Output errors:" and 'input_errors' in active:
+            sections['input_errors'] = active.pop('input_errors')
+        elif header == "Statistics last cleared:" and 'output_errors' in active:
+            sections['output_errors'] = active.pop('output_errors')
+        elif header == "Lane 1" and 'lane0' in active:
+            sections['lane0'] = active.pop('lane0')
+
+        # Abre a seção (só na primeira ocorrência do cabeçalho)
+        name = SECTION_HEADERS[header]
+        if name is None or name in active or name in sections:
+            continue
+        if name == 'lane0' and 'diag' not in active:
+            continue
+        fields = {}
+        rest_key, separator, rest_value = rest.partition(':')
+        if separator:
+            fields[rest_key.strip()] = rest_value.strip()
+        if name == 'module':
+            if _WORD_LINE_REGEX.search(text, match.end()):
+                sections['module'] = fields
+            continue
+        active[name] = fields
+
+    if 'diag' in active:
+        sections['diag'] = active['diag']
+    return sections
+
+
+def _field_string(fields: dict, key: str) -> str | None:
+    value = fields.get(key)
+    if value is None:
+        return None
+    value = value.strip()
+    return value if value and value != "N/A" else None
 
-def _get_juniper_string(key_regex: str, text: str) -> str | None:
-    """Helper para extrair um string de uma linha do Juniper."""
-    try:
-        line_match = re.search(r"^\s*" + key_regex + r"\s*:\s*(.*)$", text, re.MULTILINE)
-        if line_match:
-            value = line_match.group(1).strip()
-            return value if value and value != "N/A" else None
-    except Exception:
-        pass
-    return None
-    
-def _get_juniper_int(key_regex: str, text: str) -> int | None:
-    """Helper para extrair um inteiro de uma linha do Juniper."""
+
+def _field_float(fields: dict, key: str, target_unit: str) -> float | None:
+    """Número na unidade alvo (ex: 'dBm' em vez de 'mW') ou, sem ela, o primeiro número."""
+    value = fields.get(key)
+    if value is None:
+        return None
+    match = _UNIT_NUMBER_REGEXES[target_unit].search(value) or _NUMBER_REGEX.search(value)
+    if not match:
+        return None
     try:
-        line_match = re.search(r"^\s*" + key_regex + r"\s*:\s*([\d]+)", text, re.MULTILINE)
-        if line_match:
-            return int(line_match.group(1))
-    except (ValueError, TypeError, AttributeError):
-        pass
-    return 0 # Default para contadores de erro é 0
-
-def _parse_single_interface_block(output_text: str) -> dict | None:
+        return float(match.group(1))
+    except ValueError:
+        return None
+
+
+def _field_int(fields: dict, key: str) -> int:
+    """Contador inteiro; 0 quando a linha não existe (default dos contadores de erro)."""
+    value = fields.get(key)
+    if value is None:
+        return 0
+    digits = _DIGITS_REGEX.match(value)
+    return int(digits.group(0)) if digits else 0
+
+
+def _parse_single_interface_block(output_text: str) -> records.InterfaceData | None:
     """
     Analisa um *único bloco* de 'show interfaces extensive' do JUNIPER.
-    Retorna um dicionário com todos os dados (status, stats, module, reading).
+    Retorna um records.InterfaceData com todos os dados (status, stats, module, reading).
+
+    O bloco é lido uma vez só ('_tokenize_extensive_block') e os campos saem
+    das seções já separadas, em vez de uma busca regex por campo.
     """
     
-    status_data = {}
-    stats_data = {}
-    module_data = {}
-    reading_data = {}
+    status_data = records.InterfaceStatus()
+    stats_data = records.InterfaceStats()
+    module_data = records.TransceiverModule()
+    reading_data = records.TransceiverReading()
 
     # --- 1. Status (Up/Down) ---
     # Ex: Physical interface: et-0/0/9, Enabled, Physical link is Up
     status_match = re.search(r"Enabled|Administratively down", output_text)
     if status_match:
         status_str = status_match.group(0)
-        status_data['protocol_status'] = 'up' if status_str == 'Enabled' else 'down'
+        status_data.protocol_status = 'up' if status_str == 'Enabled' else 'down'
     
     link_match = re.search(r"Physical link is (Up|Down)", output_text)
     if link_match:
-        status_data['physical_status'] = link_match.group(1).lower()
+        status_data.physical_status = link_match.group(1).lower()
     
-    # --- 2. Estatísticas (Erros e Utilização) ---
-    # Extrai blocos de Erro
-    input_errors_text = ""
-    in_err_match = re.search(r"Input errors:([\s\S]*?)(?=^\s*Output errors:)", output_text, re.MULTILINE)
-    if in_err_match:
-        input_errors_text = in_err_match.group(1)
-        
-    output_errors_text = ""
-    out_err_match = re.search(r"Output errors:([\s\S]*?)(?=^\s*Statistics last cleared:)", output_text, re.MULTILINE)
-    if out_err_match:
-        output_errors_text = out_err_match.group(1)
+    # Uma passada pelo bloco, separando as seções
+    sections = _tokenize_extensive_block(output_text)
+    block = sections['block']
 
-    # Coleta de Erros
-    stats_data['in_errors'] = _get_juniper_int(r"Errors", input_errors_text)
-    stats_data['out_errors'] = _get_juniper_int(r"Errors", output_errors_text)
-    stats_data['in_crc_errors'] = _get_juniper_int(r"CRC/Align errors", input_errors_text) # Erro específico
+    # --- 2. Estatísticas (Erros e Utilização) ---
+    input_errors = sections.get('input_errors', {})
+    output_errors = sections.get('output_errors', {})
+    stats_data.in_errors = _field_int(input_errors, "Errors")
+    stats_data.out_errors = _field_int(output_errors, "Errors")
+    stats_data.in_crc_errors = _field_int(input_errors, "CRC/Align errors") # Erro específico
 
     # Cálculo de Utilização
     try:
-        speed_str = _get_juniper_string(r"Speed", output_text)
+        speed_str = _field_string(block, "Speed")
         port_speed_bps = _parse_speed_to_bps(speed_str)
         
-        in_bps_float = _get_juniper_float(r"Input  bytes", output_text, r"bps")
-        out_bps_float = _get_juniper_float(r"Output bytes", output_text, r"bps")
+        in_bps_float = _field_float(block, "Input  bytes", "bps")
+        out_bps_float = _field_float(block, "Output bytes", "bps")
         in_bps = int(in_bps_float) if in_bps_float is not None else None
         out_bps = int(out_bps_float) if out_bps_float is not None else None
        
 
         if port_speed_bps and port_speed_bps > 0 and in_bps is not None and out_bps is not None:
-            stats_data['in_uti'] = round((in_bps / port_speed_bps) * 100, 2)
-            stats_data['out_uti'] = round((out_bps / port_speed_bps) * 100, 2)
+            stats_data.in_uti = round((in_bps / port_speed_bps) * 100, 2)
+            stats_data.out_uti = round((out_bps / port_speed_bps) * 100, 2)
         else:
             # print(f"       [PARSE-STATS] Não foi possível calcular Uti%. Speed='{speed_str}', In='{in_bps}', Out='{out_bps}'")
-            stats_data['in_uti'] = 0.0
-            stats_data['out_uti'] = 0.0
+            stats_data.in_uti = 0.0
+            stats_data.out_uti = 0.0
 
     except Exception as e:
         print(f"       [ERRO-PARSE-STATS] Falha ao calcular Uti%: {e}")
-        stats_data['in_uti'] = 0.0
-        stats_data['out_uti'] = 0.0
+        stats_data.in_uti = 0.0
+        stats_data.out_uti = 0.0
 
     
     # --- 3. Ópticos (Módulo e Leituras) ---
-    module_info_match = re.search(r"^\s*Module:([\s\S]*?)(?=^\s*\w)", output_text, re.MULTILINE)
-    diag_info_match = re.search(r"^\s*Transceiver diagnostic:([\s\S]*)", output_text, re.MULTILINE)
+    module = sections.get('module')
+    diag = sections.get('diag')
     
-    if not diag_info_match:
+    if diag is None:
         if "transceiver is not supported" in output_text: return None
-        if not module_info_match:
-             reading_data['transceiver_status'] = "absent"
-             module_data['serial_number'] = None
+        if module is None:
+             reading_data.transceiver_status = "absent"
+             module_data.serial_number = None
         else:
-             reading_data['transceiver_status'] = "no_diag"
-             module_text = module_info_match.group(1)
-             module_data['serial_number'] = _get_juniper_string(r"Vendor S/N", module_text)
-             module_data['vendor_part_number'] = _get_juniper_string(r"Vendor P/N", module_text)
-             module_data['vendor_name'] = _get_juniper_string(r"Vendor Name", module_text)
+             reading_data.transceiver_status = "no_diag"
+             module_data.serial_number = _field_string(module, "Vendor S/N")
+             module_data.vendor_part_number = _field_string(module, "Vendor P/N")
+             module_data.vendor_name = _field_string(module, "Vendor Name")
         
-        return {"status": status_data, "stats": stats_data, "module": module_data, "reading": reading_data}
+        return records.InterfaceData(status_data, stats_data, module_data, reading_data)
 
     # SFP está presente e tem diagnóstico
-    reading_data['transceiver_status'] = "present"
-    diag_text = diag_info_match.group(1)
+    reading_data.transceiver_status = "present"
     
     # Leituras Dinâmicas
-    reading_data['temperature'] = _get_juniper_float(r"Module temperature", diag_text, r"degrees C")
-    reading_data['voltage'] = _get_juniper_float(r"Module voltage", diag_text, r"V")
-    
-    lane_text_block = diag_text
-    lane_0_match = re.search(r"^\s*Lane 0([\s\S]*?)(?=^\s*Lane 1|^\s*$)", diag_text, re.MULTILINE)
-    if lane_0_match:
-        lane_text_block = lane_0_match.group(1)
-    
-    reading_data['bias_current'] = _get_juniper_float(r"Laser bias current", lane_text_block, r"mA")
-    reading_data['tx_power'] = _get_juniper_float(r"Laser output power", lane_text_block, r"dBm")
-    reading_data['rx_power'] = _get_juniper_float(r"Laser receiver power", lane_text_block, r"dBm")
+    for name, (key, unit) in READING_FIELDS.items():
+        setattr(reading_data, name, _field_float(diag, key, unit))
+    lane = sections.get('lane0', diag)
+    for name, (key, unit) in LANE_READING_FIELDS.items():
+        setattr(reading_data, name, _field_float(lane, key, unit))
 
     # Thresholds (Estáticos)
-    module_data['temp_high'] = _get_juniper_float(r"Module temperature high alarm threshold", diag_text, r"degrees C")
-    module_data['temp_low'] = _get_juniper_float(r"Module temperature low alarm threshold", diag_text, r"degrees C")
-    module_data['temp_high_warning'] = _get_juniper_float(r"Module temperature high warning threshold", diag_text, r"degrees C")
-    module_data['temp_low_warning'] = _get_juniper_float(r"Module temperature low warning threshold", diag_text, r"degrees C")
-    module_data['volt_high'] = _get_juniper_float(r"Module voltage high alarm threshold", diag_text, r"V")
-    module_data['volt_low'] = _get_juniper_float(r"Module voltage low alarm threshold", diag_text, r"V")
-    module_data['volt_high_warning'] = _get_juniper_float(r"Module voltage high warning threshold", diag_text, r"V")
-    module_data['volt_low_warning'] = _get_juniper_float(r"Module voltage low warning threshold", diag_text, r"V")
-    module_data['bias_high'] = _get_juniper_float(r"Laser bias current high alarm threshold", diag_text, r"mA")
-    module_data['bias_low'] = _get_juniper_float(r"Laser bias current low alarm threshold", diag_text, r"mA")
-    module_data['bias_high_warning'] = _get_juniper_float(r"Laser bias current high warning threshold", diag_text, r"mA")
-    module_data['bias_low_warning'] = _get_juniper_float(r"Laser bias current low warning threshold", diag_text, r"mA")
-    module_data['tx_power_high'] = _get_juniper_float(r"Laser output power high alarm threshold", diag_text, r"dBm")
-    module_data['tx_power_low'] = _get_juniper_float(r"Laser output power low alarm threshold", diag_text, r"dBm")
-    module_data['tx_power_high_warning'] = _get_juniper_float(r"Laser output power high warning threshold", diag_text, r"dBm")
-    module_data['tx_power_low_warning'] = _get_juniper_float(r"Laser output power low warning threshold", diag_text, r"dBm")
-    module_data['rx_power_high'] = _get_juniper_float(r"Laser rx power high alarm threshold", diag_text, r"dBm")
-    module_data['rx_power_low'] = _get_juniper_float(r"Laser rx power low alarm threshold", diag_text, r"dBm")
-    module_data['rx_power_high_warning'] = _get_juniper_float(r"Laser rx power high warning threshold", diag_text, r"dBm")
-    module_data['rx_power_low_warning'] = _get_juniper_float(r"Laser rx power low warning threshold", diag_text, r"dBm")
+    for name, (key, unit) in MODULE_THRESHOLD_FIELDS.items():
+        setattr(module_data, name, _field_float(diag, key, unit))
     
     # Dados Estáticos (Módulo)
-    if module_info_match:
-        module_text = module_info_match.group(1)
-        module_data['serial_number'] = _get_juniper_string(r"Vendor S/N", module_text)
-        module_data['vendor_part_number'] = _get_juniper_string(r"Vendor P/N", module_text)
-        module_data['vendor_name'] = _get_juniper_string(r"Vendor Name", module_text)
-        module_data['connector_type'] = _get_juniper_string(r"Connector", module_text)
-        module_data['wavelength_nm'] = _get_juniper_string(r"Wavelength", module_text)
-        if not module_data.get('vendor_part_number'):
-            module_data['transceiver_type'] = "Type Unknown"
+    if module is not None:
+        for name, key in MODULE_STRING_FIELDS.items():
+            setattr(module_data, name, _field_string(module, key))
+        if not module_data.vendor_part_number:
+            module_data.transceiver_type = "Type Unknown"
         else:
-             module_data['transceiver_type'] = module_data['vendor_part_number']
+             module_data.transceiver_type = module_data.vendor_part_number
     
-    # Limpa valores nulos (None) dos dicionários
-    clean_status_data = {k: v for k, v in status_data.items() if v is not None}
-    clean_stats_data = {k: v for k, v in stats_data.items() if v is not None}
-    clean_module_data = {k: v for k, v in module_data.items() if v is not None}
-    clean_reading_data = {k: v for k, v in reading_data.items() if v is not None}
-
-    return {
-        "status": clean_status_data, 
-        "stats": clean_stats_data, 
-        "module": clean_module_data, 
-        "reading": clean_reading_data
-    }
-
-def parse_global_extensive_output(global_output_text: str) -> dict:
+    return records.InterfaceData(status_data, stats_data, module_data, reading_data)
+
+def parse_extensive_blocks(blocks: list) -> dict:
     """
-    Analisa a saída completa de 'show interfaces extensive' e 
-    retorna um dicionário de dados (status, stats, module, reading) por interface.
+    Analisa blocos (nome_longo, texto) já separados de 'show interfaces
+    extensive'. Função de nível de módulo: é o que vai para o PARSE_POOL.
     """
-    all_data = {}
-    
-    # Regex para encontrar o início de cada bloco de interface
-    interface_header_regex = r"^Physical interface:\s*([A-Za-z0-9-./]+)"
-    
-    headers = list(re.finditer(interface_header_regex, global_output_text, re.MULTILINE))
-    
-    if not headers:
-        print("     [PARSE-GLOBAL] Nenhuma 'Physical interface' encontrada na saída.")
-        return {}
-
-    print(f"     [PARSE-GLOBAL] Encontrados {len(headers)} blocos de 'Physical interface' na saída.")
-    
-    for i, header_match in enumerate(headers):
+    data = {}
+    for long_name, interface_block_text in blocks:
         try:
-            long_name = header_match.group(1)
             interface_name = _normalize_interface_name(long_name)
             
-            start_index = header_match.start()
-            end_index = headers[i + 1].start() if (i + 1) < len(headers) else len(global_output_text)
-            interface_block_text = global_output_text[start_index:end_index]
-            
             # Silenciado para não poluir o log de teste
             # print(f"\n     --- [IFACE-PARSE] Processando Bloco para: {long_name} (como {interface_name}) ---")
             
             parsed_data = _parse_single_interface_block(interface_block_text) 
             
             if parsed_data:
-                all_data[interface_name] = parsed_data
+                data[interface_name] = parsed_data
             # else:
                 # Silenciado para não poluir
                 # print(f"       [PARSE-BLOCK] Interface {long_name} ({interface_name}) ignorada (não-óptica ou sem dados).")
         except Exception as e:
             print(f"     [ERRO-PARSE] Erro fatal ao processar bloco para {long_name}: {e}")
+    return data
 
-    print(f"\n     [PARSE-GLOBAL] Análise concluída. {len(all_data)} interfaces com dados extraídos.")
-    return all_data
+
+class ExtensiveStreamParser(BlockStreamParser):
+    """
+    Parser incremental de 'show interfaces extensive': cada bloco de
+    'Physical interface' é analisado assim que o próximo cabeçalho chega.
+    Use 'feed(chunk)' durante a leitura e 'result()' no final.
+
+    'wanted' (opcional) é o conjunto de nomes (já normalizados) que
+    interessam, ex: as interfaces do dispositivo no banco. Os outros blocos
+    (lógicas, gerência, portas fora do monitoramento) são descartados logo
+    no cabeçalho, sem passar pelo parsing.
+
+    Com 'deferred', os blocos aceitos são guardados durante a leitura e,
+    a cada CHUNK_BYTES, mandados ao PARSE_POOL (fora do loop) sem esperar;
+    'result_async()' manda o resto e espera os pedaços. Os blocos de cada
+    pedaço ficam em memória até ele voltar (para o parse no loop, se o pool
+    quebrar): o leitor chama 'drain()' / 'drain_async()' depois de cada
+    chunk, e com MAX_IN_FLIGHT pedaços no pool a leitura espera o mais
+    antigo. A memória fica limitada a um pedaço guardado mais MAX_IN_FLIGHT
+    no pool, mesmo quando a leitura é mais rápida que o parse.
+    """
+
+    # Pedaços no pool por dispositivo antes de a leitura esperar
+    MAX_IN_FLIGHT = max(1, PARSE_POOL.workers)
+
+    def __init__(self, wanted: set | None = None, deferred: bool = False):
+        # Regex para encontrar o início de cada bloco de interface
+        super().__init__(r"^Physical interface:\s*([A-Za-z0-9-./]+)", self._parse_block,
+                         accept=None if wanted is None else self._is_wanted)
+        self.wanted = wanted
+        self.deferred = deferred
+        self.pending = []        # (nome_longo, texto) aguardando o pool
+        self.pending_bytes = 0
+        self.in_flight = []      # (Future, blocos) já mandados ao pool
+        self.data = {}
+
+    def _is_wanted(self, long_name) -> bool:
+        return _normalize_interface_name(long_name) in self.wanted
+
+    def _parse_block(self, long_name, interface_block_text):
+        if self.deferred:
+            self.pending.append((long_name, interface_block_text))
+            self.pending_bytes += len(interface_block_text)
+            if self.pending_bytes >= CHUNK_BYTES:
+                self._dispatch()
+            return
+        self.data.update(parse_extensive_blocks([(long_name, interface_block_text)]))
+
+    def _dispatch(self):
+        """Manda os blocos guardados ao PARSE_POOL e recolhe os pedaços que já voltaram."""
+        blocks = self.pending
+        self.pending = []
+        self.pending_bytes = 0
+        future = PARSE_POOL.submit(parse_extensive_blocks, blocks)
+        if future is None:
+            self.data.update(parse_extensive_blocks(blocks))
+        else:
+            self.in_flight.append((future, blocks))
+        # Pedaços prontos saem da lista (e os blocos deles da memória)
+        while self.in_flight and self.in_flight[0][0].done():
+            self._collect(*self.in_flight.pop(0))
+
+    def drain(self):
+        """Com MAX_IN_FLIGHT pedaços no pool, espera o mais antigo (leitura numa thread)."""
+        while len(self.in_flight) >= self.MAX_IN_FLIGHT:
+            self._collect(*self.in_flight.pop(0))
+
+    async def drain_async(self):
+        """Como 'drain()', sem travar o loop de eventos (leitura com asyncssh)."""
+        while len(self.in_flight) >= self.MAX_IN_FLIGHT:
+            await self._collect_async(*self.in_flight.pop(0))
+
+    def _collect(self, future, blocks):
+        try:
+            self.data.update(future.result())
+        except BrokenProcessPool:
+            print("     [PARSE-POOL] Pool de processos quebrado. Analisando o pedaço no loop.")
+            self.data.update(parse_extensive_blocks(blocks))
+
+    async def _collect_async(self, future, blocks):
+        try:
+            await asyncio.wrap_future(future)
+        except BrokenProcessPool:
+            pass  # '_collect' analisa o pedaço no loop
+        self._collect(future, blocks)
+
+    def result(self) -> dict:
+        """Fecha o stream e retorna os dados (status, stats, module, reading) por interface."""
+        self.close()
+        if self.pending:
+            self.data.update(parse_extensive_blocks(self.pending))
+            self.pending = []
+        while self.in_flight:
+            self._collect(*self.in_flight.pop(0))
+        return self._summary()
+
+    async def result_async(self) -> dict:
+        """Como 'result()', mas os blocos guardados ('deferred') são analisados no PARSE_POOL."""
+        self.close()
+        if self.pending:
+            if self.pending_bytes >= MIN_POOL_BYTES:
+                self._dispatch()
+            else:
+                self.data.update(parse_extensive_blocks(self.pending))
+                self.pending = []
+        while self.in_flight:
+            await self._collect_async(*self.in_flight.pop(0))
+        return self._summary()
+
+    def _summary(self) -> dict:
+        if not self.blocks:
+            print("     [PARSE-GLOBAL] Nenhuma 'Physical interface' encontrada na saída.")
+            return {}
+
+        print(f"     [PARSE-GLOBAL] Encontrados {self.blocks} blocos de 'Physical interface' na saída.")
+        if self.skipped:
+            print(f"     [PARSE-GLOBAL] {self.skipped} blocos fora das interfaces monitoradas ignorados.")
+        print(f"\n     [PARSE-GLOBAL] Análise concluída. {len(self.data)} interfaces com dados extraídos.")
+        return self.data
+
+def parse_global_extensive_output(global_output_text: str, wanted: set | None = None) -> dict:
+    """
+    Analisa a saída completa de 'show interfaces extensive' e 
+    retorna um dicionário {interface: records.InterfaceData} (status, stats, module, reading).
+    Com 'wanted', só as interfaces desse conjunto são analisadas.
+    """
+    parser = ExtensiveStreamParser(wanted)
+    parser.feed(global_output_text)
+    return parser.result()
 
 
 # --- 4. ORQUESTRAÇÃO (MAIN) ---
 
-async def process_device_monitoring(db: Prisma, dev: Device, semaphore: asyncio.Semaphore):
+async def process_device_monitoring(db: Prisma, dev: Device, db_interfaces: list, limiter: AdaptiveLimiter,
+                                    costs: DeviceCosts, status_writes: StatusWrites):
     """
     Processa um UNICO dispositivo: coleta, parseia e decide se salva ou printa.
+    'db_interfaces' (com o módulo atual) já vem do main(), numa consulta só
+    para toda a varredura.
     """
     
     # Comando único que pega TUDO
     COMMAND = "show interfaces extensive"
     
-    async with semaphore:
+    if not db_interfaces:
+        print(f"   [INFO] Nenhuma interface encontrada para {dev.hostname} no DB. Pulando dispositivo.")
+        return
+
+    # Circuit breaker: host com falhas seguidas de conexão é pulado sem
+    # ocupar vaga (ou testado só com um connect TCP) - ver 'circuit_breaker.py'
+    if not await BREAKER.allow(dev.ip_address):
+        return
+    
+    async with limiter as slot:
         print(f"\n--- [DEV] Iniciando Processamento: {dev.hostname} (IP: {dev.ip_address}) ---")
-
+        print(f"   [INFO] Encontradas {len(db_interfaces)} interfaces no DB. Buscando dados completos...")
+
+        # Parser incremental: os blocos são separados enquanto o resto da
+        # saída ainda está chegando (a saída inteira nunca fica em memória).
+        # Só os blocos das interfaces do banco são guardados; os demais são
+        # pulados já no cabeçalho.
+        parser = ExtensiveStreamParser(wanted={iface.interface_name for iface in db_interfaces},
+                                       deferred=PARSE_POOL.workers > 0)
+        collected = None
+        ssh_start = time.monotonic()
         try:
-            db_interfaces = await db.networkinterface.find_many(
-                where={'device_id': dev.id},
-                include={
-                    'modules': {
-                        'order_by': {'timestamp': 'desc'},
-                        'take': 1
-                    }
-                }
-            )
-            if not db_interfaces:
-                print(f"   [INFO] Nenhuma interface encontrada para {dev.hostname} no DB. Pulando dispositivo.")
-                return
-            print(f"   [INFO] Encontradas {len(db_interfaces)} interfaces no DB. Buscando dados completos...")
-        except Exception as e:
-            print(f"   [ERRO-DB] Falha ao buscar interfaces de {dev.hostname}: {e}")
-            return
-
-        raw_output = None
-        try:
-            raw_output = await asyncio.to_thread(
-                get_ssh_output, 
-                dev.ip_address, 
-                SSH_USERNAME, 
-                SSH_PASSWORD, 
-                COMMAND
-            )
+            if USE_ASYNC_SSH and ssh_async.AVAILABLE:
+                # Direto no loop de eventos (sem thread)
+                collected = await stream_ssh_output_async(
+                    dev.ip_address, SSH_USERNAME, SSH_PASSWORD, COMMAND, parser.feed, parser.drain_async
+                )
+            else:
+                collected = await asyncio.to_thread(
+                    stream_ssh_output, 
+                    dev.ip_address, 
+                    SSH_USERNAME, 
+                    SSH_PASSWORD, 
+                    COMMAND,
+                    parser.feed,
+                    parser.drain
+                )
         except Exception as e:
-            print(f"   [ERRO-THREAD] Erro ao executar get_ssh_output na thread para {dev.hostname}: {e}")
+            print(f"   [ERRO-THREAD] Erro ao executar stream_ssh_output na thread para {dev.hostname}: {e}")
             return
         
+        # Sinais (latência do login, timeouts, falhas de auth) para o limitador
+        ssh_timing = (ASYNC_POOL if USE_ASYNC_SSH and ssh_async.AVAILABLE else POOL).timings.get(dev.ip_address)
+        slot.observe(ssh_timing)
+        
         # --- !!! ESTA É A CORREÇÃO !!! ---
         # A verificação ' "error:" in raw_output.lower()' foi removida.
-        # A função 'get_ssh_output' já trata erros de SSH (stderr)
+        # A função 'stream_ssh_output' já trata erros de SSH (stderr)
         # e a saída do comando PODE conter "Input errors:", o que é normal.
-        if not raw_output:
+        if not collected:
             print(f"   [ERRO-SSH] Falha ao obter dados de {dev.ip_address} (saída vazia ou falha na conexão). Pulando dispositivo.")
             return
         # --- FIM DA CORREÇÃO ---
+        costs.record_ssh(dev.ip_address, ssh_timing, ssh_start, time.monotonic() - ssh_start)
 
+        # Durante a leitura os blocos foram separados (os de fora do banco
+        # descartados) e mandados ao pool de processos a cada CHUNK_BYTES;
+        # aqui vai o resto e esperamos os pedaços (ver 'parse_pool.py').
+        parse_start = time.monotonic()
         try:
-            all_parsed_data = parse_global_extensive_output(raw_output)
+            all_parsed_data = await parser.result_async()
         except Exception as e:
             print(f"   [ERRO-PARSE] Falha ao analisar dados de {dev.hostname}: {e}")
             return
+        parse_seconds = time.monotonic() - parse_start
+        TIMER.record('parse', parse_seconds)
+        costs.record(dev.ip_address, parse=parse_seconds)
 
         if not all_parsed_data:
             print(f"   [WARN] Parser não encontrou dados na saída de {dev.ip_address}.")
@@ -423,10 +751,13 @@ async def process_device_monitoring(db: Prisma, dev: Device, semaphore: asyncio.
         
         # --- PARTE 4: Salvar no DB ou Printar no Console ---
         
-        stats_salvas = 0
-        status_atualizado = 0
-        readings_salvas = 0
+        db_start = time.monotonic()
         modules_salvos = 0
+        # Linhas de histórico do dispositivo, gravadas em lote ('db_batch.py')
+        stats_rows = []
+        reading_rows = []
+        status_changes = {}  # tuple(status_data.items()) -> ids das interfaces que mudaram
+        status_iguais = 0
         
         # Dados para printar se SAVE_TO_DATABASE == False
         print_output_data = {}
@@ -442,65 +773,44 @@ async def process_device_monitoring(db: Prisma, dev: Device, semaphore: asyncio.
             iface = db_interface_map[iface_name]
             
             # Extrai os dados parseados
-            status_data = parsed_data.get('status', {})
-            stats_data = parsed_data.get('stats', {})
-            module_data = parsed_data.get('module', {})
-            reading_data = parsed_data.get('reading', {})
+            # (to_data: só os campos do 'schema.prisma' que têm valor)
+            status_data = parsed_data.status.to_data()
+            stats_data = parsed_data.stats.to_data()
+            module_data = parsed_data.module.to_data()
+            reading_data = parsed_data.reading.to_data()
             
             if SAVE_TO_DATABASE:
                 # --- LÓGICA DE BANCO DE DADOS ATIVADA ---
                 
-                # 4a. Salva InterfaceStats (Uti% e Erros)
-                try:
-                    # --- CORREÇÃO ---
-                    # Criamos um dicionário 'data_to_save' apenas com os campos
-                    # que REALMENTE existem no 'schema.prisma', pois 'stats_data'
-                    # contém 'in_crc_errors' (que não está no schema).
-                    data_to_save = {
-                        'interface_id': iface.id,
-                        'in_uti': stats_data.get('in_uti'),
-                        'out_uti': stats_data.get('out_uti'),
-                        'in_errors': stats_data.get('in_errors'),
-                        'out_errors': stats_data.get('out_errors')
-                    }
-                    
-                    await db.interfacestats.create(data=data_to_save)
-                    stats_salvas += 1
-                except Exception as e:
-                    print(f"     [ERRO-DB-STATS] Falha ao salvar stats de {iface.interface_name}: {e}")
-
-                # 4b. Atualiza NetworkInterface (Status Up/Down)
-                try:
-                    if status_data: # Só atualiza se tiver dados
-                        await db.networkinterface.update(
-                            where={'id': iface.id},
-                            data=status_data
-                        )
-                        status_atualizado += 1
-                except Exception as e:
-                    print(f"     [ERRO-DB-STATUS] Falha ao atualizar status de {iface.interface_name}: {e}")
-
-                # 4c. Salva TransceiverReading (Temp, Rx, Tx)
-                try:
-                    if reading_data.get('transceiver_status'): # Só salva se tiver status
-                        reading_data['interface_id'] = iface.id
-                        await db.transceiverreading.create(data=reading_data)
-                        readings_salvas += 1
-                except Exception as e:
-                    print(f"     [ERRO-DB-READ] Falha ao salvar leitura de {iface.interface_name}: {e}")
+                # 4a. InterfaceStats (Uti% e Erros): gravado em lote depois do loop
+                # ('in_crc_errors' não está no schema: o to_data() já o deixa de fora)
+                stats_data['interface_id'] = iface.id
+                stats_rows.append(stats_data)
+
+                # 4b. NetworkInterface (Status Up/Down): só se tiver dados e se mudou
+                # em relação ao que o find_many trouxe. As que mudaram vão em lote.
+                if status_data:
+                    if all(getattr(iface, field) == value for field, value in status_data.items()):
+                        status_iguais += 1
+                    else:
+                        status_changes.setdefault(tuple(status_data.items()), []).append(iface.id)
+
+                # 4c. TransceiverReading (Temp, Rx, Tx): também em lote
+                if reading_data.get('transceiver_status'): # Só salva se tiver status
+                    reading_data['interface_id'] = iface.id
+                    reading_rows.append(reading_data)
                 
                 # 4d. Salva TransceiverModule (S/N e Thresholds) - CONDICIONAL
                 try:
-                    last_module = iface.modules[0] if iface.modules else None
+                    last_module = iface.current_module
                     last_serial = last_module.serial_number if last_module and last_module.serial_number else None
-                    new_serial = module_data.get('serial_number')
+                    new_serial = parsed_data.module.serial_number
 
                     if new_serial != last_serial:
                         print(f"     [SAVE-MODULE] *** Detecção de mudança de módulo em {iface.interface_name}! ***")
                         print(f"       S/N Antigo: {last_serial} -> S/N Novo: {new_serial}")
                         
-                        module_data['interface_id'] = iface.id
-                        await db.transceivermodule.create(data=module_data)
+                        await create_current_module(db, iface.id, module_data)
                         modules_salvos += 1
                 except Exception as e:
                     print(f"     [ERRO-DB-MODULE] Falha ao salvar módulo de {iface.interface_name}: {e}")
@@ -509,12 +819,19 @@ async def process_device_monitoring(db: Prisma, dev: Device, semaphore: asyncio.
                 # --- LÓGICA DE PRINT NO CONSOLE ATIVADA ---
                 # Adiciona os dados parseados (para as interfaces que monitoramos)
                 # ao dicionário que será impresso no final.
-                print_output_data[iface_name] = parsed_data
+                print_output_data[iface_name] = parsed_data.as_dict()
 
         # --- ESTE É O LOCAL CORRETO PARA O PRINT/RESUMO ---
         if SAVE_TO_DATABASE:
+            stats_salvas = await create_rows(db.interfacestats, stats_rows, 'STATS')
+            # Última estatística de cada interface (lida pelo 'alarme.py')
+            await upsert_latest_stats(db, stats_rows)
+            readings_salvas = await create_rows(db.transceiverreading, reading_rows, 'READ')
+            status_atualizado = await update_groups(db.networkinterface, status_changes, 'STATUS')
+            status_writes.record(status_atualizado, status_iguais)
+            TIMER.record('db_write', time.monotonic() - db_start)
             print(f"\n--- [DEV] Concluído Processamento de {dev.hostname} (Modo: Salvar) ---")
-            print(f"   - {status_atualizado} interfaces com status (up/down) atualizado.")
+            print(f"   - {status_atualizado} interfaces com status (up/down) atualizado, {status_iguais} sem mudança.")
             print(f"   - {stats_salvas} novos registros de estatísticas (Uti%/Erros) salvos.")
             print(f"   - {readings_salvas} novas leituras de transceiver (Temp/Rx/Tx) salvas.")
             print(f"   - {modules_salvos} novos eventos de módulo (S/N) registrados.")
@@ -527,15 +844,22 @@ async def process_device_monitoring(db: Prisma, dev: Device, semaphore: asyncio.
 async def main():
     db = Prisma()
     
+    # Com USE_ASYNC_SSH não há uma thread por coleta: dá para subir bastante.
     MAX_CONCURRENT_TASKS = 20 # Reduzido para o comando 'extensive'
-    semaphore = asyncio.Semaphore(MAX_CONCURRENT_TASKS)
+    # Valor inicial: o limitador adaptativo ('concurrency.py') ajusta durante a varredura
+    limiter = AdaptiveLimiter("tresholdjn", initial=MAX_CONCURRENT_TASKS)
+    # Custo aprendido por dispositivo: os mais demorados são despachados primeiro
+    costs = DeviceCosts("tresholdjn")
+    # Status regravados x pulados (sem mudança) nesta varredura
+    status_writes = StatusWrites()
     
     print("[INFO] Iniciando script de MONITORAMENTO COMPLETO (Juniper)...")
     if SAVE_TO_DATABASE:
         print("[INFO] Modo: SALVAR NO BANCO DE DADOS")
     else:
         print("[INFO] Modo: EXIBIR NO CONSOLE (Nenhum dado será salvo)")
-    print(f"[INFO] Limite de {MAX_CONCURRENT_TASKS} coletas simultâneas.")
+    print(f"[INFO] Limite inicial de {limiter.current} coletas simultâneas (adaptativo).")
+    print(f"[INFO] SSH: {'asyncio nativo (asyncssh)' if USE_ASYNC_SSH and ssh_async.AVAILABLE else 'threads (paramiko)'}")
     
     start_total_time = time.time()
     
@@ -555,13 +879,22 @@ async def main():
             print("[ERRO] Nenhum dispositivo com 'os' == 'junos' encontrado no banco. Execute o script de inventário primeiro.")
             return
 
-        print(f"[INFO] Encontrados {len(devices)} dispositivos. Criando tarefas...")
+        # Interfaces de todos os dispositivos, com o módulo atual (para comparar
+        # o S/N), numa consulta só - não uma por coleta
+        print("[DB] Buscando interfaces de todos os dispositivos...")
+        interfaces = await interfaces_by_device(db, devices, include={'current_module': True})
+        print(f"[INFO] Encontrados {len(devices)} dispositivos e {sum(map(len, interfaces.values()))} interfaces. Criando tarefas...")
         
         tasks = []
-        for dev in devices:
-            tasks.append(process_device_monitoring(db, dev, semaphore))
+        for dev in costs.order(devices, lambda d: d.ip_address):
+            tasks.append(process_device_monitoring(db, dev, interfaces[dev.id], limiter, costs, status_writes))
         
         await asyncio.gather(*tasks)
+        print(f"[INFO] {limiter.summary()}")
+        print(f"[INFO] {PARSE_POOL.summary()}")
+        if SAVE_TO_DATABASE:
+            print(f"[INFO] {status_writes.summary()}")
+        costs.save()
         
         end_total_time = time.time()
         